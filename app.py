@@ -1,324 +1,154 @@
 import streamlit as st
-from openpyxl import load_workbook
-from dbf import Table, READ_WRITE
-import tempfile
 import os
 import pandas as pd
 import io
 import base64
 from reports import show_word_report_ui, get_word_bytes, generate_word_report
 from config import extract_jle_data
-
-# --- Helper function to clean numeric values ---
-def clean_value(val):
-    if val is None:
-        return ''
-    if isinstance(val, (int, float)):
-        return f"{val:.1f}"
-    return val
-
-def process_files(excel_file, dbf_file, original_dbf_filename):
-    """Process the Excel and DBF files based on the original logic"""
-    excel_path = None
-    dbf_path = None
-
-    try:
-        # Save uploaded files to temporary locations
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_excel:
-            tmp_excel.write(excel_file.getvalue())
-            excel_path = tmp_excel.name
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.dbf') as tmp_dbf:
-            tmp_dbf.write(dbf_file.getvalue())
-            dbf_path = tmp_dbf.name
-
-        # Load Excel - using context manager to ensure it's properly closed
-        wb = load_workbook(excel_path, data_only=True)
-        try:
-            # Check if the "FFG" worksheet exists
-            if "FFG" not in wb.sheetnames:
-                available_sheets = ", ".join(wb.sheetnames)
-                raise ValueError(f"Worksheet 'FFG' not found. Available sheets: {available_sheets}")
-
-            ws = wb["FFG"]
-
-            # Find the columns with "EG" and "REMARKS" in row 7
-            col_grade_idx = None
-            col_remark_idx = None
-
-            for col_idx in range(1, ws.max_column + 1):  # Iterate through all columns
-                cell_value = ws.cell(row=7, column=col_idx).value
-                if cell_value and str(cell_value).strip().upper() == "EG":
-                    col_grade_idx = col_idx
-                elif cell_value and str(cell_value).strip().upper() == "REMARKS":
-                    col_remark_idx = col_idx
-
-            if col_grade_idx is None:
-                raise ValueError("Column with 'EG' header not found in row 7")
-            if col_remark_idx is None:
-                raise ValueError("Column with 'REMARKS' header not found in row 7")
-
-            # Convert column indices to letters for easier reference
-            def col_to_letter(col_num):
-                result = ""
-                while col_num > 0:
-                    col_num -= 1
-                    result = chr(col_num % 26 + ord('A')) + result
-                    col_num //= 26
-                return result
-
-            col_grade_letter = col_to_letter(col_grade_idx)
-            col_remark_letter = col_to_letter(col_remark_idx)
-
-            row = 11
-            excel_data = {}
-
-            while True:
-                cell_val = ws[f'C{row}'].value
-                if cell_val is None:
-                    break
-
-                try:
-                    id_str = str(int(cell_val)).strip()
-                except (ValueError, TypeError):
-                    # Skip rows where C column doesn't contain a valid integer
-                    row += 1
-                    continue
-
-                col_grade = ws[f'{col_grade_letter}{row}'].value
-                col_remark = ws[f'{col_remark_letter}{row}'].value
-                excel_data[id_str] = (col_grade, col_remark)
-                row += 1
-        finally:
-            wb.close()  # Ensure workbook is closed even if an exception occurs
-
-        # Open DBF for read/write
-        table = Table(dbf_path)
-        try:
-            table.open(mode=READ_WRITE)
-
-            id_index = 5  # 5th column, 0-based index
-            target_col3 = 2  # 3rd column (write grade)
-            target_col4 = 3  # 4th column (write remark)
-
-            matched = 0
-            for record in table:
-                dbf_id = str(record[id_index]).strip()
-                if dbf_id in excel_data:
-                    grade_val, remark_val = excel_data[dbf_id]
-                    with record:  # <- Required for safe writing
-                        if grade_val is not None:
-                            record[target_col3] = clean_value(grade_val)
-                        if remark_val is not None:
-                            record[target_col4] = clean_value(remark_val)
-                    matched += 1
-        finally:
-            table.close()  # Ensure table is closed even if an exception occurs
-
-        # Copy the updated DBF file back to bytes
-        with open(dbf_path, 'rb') as f:
-            updated_dbf_bytes = f.read()
-
-        return updated_dbf_bytes, matched
-
-    finally:
-        # Ensure temporary files are cleaned up in all cases
-        if excel_path and os.path.exists(excel_path):
-            try:
-                os.remove(excel_path)
-            except Exception:
-                # If we can't remove the file, it might be locked by another process
-                pass
-
-        if dbf_path and os.path.exists(dbf_path):
-            try:
-                os.remove(dbf_path)
-            except Exception:
-                # If we can't remove the file, it might be locked by another process
-                pass
-
-
-
-
-def process_files_with_jle(jle_data, excel_file, dbf_file, original_dbf_filename):
+from parse_cache import cached_jle_data
+import jobs
+from blob_store import SessionBlobs, get_store
+
+
+def show_performance_panel(trace_record):
+    """Collapsible per-stage breakdown of a perf trace (wall/CPU time, peak memory)"""
+    rows = []
+    for span in trace_record['spans']:
+        row = {
+            'Stage': ' ' * span['depth'] + span['name'],
+            'Wall (ms)': round(span['wall_s'] * 1000, 1),
+            'CPU (ms)': round(span['cpu_s'] * 1000, 1),
+        }
+        if 'peak_bytes' in span:
+            row['Peak memory (KiB)'] = round(span['peak_bytes'] / 1024, 1)
+        if 'error' in span:
+            row['Error'] = span['error']
+        rows.append(row)
+
+    with st.expander("⏱️ Performance", expanded=False):
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        st.caption(f"Trace {trace_record['trace_id']}. Set ECLASS_PERF_MEMORY=1 to record peak memory "
+                   f"and ECLASS_PERF_LOG=<file> to keep a JSON log of every update.")
+
+
+@st.fragment(run_every=0.5)
+def show_update_job_progress(job_id):
+    """Progress bar of a running Update DBF job; only this fragment reruns while polling"""
+    job = jobs.get_job(job_id)
+    if job is None or job.finished:
+        # Rerun the whole page so the results are shown
+        st.rerun()
+    st.progress(job.progress(), text=f"{job.stage_label()}...")
+
+
+def session_blobs():
     """
-    Process the Excel and DBF files with additional JLE data.
-    This function extends the original process_files function to incorporate JLE data.
+    This session's uploads and generated files. Only blob keys are kept in
+    st.session_state; the bytes are stored once in the shared blob store,
+    compressed or spilled to disk when cold.
     """
-    excel_path = None
-    dbf_path = None
-
-    try:
-        # Save uploaded files to temporary locations
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_excel:
-            tmp_excel.write(excel_file.getvalue())
-            excel_path = tmp_excel.name
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.dbf') as tmp_dbf:
-            tmp_dbf.write(dbf_file.getvalue())
-            dbf_path = tmp_dbf.name
-
-        # Load Excel - using context manager to ensure it's properly closed
-        wb = load_workbook(excel_path, data_only=True)
-        try:
-            # Check if the "FFG" worksheet exists
-            if "FFG" not in wb.sheetnames:
-                available_sheets = ", ".join(wb.sheetnames)
-                raise ValueError(f"Worksheet 'FFG' not found. Available sheets: {available_sheets}")
-
-            ws = wb["FFG"]
-
-            # Find the columns with "EG" and "REMARKS" in row 7
-            col_grade_idx = None
-            col_remark_idx = None
-
-            for col_idx in range(1, ws.max_column + 1):  # Iterate through all columns
-                cell_value = ws.cell(row=7, column=col_idx).value
-                if cell_value and str(cell_value).strip().upper() == "EG":
-                    col_grade_idx = col_idx
-                elif cell_value and str(cell_value).strip().upper() == "REMARKS":
-                    col_remark_idx = col_idx
-
-            if col_grade_idx is None:
-                raise ValueError("Column with 'EG' header not found in row 7")
-            if col_remark_idx is None:
-                raise ValueError("Column with 'REMARKS' header not found in row 7")
-
-            # Convert column indices to letters for easier reference
-            def col_to_letter(col_num):
-                result = ""
-                while col_num > 0:
-                    col_num -= 1
-                    result = chr(col_num % 26 + ord('A')) + result
-                    col_num //= 26
-                return result
-
-            col_grade_letter = col_to_letter(col_grade_idx)
-            col_remark_letter = col_to_letter(col_remark_idx)
-
-            row = 11
-            excel_data = {}
-
-            while True:
-                cell_val = ws[f'C{row}'].value
-                if cell_val is None:
-                    break
-
-                try:
-                    id_str = str(int(cell_val)).strip()
-                except (ValueError, TypeError):
-                    # Skip rows where C column doesn't contain a valid integer
-                    row += 1
-                    continue
-
-                col_grade = ws[f'{col_grade_letter}{row}'].value
-                col_remark = ws[f'{col_remark_letter}{row}'].value
-                excel_data[id_str] = (col_grade, col_remark)
-                row += 1
-        finally:
-            wb.close()  # Ensure workbook is closed even if an exception occurs
-
-        # Open DBF for read/write
-        table = Table(dbf_path)
-        try:
-            table.open(mode=READ_WRITE)
-
-            id_index = 5  # 5th column, 0-based index
-            target_col3 = 2  # 3rd column (write grade)
-            target_col4 = 3  # 4th column (write remark)
-
-            matched = 0
-            for record in table:
-                dbf_id = str(record[id_index]).strip()
-                if dbf_id in excel_data:
-                    grade_val, remark_val = excel_data[dbf_id]
-                    with record:  # <- Required for safe writing
-                        if grade_val is not None:
-                            record[target_col3] = clean_value(grade_val)
-                        if remark_val is not None:
-                            record[target_col4] = clean_value(remark_val)
-                    matched += 1
-        finally:
-            table.close()  # Ensure table is closed even if an exception occurs
-
-        # Copy the updated DBF file back to bytes
-        with open(dbf_path, 'rb') as f:
-            updated_dbf_bytes = f.read()
-
-        return updated_dbf_bytes, matched
-
-    finally:
-        # Ensure temporary files are cleaned up in all cases
-        if excel_path and os.path.exists(excel_path):
-            try:
-                os.remove(excel_path)
-            except Exception:
-                # If we can't remove the file, it might be locked by another process
-                pass
-
-        if dbf_path and os.path.exists(dbf_path):
-            try:
-                os.remove(dbf_path)
-            except Exception:
-                # If we can't remove the file, it might be locked by another process
-                pass
-
-
-def read_dbf_to_dataframe(dbf_bytes):
-    """Convert DBF bytes to a pandas DataFrame for display"""
-    # Create a temporary file to work with the DBF data
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.dbf') as tmp_dbf:
-        tmp_dbf.write(dbf_bytes)
-        temp_dbf_path = tmp_dbf.name
-
-    try:
-        # Open the DBF file
-        table = Table(temp_dbf_path)
-        table.open(mode=READ_WRITE)
-
-        # Get field names
-        field_names = table.field_names
-
-        # Create a list to store records
-        records = []
-        for record in table:
-            # Convert record to dictionary and add to records list
-            # Handle the conversion carefully to avoid field access issues
-            record_dict = {}
-            for field_name in field_names:
-                try:
-                    record_dict[field_name] = record[field_name]
-                except:
-                    # If there's an issue accessing the field, set to None
-                    record_dict[field_name] = None
-            records.append(record_dict)
-
-        # Close the table
-        table.close()
-
-        # Create a DataFrame from the records
-        if records:
-            df = pd.DataFrame(records, columns=field_names)
+    if 'blobs' not in st.session_state:
+        st.session_state.blobs = SessionBlobs(get_store())
+    return st.session_state.blobs
+
+
+def apply_update_result(result):
+    """Keep a finished update's outputs in the session for the report and download sections"""
+    blobs = session_blobs()
+    st.session_state.jle_data = result['jle_data']
+    st.session_state.df = result['df']
+    blobs.assign('updated_dbf', result['updated_dbf_key'])
+    if result['report_key'] is not None:
+        blobs.assign('report', result['report_key'])
+        st.session_state.word_filename = result['report_name']
+        st.session_state.word_report_generated = True
+        st.session_state.docx_from_word_filename = result['report_name']
+        st.session_state.docx_from_word_generated = True
+
+
+def show_reconciliation(reconciliation):
+    """Rows that matched nothing on the other side and IDs listed more than once"""
+    excel_only = reconciliation['excel_only']
+    dbf_only = reconciliation['dbf_only']
+    duplicate_excel = reconciliation['duplicate_excel_ids']
+    duplicate_dbf = reconciliation['duplicate_dbf_ids']
+    if not (excel_only or dbf_only or duplicate_excel or duplicate_dbf):
+        return
+
+    st.warning(f"{len(excel_only)} Excel row(s) matched no DBF record, {len(dbf_only)} DBF record(s) matched no "
+               f"Excel row, {len(duplicate_excel) + len(duplicate_dbf)} ID(s) appear more than once.")
+    with st.expander("🔎 Unmatched and duplicate IDs", expanded=False):
+        if excel_only:
+            st.markdown("**In the Excel file only**")
+            st.dataframe(pd.DataFrame(excel_only, columns=['Row', 'ID']), use_container_width=True, hide_index=True)
+        if dbf_only:
+            st.markdown("**In the DBF only**")
+            st.dataframe(pd.DataFrame(dbf_only, columns=['Record', 'ID', 'Name']), use_container_width=True, hide_index=True)
+        if duplicate_excel:
+            st.markdown("**Repeated in the Excel file** (the last row's grade is posted)")
+            st.dataframe(pd.DataFrame([(id_str, ', '.join(map(str, rows))) for id_str, rows in duplicate_excel.items()],
+                                      columns=['ID', 'Rows']), use_container_width=True, hide_index=True)
+        if duplicate_dbf:
+            st.markdown("**Repeated in the DBF** (every record is updated)")
+            st.dataframe(pd.DataFrame([(id_str, ', '.join(map(str, records))) for id_str, records in duplicate_dbf.items()],
+                                      columns=['ID', 'Records']), use_container_width=True, hide_index=True)
+
+
+def show_update_job(job_id):
+    """Progress of the session's Update DBF job while it runs, its results once it is done"""
+    job = jobs.get_job(job_id)
+    if job is None:
+        st.warning("The last update is no longer available (it expired or the server restarted). Please run it again.")
+        del st.session_state.update_job_id
+        return
+    if not job.finished:
+        show_update_job_progress(job_id)
+        return
+
+    if job.status == 'failed':
+        st.error(f"Error processing files: {job.error}")
+        st.error(f"Full error details: {job.error_details}")
+    else:
+        result = job.result
+        # Results are copied into the session once; later reruns only redisplay them
+        if st.session_state.get('update_job_applied') != job_id:
+            apply_update_result(result)
+            st.session_state.update_job_applied = job_id
+
+        changes = result['changes']
+        if result['matched'] > 0:
+            st.success(f"Successfully processed! Matched {result['matched']} rows, {len(changes)} field(s) changed.")
+            if changes:
+                with st.expander("📝 Change log", expanded=False):
+                    st.dataframe(pd.DataFrame(changes, columns=['ID', 'Field', 'Old', 'New']),
+                                 use_container_width=True, hide_index=True)
+            else:
+                st.info("The DBF already holds these grades; nothing was changed.")
         else:
-            # If no records, create empty dataframe with proper columns
-            df = pd.DataFrame(columns=field_names)
-        return df
-
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_dbf_path):
-            try:
-                os.remove(temp_dbf_path)
-            except Exception:
-                pass
-
-
-
-
-
-
+            st.warning(f"Files processed but no matches found. This might indicate that the ID values in your Excel file don't match those in your DBF file.")
+        show_reconciliation(result['reconciliation'])
+
+        # Provide download link for the updated DBF file
+        st.download_button(
+            label="Download Updated DBF",
+            data=get_store().get(result['updated_dbf_key']),
+            file_name=result['dbf_name'],
+            mime="application/octet-stream",
+            key="download_updated_dbf_btn"
+        )
+
+        # Show DBF viewer after update
+        with st.container(border=True):
+            st.subheader("📋 Updated DBF Content")
+            st.dataframe(result['df'], use_container_width=True, height=400)
 
+    for level, text in job.messages:
+        getattr(st, level)(text)
+    if job.status == 'done' and job.result['report_key'] is not None:
+        st.success("Word report generated successfully!")
 
+    if job.trace is not None:
+        show_performance_panel(job.trace)
 
 
 def main():
@@ -388,20 +218,28 @@ def main():
                     else:
                         st.success(f"✅ Found {len(dbf_candidates)} DBF file(s)")
 
-                        # Store JLE file and DBF candidates in session state for Step 3
-                        st.session_state.jle_file = jle_file
-                        st.session_state.dbf_candidates = dbf_candidates
+                        # Store JLE and DBF contents in the session's blobs for Step 3
+                        blobs = session_blobs()
+                        blobs['jle'] = jle_file.getvalue()
+                        st.session_state.jle_filename = jle_file.name
+                        dbf_names = [file.name for file in dbf_candidates]
+                        for file in dbf_candidates:
+                            blobs[f'dbf:{file.name}'] = file.getvalue()
+                        for name in blobs.names():
+                            if name.startswith('dbf:') and name[4:] not in dbf_names:
+                                blobs.discard(name)
+                        st.session_state.dbf_names = dbf_names
 
     with col2:
         with st.container(border=True):
             st.subheader("📊 Step 2: Upload Excel File")
 
-            excel_file = st.file_uploader("E-Class Record (Excel)", type=['xlsx', 'xlsm', 'xls'], key='excel')
+            excel_file = st.file_uploader("E-Class Record (Excel)", type=['xlsx', 'xlsm', 'xls', 'ods', 'csv'], key='excel')
 
             if excel_file:
                 st.success(f"✅ Excel file: {excel_file.name}")
-                # Store Excel file content in session state (not the file object itself)
-                st.session_state.excel_content = excel_file.getvalue()
+                # Store Excel file content in the session's blobs (not the file object itself)
+                session_blobs()['excel'] = excel_file.getvalue()
                 st.session_state.excel_filename = excel_file.name
             else:
                 st.info("ℹ️ Please upload your Excel file with grades and remarks")
@@ -410,38 +248,17 @@ def main():
     if selected_dbf_name and jle_file:
         try:
             # Extract parts from selected DBF filename to check for match
-            import re
-            parts = selected_dbf_name.replace('.DBF', '').replace('.dbf', '').split('_')
-            if len(parts) >= 4:
-                year_semester = parts[1]  # YYYYX
-                subj_num = parts[2]       # SUBJNUM
-                subj_code = parts[3]      # SUBJCODE
-
-                # Check against JLE data
-                jle_data = extract_jle_data(io.BytesIO(jle_file.getvalue()))
+            from course_index import dbf_course_key, find_course
+            if dbf_course_key(selected_dbf_name) is not None:
+                # Check against JLE data (served from the parse cache on reruns)
+                jle_data = cached_jle_data(jle_file.getvalue(), jle_file.name)
 
                 if 'course_data' in jle_data and jle_data['course_data'] is not None and not jle_data['course_data'].empty:
-                    jle_df = jle_data['course_data']
-
-                    match_found = False
-                    for _, jle_record in jle_df.iterrows():
-                        jle_academic_year = jle_record.get('Academic Year', '')  # Full format like "2024-2025"
-                        if jle_academic_year:
-                            jle_year = jle_academic_year.split('-')[0]  # Get first part like "2024"
-                            from reports import get_semester_digit
-                            jle_year_semester = f"{jle_year}{get_semester_digit(jle_record.get('Semester', ''))}"  # Full format like "20243"
-                            jle_subj_num = jle_record.get('Subject Num', '')
-                            jle_subj_code = jle_record.get('Subject Code', '')
-
-                            # Check if the components match
-                            if (year_semester == jle_year_semester and
-                                subj_num == jle_subj_num and
-                                subj_code == jle_subj_code):
-                                match_found = True
-                                st.success(f"✓ Match: {jle_subj_code}")
-                                break
-
-                    if not match_found:
+                    # Single lookup in the course index built when the JLE was parsed
+                    jle_record = find_course(jle_data, selected_dbf_name)
+                    if jle_record is not None:
+                        st.success(f"✓ Match: {jle_record.get('Subject Code', '')}")
+                    else:
                         st.error("✗ No match")
                 else:
                     st.text("?")
@@ -458,258 +275,138 @@ def main():
 
         with col1:
             if st.button("🔄 Clear All", type="secondary"):
-                # Clear session state variables
-                if 'selected_dbf_file' in st.session_state:
-                    del st.session_state.selected_dbf_file
+                # Clear session state variables (the blobs hold the uploads, updated DBF, report and batch ZIP)
+                session_blobs().clear()
+                if 'jle_filename' in st.session_state:
+                    del st.session_state.jle_filename
+                if 'dbf_names' in st.session_state:
+                    del st.session_state.dbf_names
                 if 'selected_dbf_name' in st.session_state:
                     del st.session_state.selected_dbf_name
                 if 'excel' in st.session_state:
                     del st.session_state.excel
                 if 'df' in st.session_state:
                     del st.session_state.df
-                if 'updated_dbf_bytes' in st.session_state:
-                    del st.session_state.updated_dbf_bytes
                 if 'jle_data' in st.session_state:
                     del st.session_state.jle_data
-                if 'word_bytes' in st.session_state:
-                    del st.session_state.word_bytes
                 if 'word_filename' in st.session_state:
                     del st.session_state.word_filename
                 if 'word_report_generated' in st.session_state:
                     del st.session_state.word_report_generated
-                if 'docx_from_word_bytes' in st.session_state:
-                    del st.session_state.docx_from_word_bytes
                 if 'docx_from_word_filename' in st.session_state:
                     del st.session_state.docx_from_word_filename
                 if 'docx_from_word_generated' in st.session_state:
                     del st.session_state.docx_from_word_generated
+                if 'batch_summary' in st.session_state:
+                    del st.session_state.batch_summary
+                if 'update_job_id' in st.session_state:
+                    del st.session_state.update_job_id
+                if 'update_job_applied' in st.session_state:
+                    del st.session_state.update_job_applied
                 st.rerun()
 
     # Step 3: Select DBF file and update
     with st.container(border=True):
         st.subheader("🔄 Step 3: Select DBF File and Update")
 
-        # Check if we have DBF candidates stored in session state
-        if 'dbf_candidates' in st.session_state and st.session_state.dbf_candidates:
-            # Create a dropdown to select the DBF file
-            dbf_options = [file.name for file in st.session_state.dbf_candidates]
-            selected_dbf_name = st.selectbox("Select DBF file to process:", dbf_options)
+        blobs = session_blobs()
 
-            if selected_dbf_name:
-                # Find the selected DBF file
-                for file in st.session_state.dbf_candidates:
-                    if file.name == selected_dbf_name:
-                        selected_dbf_file = file
-                        break
+        # Check if we have DBF files stored in the session
+        if st.session_state.get('dbf_names'):
+            # Create a dropdown to select the DBF file
+            selected_dbf_name = st.selectbox("Select DBF file to process:", st.session_state.dbf_names)
 
-                if selected_dbf_file:
-                    st.success(f"✅ DBF file selected: {selected_dbf_name}")
+            if selected_dbf_name and f'dbf:{selected_dbf_name}' in blobs:
+                st.success(f"✅ DBF file selected: {selected_dbf_name}")
 
-                    # Store in session state
-                    st.session_state.selected_dbf_file = selected_dbf_file
-                    st.session_state.selected_dbf_name = selected_dbf_name
+                # Store in session state
+                st.session_state.selected_dbf_name = selected_dbf_name
 
             # Update DBF button in this card
             if st.button("📊 Update DBF", type="primary", key="update_dbf_step3"):
                 # Check if all required files are provided
-                if ('selected_dbf_file' not in st.session_state or
-                    'excel_content' not in st.session_state or
-                    'jle_file' not in st.session_state):
+                if ('selected_dbf_name' not in st.session_state or
+                    'excel' not in blobs or
+                    'jle' not in blobs):
                     st.warning("Please upload JLE and DBF files, select a DBF file, and upload an Excel file.")
                 else:
-                    try:
-                        with st.spinner('Processing files...'):
-                            # Get the JLE file from session state (in the multiple file approach)
-                            if 'jle_file' in st.session_state and st.session_state.jle_file:
-                                jle_content = st.session_state.jle_file.getvalue()
-                                jle_filename = st.session_state.jle_file.name
-                            else:
-                                st.error("JLE file not found. Please re-upload your files.")
-                                st.stop()
-
-                            # Create temporary files for the JLE and selected DBF content
-                            with tempfile.NamedTemporaryFile(delete=False, suffix='.jle') as tmp_jle:
-                                tmp_jle.write(jle_content)
-                                jle_path = tmp_jle.name
-
-                            with tempfile.NamedTemporaryFile(delete=False, suffix='.dbf') as tmp_dbf:
-                                # Write the content of the selected DBF file
-                                dbf_content = st.session_state.selected_dbf_file.getvalue()
-                                tmp_dbf.write(dbf_content)
-                                dbf_path = tmp_dbf.name
-
-                            try:
-                                # Extract data from JLE file
-                                from config import extract_jle_data
-                                # Create a file-like object for the JLE content
-                                import io
-                                jle_file_obj = io.BytesIO(jle_content)
-                                jle_file_obj.name = jle_filename or 'extracted.jle'  # Set the original name
-                                jle_data = extract_jle_data(jle_file_obj)
-
-                                # Store JLE data in session state
-                                st.session_state.jle_data = jle_data
-
-                                # Process the files with JLE data
-                                # Recreate Excel file object from stored content
-                                import io
-                                excel_file_bytes = st.session_state.excel_content
-                                excel_file_obj = io.BytesIO(excel_file_bytes)
-                                excel_file_obj.name = st.session_state.get('excel_filename', 'excel_upload.xlsx')
-
-                                selected_dbf_file = st.session_state.selected_dbf_file
-
-                                # Get the DBF content
-                                dbf_content = selected_dbf_file.getvalue()
-
-                                # We need to create a file-like object for the DBF content
-                                dbf_file_obj = io.BytesIO(dbf_content)
-                                dbf_file_obj.name = st.session_state.selected_dbf_name
-
-                                updated_dbf_bytes, matched_count = process_files_with_jle(jle_data, excel_file_obj, dbf_file_obj, st.session_state.selected_dbf_name)
-
-                                if matched_count > 0:
-                                    st.success(f"Successfully processed! Matched and updated {matched_count} rows.")
-                                else:
-                                    st.warning(f"Files processed but no matches found. This might indicate that the ID values in your Excel file don't match those in your DBF file.")
-
-                                # Use the selected DBF filename as output
-                                output_filename = st.session_state.selected_dbf_name
-
-                                # Provide download link for the updated DBF file
-                                st.download_button(
-                                    label="Download Updated DBF",
-                                    data=updated_dbf_bytes,
-                                    file_name=output_filename,
-                                    mime="application/octet-stream"
-                                )
-
-                                # Show DBF viewer after update
-                                with st.container(border=True):
-                                    st.subheader("📋 Updated DBF Content")
-                                    try:
-                                        df = read_dbf_to_dataframe(updated_dbf_bytes)
-
-                                        # Display the dataframe
-                                        st.dataframe(df, use_container_width=True, height=400)
-
-                                        # Store the dataframe in session state for later use
-                                        st.session_state.df = df
-                                        st.session_state.updated_dbf_bytes = updated_dbf_bytes
-
-                                    except Exception as e:
-                                        st.error(f"Could not display DBF content: {str(e)}")
-
-                            finally:
-                                # Clean up temporary files
-                                try:
-                                    os.unlink(jle_path)
-                                    os.unlink(dbf_path)
-                                except:
-                                    pass  # Ignore errors during cleanup
-
-                    except Exception as e:
-                        st.error(f"Error processing files: {str(e)}")
-                        # Optionally log the full traceback for debugging
-                        import traceback
-                        st.error(f"Full error details: {traceback.format_exc()}")
-
-                    # After successful update, automatically generate Word report from template and convert to PDF
-                    if 'df' in st.session_state and st.session_state.df is not None:
-                        df = st.session_state.df
-
-                        # Get JLE data if available
-                        jle_data = st.session_state.get('jle_data', None) if 'jle_data' in st.session_state else None
-
-                        # Generate Word report from template and convert to PDF
-                        with st.spinner('Generating Word report from template and converting to PDF...'):
-                            try:
-                                # Check if we have JLE data to use the new matching functionality
-                                if jle_data:
-                                    # Use the new JLE/DBF matching functionality with uploaded files
-                                    from reports import generate_word_report_from_jle_and_uploaded_dbf, find_matching_dbf_from_jle_data
-                                    # Use the original DBF filename for pattern matching
-                                    original_dbf_filename = st.session_state.selected_dbf_name if 'selected_dbf_name' in st.session_state else None
-
-                                    # Debug: Show what we're trying to match
-                                    if original_dbf_filename:
-                                        import re
-                                        parts = original_dbf_filename.replace('.DBF', '').replace('.dbf', '').split('_')
-                                        if len(parts) >= 4:
-                                            st.info(f"🔍 Attempting to match: Year/Sem={parts[1]}, SubjNum={parts[2]}, SubjCode={parts[3]}")
-
-                                    # Debug: Show what courses are available in JLE data
-                                    if 'course_data' in jle_data and jle_data['course_data'] is not None and not jle_data['course_data'].empty:
-                                        jle_df = jle_data['course_data']
-                                        st.info(f"📚 JLE contains {len(jle_df)} course(s): {[row['Subject Code'] + '(' + row['Subject Num'] + ')' for _, row in jle_df.iterrows()]}")
-
-                                    word_bytes = generate_word_report_from_jle_and_uploaded_dbf(jle_data, original_dbf_filename, df)
-
-                                    # Check if matching failed by looking for error indicators in the generated document
-                                    import zipfile
-                                    import io
-
-                                    # Extract the document content to check for matching failure
-                                    with zipfile.ZipFile(io.BytesIO(word_bytes)) as docx_zip:
-                                        # Read the main document XML
-                                        doc_xml = docx_zip.read('word/document.xml')
-                                        doc_content = doc_xml.decode('utf-8', errors='ignore')
-
-                                        # Check if error indicators are present (meaning matching failed)
-                                        if 'NO MATCH FOUND' in doc_content:
-                                            st.warning("⚠️ Warning: Could not match DBF file with JLE data. Please verify your file naming conventions follow the pattern: ORG_YYYYX_SUBJNUM_SUBJCODE_ID.DBF")
-                                        else:
-                                            # If matching succeeded, let's also check headers/footers
-                                            try:
-                                                header_footer_content = ""
-                                                if 'word/header1.xml' in docx_zip.namelist():
-                                                    header_content = docx_zip.read('word/header1.xml').decode('utf-8', errors='ignore')
-                                                    header_footer_content += header_content
-                                                if 'word/footer1.xml' in docx_zip.namelist():
-                                                    footer_content = docx_zip.read('word/footer1.xml').decode('utf-8', errors='ignore')
-                                                    header_footer_content += footer_content
-
-                                                # Check if [Insert] placeholders still exist in headers/footers (meaning replacement failed there)
-                                                import re
-                                                remaining_placeholders = re.findall(r'\[Insert [^\]]*\]', header_footer_content)
-                                                if remaining_placeholders:
-                                                    st.warning(f"⚠️ Warning: Found {len(remaining_placeholders)} unfilled placeholders in headers/footers: {list(set(remaining_placeholders))[:5]}...")  # Show first 5 unique
-                                                    st.info("This may indicate the template doesn't have the expected [Insert *] placeholders in headers/footers")
-                                            except:
-                                                pass  # If there's an issue reading headers/footers, continue anyway
-                                else:
-                                    # Use the original functionality
-                                    word_bytes = generate_word_report(df, jle_data)
-
-                                # Store the Word doc in session state
-                                st.session_state.word_bytes = word_bytes
-                                # Use Excel filename for the generated Word document
-                                excel_filename = st.session_state.get('excel_filename', 'unknown')
-                                # Remove the extension and add .docx
-                                base_name = excel_filename.rsplit('.', 1)[0] if '.' in excel_filename else excel_filename
-                                st.session_state.word_filename = f"{base_name}_report.docx"
-                                st.session_state.word_report_generated = True
-
-                                # Store the Word document bytes directly
-                                docx_from_word_bytes = word_bytes
-
-                                # Store the DOCX from Word in session state
-                                st.session_state.docx_from_word_bytes = docx_from_word_bytes
-                                # Use Excel filename for the generated Word document
-                                excel_filename = st.session_state.get('excel_filename', 'unknown')
-                                # Remove the extension and add .docx
-                                base_name = excel_filename.rsplit('.', 1)[0] if '.' in excel_filename else excel_filename
-                                st.session_state.docx_from_word_filename = f"{base_name}_report.docx"
-                                st.session_state.docx_from_word_generated = True
-
-                                st.success("Word report generated successfully!")
-
-                            except Exception as e:
-                                st.error(f"Error generating Word report: {str(e)}")
+                    # Run the whole chain in a background job; only its ID lives in the
+                    # session, so other widgets can rerun the page without cancelling it
+                    st.session_state.update_job_id = jobs.submit(
+                        'update_dbf', jobs.UPDATE_DBF_STAGES, jobs.run_update_dbf,
+                        blobs['jle'], st.session_state.jle_filename,
+                        blobs['excel'], st.session_state.get('excel_filename', 'excel_upload.xlsx'),
+                        blobs[f'dbf:{st.session_state.selected_dbf_name}'], st.session_state.selected_dbf_name)
+
+            if 'update_job_id' in st.session_state:
+                show_update_job(st.session_state.update_job_id)
 
         else:
             st.info("Please upload a RAR file with JLE and DBF files first.")
 
+    # Batch mode: update every uploaded DBF against its own Excel record in one run
+    with st.container(border=True):
+        st.subheader("📦 Batch: Update All DBF Files")
+        st.markdown("Upload one Excel record per section. Files are paired by SUBJNUM "
+                    "(e.g. `2506B.xlsm` → `DSO_20243_2506B_BACC104_565.DBF`).")
+
+        batch_excel_files = st.file_uploader(
+            "E-Class Records (Excel)",
+            type=['xlsx', 'xlsm', 'xls', 'ods', 'csv'],
+            accept_multiple_files=True,
+            key='batch_excel'
+        )
+
+        if st.button("📦 Update All DBFs", type="primary", key="update_all_dbf"):
+            if ('jle' not in blobs or
+                not st.session_state.get('dbf_names') or
+                not batch_excel_files):
+                st.warning("Please upload the JLE and DBF files in Step 1 and at least one Excel file here.")
+            else:
+                try:
+                    with st.spinner('Processing all sections...'):
+                        from batch import run_batch
+
+                        jle_data = cached_jle_data(blobs['jle'], st.session_state.jle_filename)
+
+                        dbf_files = {name: blobs[f'dbf:{name}'] for name in st.session_state.dbf_names}
+                        excel_files = {file.name: file.getvalue() for file in batch_excel_files}
+
+                        zip_bytes, summary = run_batch(jle_data, dbf_files, excel_files)
+
+                    blobs['batch_zip'] = zip_bytes
+                    st.session_state.batch_summary = summary
+                except Exception as e:
+                    st.error(f"Error processing batch: {str(e)}")
+
+        if 'batch_summary' in st.session_state:
+            summary = st.session_state.batch_summary
+            processed = len(summary['sheets']) - summary['failed']
+            st.success(f"Processed {processed} sheet(s), {summary['total_matched']} student row(s) matched, "
+                       f"{summary['total_changes']} field(s) changed.")
+            # One row per sheet; the full change log and unmatched IDs are in batch_summary.json inside the ZIP
+            sheet_rows = [dict(sheet, changes=len(sheet['changes']), excel_only=len(sheet['excel_only']),
+                               dbf_only=len(sheet['dbf_only']),
+                               duplicate_excel_ids=len(sheet['duplicate_excel_ids']),
+                               duplicate_dbf_ids=len(sheet['duplicate_dbf_ids']))
+                          for sheet in summary['sheets']]
+            st.dataframe(pd.DataFrame(sheet_rows), use_container_width=True)
+            for sheet in summary['sheets']:
+                if sheet['error']:
+                    st.error(f"{sheet['dbf_name']}: {sheet['error']}")
+            if summary['unpaired_dbf']:
+                st.warning(f"No Excel record found for: {', '.join(summary['unpaired_dbf'])}")
+            if summary['unpaired_excel']:
+                st.warning(f"No DBF file found for: {', '.join(summary['unpaired_excel'])}")
+
+            st.download_button(
+                label="📥 Download All (ZIP)",
+                data=blobs['batch_zip'],
+                file_name="updated_grade_sheets.zip",
+                mime="application/zip",
+                key="download_batch_zip_btn"
+            )
+
 
 
 
@@ -721,7 +418,7 @@ def main():
         jle_data = st.session_state.get('jle_data', None) if 'jle_data' in st.session_state else None
 
         # Show DOCX from Word report if it was generated
-        if st.session_state.get('docx_from_word_generated', False) and 'docx_from_word_bytes' in st.session_state:
+        if st.session_state.get('docx_from_word_generated', False) and 'report' in blobs:
             # Show DOCX download button
             with st.container(border=True):
                 st.subheader("📄 Generated DOCX Report")
@@ -729,7 +426,7 @@ def main():
                 # Download button for DOCX from Word
                 st.download_button(
                     label="📥 Download DOCX Report",
-                    data=st.session_state.docx_from_word_bytes,
+                    data=blobs['report'],
                     file_name=st.session_state.docx_from_word_filename,
                     mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                     key="download_docx_from_word_btn"
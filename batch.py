@@ -0,0 +1,192 @@
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from course_index import parse_dbf_filename
+
+
+def _filename_tokens(filename):
+    """Upper-cased alphanumeric tokens of a filename without its extension"""
+    stem = os.path.basename(filename).rsplit('.', 1)[0]
+    return set(token for token in re.split(r'[^A-Za-z0-9]+', stem.upper()) if token)
+
+
+def pair_files(dbf_names, excel_names):
+    """
+    Pair each DBF grade sheet with the Excel class record for the same section.
+
+    An Excel file belongs to a DBF when its name contains the DBF's SUBJNUM
+    (e.g. "2506B.xlsm" for DSO_20243_2506B_BACC104_565.DBF). When several
+    Excel files carry the same SUBJNUM, the one that also names the SUBJCODE
+    wins; anything still ambiguous is left unpaired rather than guessed.
+
+    Returns:
+        tuple: (list of (dbf_name, excel_name) pairs, unpaired DBF names, unpaired Excel names)
+    """
+    excel_tokens = {name: _filename_tokens(name) for name in excel_names}
+    used_excel = set()
+    pairs = []
+    unpaired_dbf = []
+
+    for dbf_name in dbf_names:
+        meta = parse_dbf_filename(dbf_name)
+        if meta is None:
+            unpaired_dbf.append(dbf_name)
+            continue
+
+        subj_num = meta['subj_num'].upper()
+        subj_code = meta['subj_code'].upper()
+        candidates = [name for name, tokens in excel_tokens.items()
+                      if name not in used_excel and subj_num in tokens]
+        if len(candidates) > 1:
+            candidates = [name for name in candidates if subj_code in excel_tokens[name]]
+
+        if len(candidates) == 1:
+            pairs.append((dbf_name, candidates[0]))
+            used_excel.add(candidates[0])
+        else:
+            unpaired_dbf.append(dbf_name)
+
+    unpaired_excel = [name for name in excel_names if name not in used_excel]
+    return pairs, unpaired_dbf, unpaired_excel
+
+
+def report_filename(excel_filename):
+    """Name of the Word report generated for an Excel class record"""
+    base_name = excel_filename.rsplit('.', 1)[0] if '.' in excel_filename else excel_filename
+    return f"{base_name}_report.docx"
+
+
+def process_pair(jle_data, dbf_name, dbf_bytes, excel_name, excel_bytes, template_path=None, make_report=True):
+    """
+    Update one DBF grade sheet and render its Word report (unless make_report is False).
+    Runs inside a worker process, so it only takes and returns plain data.
+
+    Returns:
+        dict: dbf_name, excel_name, matched, changes ((ID, field, old, new) list),
+              excel_only, dbf_only, duplicate_excel_ids, duplicate_dbf_ids (see
+              dbf_update.reconcile_grades), dbf_bytes, report_name, report_bytes,
+              error and timings (seconds per stage)
+    """
+    # Imported here so the parent process doesn't pay for python-docx/openpyxl
+    # until a worker actually needs them
+    from pipeline import reconcile_files_with_jle, read_dbf_to_dataframe
+    from reports import generate_word_report_from_jle_and_uploaded_dbf
+
+    result = {
+        'dbf_name': dbf_name,
+        'excel_name': excel_name,
+        'matched': 0,
+        'changes': [],
+        'excel_only': [],
+        'dbf_only': [],
+        'duplicate_excel_ids': {},
+        'duplicate_dbf_ids': {},
+        'dbf_bytes': None,
+        'report_name': None,
+        'report_bytes': None,
+        'error': None,
+        'timings': {},
+    }
+    try:
+        excel_file_obj = io.BytesIO(excel_bytes)
+        excel_file_obj.name = excel_name
+        dbf_file_obj = io.BytesIO(dbf_bytes)
+        dbf_file_obj.name = dbf_name
+
+        start = time.perf_counter()
+        updated_dbf_bytes, reconciliation = reconcile_files_with_jle(jle_data, excel_file_obj, dbf_file_obj, dbf_name)
+        result['timings']['update'] = time.perf_counter() - start
+        result['dbf_bytes'] = updated_dbf_bytes
+        result.update(reconciliation)
+
+        if make_report:
+            start = time.perf_counter()
+            df = read_dbf_to_dataframe(updated_dbf_bytes)
+            result['report_bytes'] = generate_word_report_from_jle_and_uploaded_dbf(jle_data, dbf_name, df, template_path)
+            result['report_name'] = report_filename(excel_name)
+            result['timings']['report'] = time.perf_counter() - start
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def process_pairs(jobs, max_workers=None):
+    """
+    Run process_pair over a list of argument tuples, in parallel worker
+    processes when there is more than one job
+
+    Returns:
+        list: process_pair results, in job order
+    """
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+
+    if len(jobs) <= 1 or max_workers <= 1:
+        # Not worth starting a pool for a single section
+        return [process_pair(*job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(process_pair, *zip(*jobs)))
+
+
+def run_batch(jle_data, dbf_files, excel_files, max_workers=None, template_path=None):
+    """
+    Update every DBF grade sheet against its paired Excel class record and
+    bundle the updated DBFs and Word reports into one ZIP.
+
+    Pairs are processed in parallel worker processes.
+
+    Args:
+        jle_data: Parsed JLE info as returned by config.extract_jle_data
+        dbf_files: dict of DBF filename -> bytes
+        excel_files: dict of Excel filename -> bytes
+        max_workers: Worker process count (defaults to one per pair, capped at the CPU count)
+
+    Returns:
+        tuple: (zip_bytes, summary dict)
+    """
+    pairs, unpaired_dbf, unpaired_excel = pair_files(list(dbf_files), list(excel_files))
+
+    jobs = [(jle_data, dbf_name, dbf_files[dbf_name], excel_name, excel_files[excel_name], template_path)
+            for dbf_name, excel_name in pairs]
+
+    results = process_pairs(jobs, max_workers)
+
+    summary = {
+        'sheets': [
+            {
+                'dbf_name': r['dbf_name'],
+                'excel_name': r['excel_name'],
+                'matched': r['matched'],
+                'changes': r['changes'],
+                'excel_only': r['excel_only'],
+                'dbf_only': r['dbf_only'],
+                'duplicate_excel_ids': r['duplicate_excel_ids'],
+                'duplicate_dbf_ids': r['duplicate_dbf_ids'],
+                'report_name': r['report_name'],
+                'error': r['error'],
+            }
+            for r in results
+        ],
+        'unpaired_dbf': unpaired_dbf,
+        'unpaired_excel': unpaired_excel,
+        'total_matched': sum(r['matched'] for r in results),
+        'total_changes': sum(len(r['changes']) for r in results),
+        'failed': sum(1 for r in results if r['error']),
+    }
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for r in results:
+            if r['dbf_bytes'] is not None:
+                zf.writestr(r['dbf_name'], r['dbf_bytes'])
+            if r['report_bytes'] is not None:
+                zf.writestr(r['report_name'], r['report_bytes'])
+        zf.writestr('batch_summary.json', json.dumps(summary, indent=2))
+
+    return buffer.getvalue(), summary
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JLE, DBF, Excel and DOCX stages on synthetic data.
+
+Generates deterministic VFP JLE/DBF files and FFG workbooks (see
+synthetic_data.py) at each size and times every stage, clearing the parse
+cache before each run so parsing is really measured:
+
+    python benchmark.py --sizes 10 100 1000 10000 100000 --repeat 3 --out bench.json
+
+Results are JSON: per stage and size, every run's seconds, the min and
+median, microseconds per row and the per-span breakdown of the fastest run.
+
+With --backends, the workbook reader backends are compared instead: the
+same FFG sheet is read as .xlsx by every installed .xlsx backend and as its
+.ods and .csv exports (see workbook_readers.FASTEST_FIRST).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import perf
+import synthetic_data
+import workbook_readers
+from parse_cache import get_cache
+
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+STAGES = [
+    'extract_jle_data',
+    'process_files_with_jle',
+    'read_dbf_to_dataframe',
+    'generate_word_report_from_jle_and_uploaded_dbf',
+    'generate_word_report',
+    'generate_word_report_from_jle_data',
+    'generate_word_report_from_jle_dbf',
+]
+
+
+def _named_bytes(name, data):
+    file_obj = io.BytesIO(data)
+    file_obj.name = name
+    return file_obj
+
+
+def prepare(size, work_dir, seed=0):
+    """
+    Generate the inputs for one size and the state every stage needs.
+    The directory-based report functions find the DBF in work_dir.
+    """
+    from config import extract_jle_data
+    from pipeline import process_files_with_jle, read_dbf_to_dataframe
+
+    dataset = synthetic_data.make_dataset(size, seed)
+    jle_name, jle_bytes = dataset['jle']
+    dbf_name, dbf_bytes = dataset['dbf']
+    excel_name, excel_bytes = dataset['excel']
+
+    for name in os.listdir(work_dir):
+        os.remove(os.path.join(work_dir, name))
+    jle_path = os.path.join(work_dir, jle_name)
+    with open(jle_path, 'wb') as f:
+        f.write(jle_bytes)
+
+    jle_data = extract_jle_data(_named_bytes(jle_name, jle_bytes))
+    updated_dbf_bytes, _ = process_files_with_jle(jle_data, _named_bytes(excel_name, excel_bytes),
+                                                  _named_bytes(dbf_name, dbf_bytes), dbf_name)
+    with open(os.path.join(work_dir, dbf_name), 'wb') as f:
+        f.write(updated_dbf_bytes)
+
+    return {
+        'size': size,
+        'work_dir': work_dir,
+        'jle_name': jle_name, 'jle_bytes': jle_bytes, 'jle_path': jle_path, 'jle_data': jle_data,
+        'dbf_name': dbf_name, 'dbf_bytes': dbf_bytes, 'updated_dbf_bytes': updated_dbf_bytes,
+        'excel_name': excel_name, 'excel_bytes': excel_bytes,
+        'df': read_dbf_to_dataframe(updated_dbf_bytes),
+    }
+
+
+def stage_call(stage, state):
+    """(callable running the stage once, bytes of input it reads)"""
+    from config import extract_jle_data
+    from pipeline import process_files_with_jle, read_dbf_to_dataframe
+    import reports
+
+    if stage == 'extract_jle_data':
+        return (lambda: extract_jle_data(_named_bytes(state['jle_name'], state['jle_bytes']))), len(state['jle_bytes'])
+    if stage == 'process_files_with_jle':
+        return (lambda: process_files_with_jle(
+            state['jle_data'], _named_bytes(state['excel_name'], state['excel_bytes']),
+            _named_bytes(state['dbf_name'], state['dbf_bytes']), state['dbf_name'])), \
+            len(state['excel_bytes']) + len(state['dbf_bytes'])
+    if stage == 'read_dbf_to_dataframe':
+        return (lambda: read_dbf_to_dataframe(state['updated_dbf_bytes'])), len(state['updated_dbf_bytes'])
+    if stage == 'generate_word_report_from_jle_and_uploaded_dbf':
+        return (lambda: reports.generate_word_report_from_jle_and_uploaded_dbf(
+            state['jle_data'], state['dbf_name'], state['df'])), len(state['updated_dbf_bytes'])
+    if stage == 'generate_word_report':
+        return (lambda: reports.generate_word_report(state['df'], state['jle_data'])), len(state['updated_dbf_bytes'])
+    if stage == 'generate_word_report_from_jle_data':
+        return (lambda: reports.generate_word_report_from_jle_data(state['jle_data'], dbf_directory=state['work_dir'])), \
+            len(state['updated_dbf_bytes'])
+    if stage == 'generate_word_report_from_jle_dbf':
+        return (lambda: reports.generate_word_report_from_jle_dbf(state['jle_path'], dbf_directory=state['work_dir'])), \
+            len(state['jle_bytes']) + len(state['updated_dbf_bytes'])
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def time_stage(stage, state, repeat, memory=False):
+    """Run one stage `repeat` times on cold parse caches and summarize the runs"""
+    run, input_bytes = stage_call(stage, state)
+    runs = []
+    fastest = None
+    for _ in range(repeat):
+        get_cache().clear()
+        with perf.trace(stage, memory=memory) as t:
+            run()
+        record = t.to_dict()
+        runs.append(record['spans'][0]['wall_s'])
+        if fastest is None or runs[-1] <= fastest['spans'][0]['wall_s']:
+            fastest = record
+
+    breakdown = {}
+    for span in fastest['spans'][1:]:
+        breakdown[span['name']] = breakdown.get(span['name'], 0.0) + span['wall_s']
+
+    result = {
+        'stage': stage,
+        'size': state['size'],
+        'input_bytes': input_bytes,
+        'runs_s': runs,
+        'min_s': min(runs),
+        'median_s': statistics.median(runs),
+        'per_row_us': min(runs) / state['size'] * 1e6,
+        'breakdown_s': breakdown,
+    }
+    if memory:
+        result['peak_bytes'] = fastest['spans'][0]['peak_bytes']
+    return result
+
+
+def environment():
+    versions = {}
+    for module in ('pandas', 'numpy', 'openpyxl', 'xlrd', 'dbf', 'docx', 'lxml'):
+        try:
+            versions[module] = getattr(__import__(module), '__version__', 'unknown')
+        except ImportError:
+            versions[module] = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, repeat=3, seed=0, memory=False, progress=None):
+    """
+    Time every stage at every size
+
+    Returns:
+        dict: JSON-serializable results with the environment they ran in
+    """
+    results = []
+    generation = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            start = time.perf_counter()
+            state = prepare(size, work_dir, seed)
+            generation.append({'size': size, 'seconds': time.perf_counter() - start})
+            for stage in stages:
+                result = time_stage(stage, state, repeat, memory)
+                results.append(result)
+                if progress:
+                    progress(result)
+
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'seed': seed,
+        'repeat': repeat,
+        'sizes': list(sizes),
+        'generation': generation,
+        'results': results,
+    }
+
+
+def backend_inputs(size, seed=0):
+    """The same FFG sheet in every file type the synthetic data can be written as"""
+    excel_bytes = synthetic_data.make_ffg_workbook(size, seed)
+    return {
+        'xlsx': excel_bytes,
+        'ods': synthetic_data.ffg_as_ods(excel_bytes),
+        'csv': synthetic_data.ffg_as_csv(excel_bytes),
+    }
+
+
+def time_backend(backend, data, size, repeat, expected=None):
+    """Read the FFG grades `repeat` times with one backend and summarize the runs"""
+    from excel_grades import read_ffg_grades
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        grades = read_ffg_grades(data, backend=backend)
+        runs.append(time.perf_counter() - start)
+
+    return {
+        'backend': backend,
+        'size': size,
+        'input_bytes': len(data),
+        'runs_s': runs,
+        'min_s': min(runs),
+        'median_s': statistics.median(runs),
+        'per_row_us': min(runs) / size * 1e6,
+        'students': len(grades),
+        'matches_openpyxl': None if expected is None else grades == expected,
+    }
+
+
+def run_backend_benchmarks(sizes=DEFAULT_SIZES, repeat=3, seed=0, progress=None):
+    """
+    Time every workbook reader backend on the same FFG sheet at every size
+
+    Returns:
+        dict: JSON-serializable results, with the backends that aren't installed
+              or have no synthetic input (e.g. .xls) listed as skipped
+    """
+    from excel_grades import read_ffg_grades
+
+    results = []
+    skipped = set()
+    for size in sizes:
+        inputs = backend_inputs(size, seed)
+        expected = read_ffg_grades(inputs['xlsx'], backend='openpyxl')
+        for file_format, backends in workbook_readers.FASTEST_FIRST.items():
+            for backend in backends:
+                if file_format not in inputs or not workbook_readers.backend_available(backend):
+                    skipped.add(backend)
+                    continue
+                result = time_backend(backend, inputs[file_format], size, repeat, expected)
+                result['format'] = file_format
+                results.append(result)
+                if progress:
+                    progress(result)
+
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'seed': seed,
+        'repeat': repeat,
+        'sizes': list(sizes),
+        'skipped_backends': sorted(skipped),
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the E-Class pipeline stages on synthetic data.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Row counts to generate')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES, help='Stages to time')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage and size')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic data')
+    parser.add_argument('--memory', action='store_true', help='Also record peak tracemalloc bytes (slower)')
+    parser.add_argument('--backends', action='store_true', help='Compare the workbook reader backends instead')
+    parser.add_argument('--out', help='Write the JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    def progress(result):
+        print(f"{result['stage']:<48} {result['size']:>7} rows  {result['min_s'] * 1000:>10.1f} ms"
+              f"  {result['per_row_us']:>9.1f} us/row", file=sys.stderr)
+
+    def backend_progress(result):
+        print(f"{result['backend']:<10} {result['format']:<5} {result['size']:>7} rows  {result['min_s'] * 1000:>10.1f} ms"
+              f"  {result['per_row_us']:>9.1f} us/row", file=sys.stderr)
+
+    if args.backends:
+        results = run_backend_benchmarks(args.sizes, args.repeat, args.seed, backend_progress)
+    else:
+        results = run_benchmarks(args.sizes, args.stages, args.repeat, args.seed, args.memory, progress)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+
+
+# Uncompressed bytes kept ready in memory; colder blobs beyond this are compressed
+DEFAULT_HOT_BYTES = int(os.environ.get('ECLASS_BLOB_HOT_MB', '32')) * 1024 * 1024
+
+# Everything held in memory (hot plus compressed); beyond this the coldest blobs spill to disk
+DEFAULT_MEMORY_BYTES = int(os.environ.get('ECLASS_BLOB_MEMORY_MB', '128')) * 1024 * 1024
+
+# Blobs at least this large go straight to disk
+DEFAULT_SPILL_THRESHOLD = int(os.environ.get('ECLASS_BLOB_SPILL_MB', '8')) * 1024 * 1024
+
+# Cap on the spill directory; once it is full, blobs stay compressed in memory
+DEFAULT_DISK_BYTES = int(os.environ.get('ECLASS_BLOB_DISK_MB', '1024')) * 1024 * 1024
+
+# Spill directory (defaults to a fresh temporary directory, removed at exit)
+DEFAULT_SPILL_DIR = os.environ.get('ECLASS_BLOB_DIR')
+
+# Compressing already-zipped payloads (DOCX, XLSX) gains nothing; keep those
+# as they are unless zlib saves at least this fraction
+MIN_COMPRESSION_SAVING = 0.1
+
+
+def blob_key(data):
+    """Content address of a blob: SHA-256 of its bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Entry:
+    __slots__ = ('size', 'refs', 'tier', 'data', 'compressed', 'path', 'stored_size')
+
+    def __init__(self, data):
+        self.size = len(data)
+        self.refs = 0
+        self.tier = 'hot'  # hot (raw in memory) -> cold (compressed in memory) -> disk
+        self.data = data
+        self.compressed = False
+        self.path = None
+        self.stored_size = len(data)
+
+
+class BlobStore:
+    """
+    Content-addressed, reference-counted store for the large byte payloads a
+    session keeps around (uploads, updated DBFs, reports, ZIPs).
+
+    Identical bytes are stored once, however many sessions or session keys
+    refer to them; a blob is dropped when its last reference is released.
+    The least recently used blobs are compressed once the uncompressed ones
+    exceed hot_bytes, and spill to a bounded directory on disk once memory
+    exceeds memory_bytes. Blobs of spill_threshold or more are written to
+    disk right away.
+    """
+
+    def __init__(self, hot_bytes=DEFAULT_HOT_BYTES, memory_bytes=DEFAULT_MEMORY_BYTES,
+                 spill_threshold=DEFAULT_SPILL_THRESHOLD, disk_bytes=DEFAULT_DISK_BYTES, spill_dir=DEFAULT_SPILL_DIR):
+        self.hot_bytes = hot_bytes
+        self.memory_bytes = memory_bytes
+        self.spill_threshold = spill_threshold
+        self.disk_bytes = disk_bytes
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = False
+        self._entries = OrderedDict()  # key -> _Entry, least recently used first
+        self._hot_total = 0
+        self._memory_total = 0
+        self._disk_total = 0
+        self._lock = threading.Lock()
+
+    def put(self, data):
+        """
+        Store bytes (or add a reference if identical bytes are already stored)
+
+        Returns:
+            str: Blob key; release() it when the reference is no longer needed
+        """
+        data = bytes(data)
+        key = blob_key(data)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(data)
+                self._entries[key] = entry
+                self._hot_total += entry.size
+                self._memory_total += entry.size
+                if entry.size >= self.spill_threshold:
+                    self._spill(key, entry)
+            else:
+                self._entries.move_to_end(key)
+            entry.refs += 1
+            self._rebalance()
+        return key
+
+    def retain(self, key):
+        """Add a reference to a stored blob"""
+        with self._lock:
+            self._entries[key].refs += 1
+
+    def release(self, key):
+        """Drop a reference; the blob is deleted when none are left"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del self._entries[key]
+                self._discard(entry)
+
+    def get(self, key):
+        """The blob's bytes; raises KeyError for an unknown or released key"""
+        with self._lock:
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            if entry.tier == 'hot':
+                return entry.data
+            if entry.tier == 'cold':
+                data = zlib.decompress(entry.data) if entry.compressed else entry.data
+                # Recently used again: keep it ready unless that overflows the hot budget
+                self._memory_total += entry.size - entry.stored_size
+                self._hot_total += entry.size
+                entry.tier, entry.data, entry.compressed, entry.stored_size = 'hot', data, False, entry.size
+                self._rebalance()
+                return data
+            with open(entry.path, 'rb') as f:
+                stored = f.read()
+            return zlib.decompress(stored) if entry.compressed else stored
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def refs(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.refs if entry is not None else 0
+
+    def tier(self, key):
+        """'hot', 'cold' or 'disk'"""
+        with self._lock:
+            return self._entries[key].tier
+
+    def stats(self):
+        with self._lock:
+            return {
+                'blobs': len(self._entries),
+                'refs': sum(entry.refs for entry in self._entries.values()),
+                'logical_bytes': sum(entry.size for entry in self._entries.values()),
+                'hot_bytes': self._hot_total,
+                'memory_bytes': self._memory_total,
+                'disk_bytes': self._disk_total,
+                'tiers': {tier: sum(1 for entry in self._entries.values() if entry.tier == tier)
+                          for tier in ('hot', 'cold', 'disk')},
+            }
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                self._discard(entry)
+            self._entries.clear()
+
+    def close(self):
+        """Release everything and remove the spill directory if the store created it"""
+        self.clear()
+        if self._owns_spill_dir and self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+            self._owns_spill_dir = False
+
+    def _rebalance(self):
+        # Compress the least recently used hot blobs, then spill the coldest to disk
+        for entry in self._entries.values():
+            if self._hot_total <= self.hot_bytes:
+                break
+            if entry.tier == 'hot':
+                self._compress(entry)
+        for key, entry in self._entries.items():
+            if self._memory_total <= self.memory_bytes:
+                break
+            if entry.tier != 'disk':
+                self._spill(key, entry)
+
+    def _compress(self, entry):
+        compressed = zlib.compress(entry.data, 1)
+        self._hot_total -= entry.size
+        self._memory_total -= entry.stored_size
+        if len(compressed) <= entry.size * (1 - MIN_COMPRESSION_SAVING):
+            entry.data, entry.compressed = compressed, True
+        entry.tier = 'cold'
+        entry.stored_size = len(entry.data)
+        self._memory_total += entry.stored_size
+
+    def _spill(self, key, entry):
+        if entry.tier == 'hot':
+            self._compress(entry)
+        if self._disk_total + entry.stored_size > self.disk_bytes:
+            return  # Disk area full: the blob stays compressed in memory
+        path = os.path.join(self._ensure_spill_dir(), key)
+        with open(path, 'wb') as f:
+            f.write(entry.data)
+        self._memory_total -= entry.stored_size
+        self._disk_total += entry.stored_size
+        entry.tier, entry.data, entry.path = 'disk', None, path
+
+    def _discard(self, entry):
+        if entry.tier == 'hot':
+            self._hot_total -= entry.size
+            self._memory_total -= entry.stored_size
+        elif entry.tier == 'cold':
+            self._memory_total -= entry.stored_size
+        else:
+            self._disk_total -= entry.stored_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        entry.data = None
+
+    def _ensure_spill_dir(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='eclass-blobs-')
+            self._owns_spill_dir = True
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        else:
+            os.makedirs(self._spill_dir, exist_ok=True)
+        return self._spill_dir
+
+
+def _release_all(store, keys):
+    for key in keys.values():
+        store.release(key)
+    keys.clear()
+
+
+class SessionBlobs:
+    """
+    The blobs one Streamlit session refers to, by name (e.g. 'excel', 'report').
+
+    Only keys live in st.session_state; the bytes live once in the shared
+    BlobStore. Assigning a name releases the blob it pointed to before, and
+    every reference is released when the session's state is garbage
+    collected.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._keys = {}
+        weakref.finalize(self, _release_all, store, self._keys)
+
+    def __setitem__(self, name, data):
+        self._set_key(name, self._store.put(data))
+
+    def assign(self, name, key):
+        """Point `name` at an already stored blob, taking a reference of its own"""
+        self._store.retain(key)
+        self._set_key(name, key)
+
+    def _set_key(self, name, key):
+        old = self._keys.get(name)
+        self._keys[name] = key
+        if old is not None:
+            self._store.release(old)
+
+    def __getitem__(self, name):
+        return self._store.get(self._keys[name])
+
+    def get(self, name, default=None):
+        if name not in self._keys:
+            return default
+        return self[name]
+
+    def __contains__(self, name):
+        return name in self._keys
+
+    def __delitem__(self, name):
+        self._store.release(self._keys.pop(name))
+
+    def discard(self, name):
+        if name in self._keys:
+            del self[name]
+
+    def names(self):
+        return list(self._keys)
+
+    def key(self, name):
+        return self._keys[name]
+
+    def clear(self):
+        _release_all(self._store, self._keys)
+
+
+# Process-wide store shared by every Streamlit session and rerun
+_store = BlobStore()
+
+
+def get_store():
+    return _store
@@ -2,208 +2,102 @@ import os
 import pandas as pd
 import re
 
+import vfp_table
+from course_index import build_course_index
+from perf import traced
 
-def parse_jle_with_filename(file_path):
+
+TERM_MAP = {'1': '1st Semester', '2': '2nd Semester', '3': 'Summer'}
+
+
+def term_from_filename(filename):
     """
-    Parse a JLE file extracting both the content data and metadata from the filename.
-    
-    Args:
-        file_path: Path to the JLE file
-    
+    Derive the academic year and semester from a JLE filename.
+    Looks for the pattern "20243" inside "DSO_20243_565.JLE"; the digit
+    immediately following the year is the semester.
+
     Returns:
-        pd.DataFrame: DataFrame containing parsed course records with added metadata
+        tuple: (academic_year, semester), "Unknown" when the pattern is absent
     """
-    # 1. Extract Semester/Year from Filename
-    filename = os.path.basename(file_path)
-    
-    # Logic: Look for the pattern "20243" inside "DSO_20243_565.JLE"
-    # This assumes the digit immediately following the year is the semester.
-    term_map = {'1': '1st Semester', '2': '2nd Semester', '3': 'Summer'}
-    
     # Default values
     academic_year = "Unknown"
     semester = "Unknown"
-    
+
     # Extract digits (e.g., finding "20243")
-    meta_match = re.search(r"(\d{4})(\d)", filename)
+    meta_match = re.search(r"(\d{4})(\d)", filename or '')
     if meta_match:
         year_part = meta_match.group(1)  # 2024
         term_part = meta_match.group(2)  # 3
-        
-        academic_year = f"{year_part}-{int(year_part)+1}"
-        semester = term_map.get(term_part, f"{term_part}th Term")
-
-    # 2. Extract data from the JLE file content
-    with open(file_path, 'rb') as f:
-        jle_bytes = f.read()
-    
-    # Read the JLE file content as binary and decode with latin1 encoding
-    raw_data = jle_bytes.decode('latin1', errors='ignore')
-
-    # Define the "Start of Record" pattern
-    # Looks for 4 digits (Subject Num) + space + Alphanumeric (Subject Code)
-    # The first letter of the subject code is part of the subject number
-    # Example: "2506   FBACC104" should be interpreted as Subject Num: 2506F, Subject Code: BACC104
-    record_start_pattern = re.compile(r"(\d{4})\s+([A-Z][A-Z0-9]{2,10})")
-
-    # Find all iterators for the start of records
-    matches = list(record_start_pattern.finditer(raw_data))
-
-    parsed_records = []
-
-    for i in range(len(matches)):
-        # Determine the start and end of the current record's text chunk
-        start_idx = matches[i].start()
-
-        # If there is a next match, end before it starts; otherwise go to EOF
-        if i + 1 < len(matches):
-            end_idx = matches[i+1].start()
-        else:
-            end_idx = len(raw_data)
-
-        # Extract the raw chunk for this specific subject
-        chunk = raw_data[start_idx:end_idx]
-
-        # --- Extraction Logic ---
-
-        # 1. Extract Subject Num and Code from the match itself
-        subj_num = matches[i].group(1)
-        full_subj_code = matches[i].group(2)
 
-        # The first letter of the subject code is actually part of the subject number
-        # So FBACC104 becomes Subject Num: 2506F and Subject Code: BACC104
-        subj_num_with_letter = subj_num + full_subj_code[0]  # 2506 + F = 2506F
-        real_subj_code = full_subj_code[1:]  # BACC104 (everything after the first letter)
+        academic_year = f"{year_part}-{int(year_part)+1}"
+        semester = TERM_MAP.get(term_part, f"{term_part}th Term")
 
-        # Remove the header (Num + Code) from the chunk to process the rest
-        # We also replace newlines with spaces to make regex easier
-        rest_of_text = chunk[len(matches[i].group(0)):].replace('\n', ' ').strip()
+    return academic_year, semester
 
-        # 2. Extract Credit and Lecturer - improved pattern to handle various formats
-        # Look for digit followed by lecturer name at the end of the text
-        # This pattern looks for a digit followed by whitespace and then the lecturer name
-        lecturer_pattern = re.search(r"(\d)\s+([A-Z][A-Z\s\.\-]*[A-Z])(?:\s*$|[\x00-\x1f\x7f\s]*$)", rest_of_text)
 
-        credit = None
-        lecturer = None
+def _format_jle_number(value):
+    """Render a numeric JLE field the way the text parser did ('3', not '3.0')"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
 
-        if lecturer_pattern:
-            credit = lecturer_pattern.group(1)
-            lecturer = lecturer_pattern.group(2).strip()
-            # Remove this part from the text so we can find the Title/Schedule
-            rest_of_text = rest_of_text[:lecturer_pattern.start()].strip()
-        else:
-            # Fallback: look for any digit followed by potential lecturer name
-            # Pattern: single digit followed by name-like pattern
-            alt_pattern = re.search(r"(\d)\s+([A-Z][A-Z\s\.\-]+?)(?:\s+(?:\d\s+)?[A-Z]|$)", rest_of_text)
-            if alt_pattern:
-                credit = alt_pattern.group(1)
-                lecturer = alt_pattern.group(2).strip()
-                rest_of_text = rest_of_text[:alt_pattern.start()].strip()
 
-        # 3. Extract Schedule(s) - distinguish between LEC and LAB
-        # Pattern: Time (e.g., 730AM-1200PM), Day (e.g., SuSa), Room (e.g., B63)
-        # Enhanced to potentially identify LEC/LAB indicators if present in the format
-        sched_pattern_regex = r"(\d{1,4}[AP]M-\s*\d{1,4}[AP]M\s+[A-Za-z]+\s+[A-Z0-9]+)"
-        schedules_found = re.findall(sched_pattern_regex, rest_of_text)
-
-        # For now, we'll treat all schedules as general schedules
-        # In a more advanced implementation, we could identify LEC/LAB based on context
-        all_schedule_str = " / ".join([s.strip() for s in schedules_found])
-
-        # Initialize LEC and LAB schedules as empty
-        lec_schedule_str = ""
-        lab_schedule_str = ""
+def read_jle_table(jle_bytes, academic_year="Unknown", semester="Unknown"):
+    """
+    Read a JLE file as the Visual FoxPro table it actually is.
 
-        # Try to identify LEC and LAB schedules if they're explicitly marked in the text
-        # Look for LEC/LAB indicators in the context of schedules
-        full_text_for_context = rest_of_text
-        lec_pattern = r"LEC.*?(\d{1,4}[AP]M-\s*\d{1,4}[AP]M\s+[A-Za-z]+\s+[A-Z0-9]+)"
-        lab_pattern = r"LAB.*?(\d{1,4}[AP]M-\s*\d{1,4}[AP]M\s+[A-Za-z]+\s+[A-Z0-9]+)"
+    Fields are decoded straight from the header's field offsets (SUBJNUM, S,
+    SUBJCODE, LECSKED, LABSKED, SUBJTITLE, CREDIT, LECTURER), so the cost is a
+    fixed number of slices per record with no regex scanning.
 
-        # Extract LEC schedules if explicitly marked
-        lec_matches = re.findall(lec_pattern, rest_of_text, re.IGNORECASE)
-        if lec_matches:
-            lec_schedule_str = " / ".join([s.strip() for s in lec_matches])
+    Returns:
+        list: Course records in the same shape as the text parser produces,
+              or None when the bytes are not a JLE table
+    """
+    if not vfp_table.is_vfp_table(jle_bytes):
+        return None
 
-        # Extract LAB schedules if explicitly marked
-        lab_matches = re.findall(lab_pattern, rest_of_text, re.IGNORECASE)
-        if lab_matches:
-            lab_schedule_str = " / ".join([s.strip() for s in lab_matches])
+    header = vfp_table.read_header(jle_bytes)
+    if vfp_table.get_field(header, 'SUBJNUM') is None or vfp_table.get_field(header, 'SUBJCODE') is None:
+        return None
 
-        # If no explicit LEC/LAB markers found, use heuristic approach
-        if not lec_schedule_str and not lab_schedule_str:
-            if len(schedules_found) >= 2:
-                # If there are 2 or more schedules, assume first is LEC, second is LAB (common pattern)
-                lec_schedule_str = schedules_found[0] if schedules_found else ""
-                lab_schedule_str = schedules_found[1] if len(schedules_found) > 1 else ""
-            else:
-                # If only one schedule, assign to LEC
-                lec_schedule_str = schedules_found[0] if schedules_found else ""
+    wanted = [f for f in (vfp_table.get_field(header, name) for name in
+                          ('SUBJNUM', 'S', 'SUBJCODE', 'LECSKED', 'LABSKED', 'SUBJTITLE', 'CREDIT', 'LECTURER'))
+              if f is not None]
 
-        # Ensure blank values when no schedules exist
-        lec_schedule_str = lec_schedule_str if lec_schedule_str else ""
-        lab_schedule_str = lab_schedule_str if lab_schedule_str else ""
+    parsed_records = []
+    for _, record in vfp_table.iter_records(jle_bytes, header):
+        values = vfp_table.read_record(header, record, wanted)
 
-        # 4. Extract Subject Title
-        # The title is whatever is left after removing the schedules
-        # We use re.sub to remove the schedules we found
-        title_clean = re.sub(sched_pattern_regex, '', rest_of_text)
-        # Also remove the lecturer and credit from the title if they weren't removed by the main pattern
-        if credit and lecturer:
-            lecturer_part = f"{credit}\\s+{lecturer}"
-            title_clean = re.sub(lecturer_part, '', title_clean, flags=re.IGNORECASE)
-        title_clean = " ".join(title_clean.split()) # Remove extra whitespace
+        subj_num = _format_jle_number(values.get('SUBJNUM')) or ''
+        section = (values.get('S') or '').strip()
+        lec_schedule_str = (values.get('LECSKED') or '').strip()
+        lab_schedule_str = (values.get('LABSKED') or '').strip()
+        lecturer = (values.get('LECTURER') or '').strip()
 
         parsed_records.append({
-            "Subject Num": subj_num_with_letter,  # Now includes the letter (e.g., 2506F)
-            "Subject Code": real_subj_code,       # The actual subject code (e.g., BACC104)
-            "Subject Title": title_clean,
-            "Schedule": all_schedule_str,          # All schedules combined
-            "LEC_Schedule": lec_schedule_str,      # Lecture schedule
-            "LAB_Schedule": lab_schedule_str,      # Laboratory schedule
-            "Credit": credit,
-            "Lecturer": lecturer,
-            "Academic Year": academic_year,  # Added from filename
-            "Semester": semester             # Added from filename
+            "Subject Num": subj_num + section,                        # e.g. 2506 + F = 2506F
+            "Subject Code": (values.get('SUBJCODE') or '').strip(),   # e.g. BACC104
+            "Subject Title": " ".join((values.get('SUBJTITLE') or '').split()),
+            "Schedule": " / ".join(s for s in (lec_schedule_str, lab_schedule_str) if s),
+            "LEC_Schedule": lec_schedule_str,
+            "LAB_Schedule": lab_schedule_str,
+            "Credit": _format_jle_number(values.get('CREDIT')),
+            "Lecturer": lecturer or None,
+            "Academic Year": academic_year,
+            "Semester": semester
         })
 
-    # Create a DataFrame from the parsed records
-    jle_df = pd.DataFrame(parsed_records) if parsed_records else pd.DataFrame()
-
-    return jle_df
+    return parsed_records
 
 
-def extract_jle_data(jle_file):
+def _parse_jle_text(raw_data, academic_year, semester):
     """
-    Extract data from JLE file. The JLE format contains academic course information
-    with structured data including subject numbers, codes, titles, schedules, credits, and lecturers.
-    This function extracts content from an uploaded file object and adds metadata from the filename.
+    Fallback parser that regex-scans the decoded JLE text.
+    Used only when the file is not a readable VFP table.
     """
-    import re
-    import pandas as pd
-
-    # Read the JLE file content as binary and decode with latin1 encoding
-    jle_bytes = jle_file.getvalue()
-    raw_data = jle_bytes.decode('latin1', errors='ignore')
-
-    # Extract metadata from filename
-    filename = jle_file.name
-    term_map = {'1': '1st Semester', '2': '2nd Semester', '3': 'Summer'}
-    
-    # Default values
-    academic_year = "Unknown"
-    semester = "Unknown"
-    
-    # Extract digits (e.g., finding "20243")
-    meta_match = re.search(r"(\d{4})(\d)", filename)
-    if meta_match:
-        year_part = meta_match.group(1)  # 2024
-        term_part = meta_match.group(2)  # 3
-        
-        academic_year = f"{year_part}-{int(year_part)+1}"
-        semester = term_map.get(term_part, f"{term_part}th Term")
-
     # Define the "Start of Record" pattern
     # Looks for 4 digits (Subject Num) + space + Alphanumeric (Subject Code)
     # The first letter of the subject code is part of the subject number
@@ -332,6 +226,61 @@ def extract_jle_data(jle_file):
             "Semester": semester             # Added from filename
         })
 
+    return parsed_records
+
+
+def parse_jle_records(jle_bytes, academic_year="Unknown", semester="Unknown"):
+    """
+    Parse JLE bytes into course records, reading the VFP table natively and
+    falling back to the text scanner for anything that isn't a table
+    """
+    parsed_records = read_jle_table(jle_bytes, academic_year, semester)
+    if parsed_records is None:
+        # Read the JLE file content as binary and decode with latin1 encoding
+        raw_data = jle_bytes.decode('latin1', errors='ignore')
+        parsed_records = _parse_jle_text(raw_data, academic_year, semester)
+    return parsed_records
+
+
+def parse_jle_with_filename(file_path):
+    """
+    Parse a JLE file extracting both the content data and metadata from the filename.
+    
+    Args:
+        file_path: Path to the JLE file
+    
+    Returns:
+        pd.DataFrame: DataFrame containing parsed course records with added metadata
+    """
+    # 1. Extract Semester/Year from Filename
+    academic_year, semester = term_from_filename(os.path.basename(file_path))
+
+    # 2. Extract data from the JLE file content
+    with open(file_path, 'rb') as f:
+        jle_bytes = f.read()
+
+    parsed_records = parse_jle_records(jle_bytes, academic_year, semester)
+
+    # Create a DataFrame from the parsed records
+    jle_df = pd.DataFrame(parsed_records) if parsed_records else pd.DataFrame()
+
+    return jle_df
+
+
+@traced('jle.extract')
+def extract_jle_data(jle_file):
+    """
+    Extract data from JLE file. The JLE format contains academic course information
+    with structured data including subject numbers, codes, titles, schedules, credits, and lecturers.
+    This function extracts content from an uploaded file object and adds metadata from the filename.
+    """
+    jle_bytes = jle_file.getvalue()
+
+    # Extract metadata from filename
+    academic_year, semester = term_from_filename(getattr(jle_file, 'name', ''))
+
+    parsed_records = parse_jle_records(jle_bytes, academic_year, semester)
+
     # Create a DataFrame from the parsed records
     jle_df = pd.DataFrame(parsed_records) if parsed_records else pd.DataFrame()
 
@@ -339,12 +288,13 @@ def extract_jle_data(jle_file):
     jle_info = {
         'raw_bytes': jle_bytes,
         'size': len(jle_bytes),
-        'filename': jle_file.name,
+        'filename': getattr(jle_file, 'name', ''),
         'course_data': jle_df,
+        'course_index': build_course_index(jle_df),
         'total_courses': len(parsed_records),
         'course_codes': [record['Subject Code'] for record in parsed_records] if parsed_records else [],
         'academic_year': academic_year,
         'semester': semester
     }
 
-    return jle_info
\ No newline at end of file
+    return jle_info
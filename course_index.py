@@ -0,0 +1,102 @@
+import os
+
+import pandas as pd
+
+
+SEMESTER_DIGITS = {
+    '1st Semester': '1',
+    '2nd Semester': '2',
+    'Summer': '3'
+}
+
+
+def get_semester_digit(semester_str):
+    """Convert semester string to digit"""
+    return SEMESTER_DIGITS.get(semester_str, '0')
+
+
+def parse_dbf_filename(dbf_filename):
+    """
+    Split a grade sheet filename following ORG_YYYYX_SUBJNUM_SUBJCODE_ID.DBF
+
+    Returns:
+        dict: org, year_semester, subj_num, subj_code (None if the name doesn't follow the pattern)
+    """
+    parts = os.path.basename(dbf_filename).replace('.DBF', '').replace('.dbf', '').split('_')
+    if len(parts) < 4:
+        return None
+    return {
+        'org': parts[0],
+        'year_semester': parts[1],  # YYYYX
+        'subj_num': parts[2],       # SUBJNUM
+        'subj_code': parts[3],      # SUBJCODE
+    }
+
+
+def dbf_course_key(dbf_filename):
+    """(year+semester digit, subject num, subject code) key of a DBF filename, or None"""
+    meta = parse_dbf_filename(dbf_filename) if dbf_filename else None
+    if meta is None:
+        return None
+    return meta['year_semester'], meta['subj_num'], meta['subj_code']
+
+
+def build_course_index(jle_df):
+    """
+    Index the courses of a parsed JLE by (year+semester digit, subject num, subject code).
+
+    Keys are computed column-wise once, so matching a DBF filename afterwards
+    is a single dict lookup. When the JLE lists the same course twice the
+    first row wins, like the row-by-row scan it replaces.
+
+    Returns:
+        dict: key -> positional row index into jle_df
+    """
+    if jle_df is None or jle_df.empty or 'Academic Year' not in jle_df.columns:
+        return {}
+
+    def column(name):
+        if name not in jle_df.columns:
+            return pd.Series('', index=jle_df.index)
+        return jle_df[name].fillna('').astype(str)
+
+    academic_years = column('Academic Year')
+    year_semesters = academic_years.str.split('-').str[0] + column('Semester').map(get_semester_digit)
+    keys = zip(year_semesters, column('Subject Num'), column('Subject Code'))
+
+    index = {}
+    for pos, (academic_year, key) in enumerate(zip(academic_years, keys)):
+        # Rows without an academic year can never match a DBF filename
+        if academic_year and key not in index:
+            index[key] = pos
+    return index
+
+
+def get_course_index(jle_data):
+    """
+    Course index for parsed JLE data, built on first use and kept on the
+    jle_data dict so every later lookup against the same JLE is O(1)
+    """
+    if not jle_data:
+        return {}
+    index = jle_data.get('course_index')
+    if index is None:
+        index = build_course_index(jle_data.get('course_data'))
+        jle_data['course_index'] = index
+    return index
+
+
+def find_course(jle_data, dbf_filename):
+    """
+    Find the JLE course record matching a DBF filename.
+
+    Returns:
+        pd.Series: The matching course row, or None
+    """
+    key = dbf_course_key(dbf_filename)
+    if key is None:
+        return None
+    pos = get_course_index(jle_data).get(key)
+    if pos is None:
+        return None
+    return jle_data['course_data'].iloc[pos]
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import vfp_table
+
+
+# Field names each role is known by in the registrar's grade sheets (first match wins)
+ROLE_FIELDS = {
+    'id': ('ID', 'STUDID', 'STUD_ID', 'IDNO', 'ID_NO'),
+    'fullname': ('FULLNAME', 'FULL_NAME', 'STUDNAME', 'NAME'),
+    'grade': ('GRADE', 'FINALGRADE', 'FGRADE'),
+    'remarks': ('REMARKS', 'REMARK'),
+}
+
+# Field types each role may have; anything else means the layout isn't a grade sheet
+ROLE_TYPES = {
+    'id': ('N', 'F', 'I', 'C'),
+    'fullname': ('C', 'V'),
+    'grade': ('C', 'V', 'N', 'F'),
+    'remarks': ('C', 'V'),
+}
+
+GRADE_SHEET_ROLES = ('id', 'grade', 'remarks')  # Needed to post grades; fullname is optional
+
+# Compiled codecs kept per layout fingerprint
+CODEC_CACHE_SIZE = 64
+
+# Encoded values remembered per codec (grades and remarks repeat across students)
+ENCODED_VALUES_SIZE = 4096
+
+
+def schema_fingerprint(header):
+    """Fingerprint of a table layout: signature, lengths, codepage and every field descriptor"""
+    digest = hashlib.sha1()
+    digest.update(f"{header['signature']}:{header['header_length']}:{header['record_length']}:"
+                  f"{header['codepage']}".encode())
+    for field in header['fields']:
+        digest.update(f"|{field['name']}:{field['type']}:{field['offset']}:{field['length']}:"
+                      f"{field['decimals']}:{field['flags']}".encode())
+    return digest.hexdigest()
+
+
+def resolve_roles(names):
+    """
+    Role -> name, for the names (field or DataFrame column names) that
+    exactly match a known field name of the role, case-insensitively
+
+    Returns:
+        dict: role -> the matching name as given; roles without a match are left out
+    """
+    by_upper = {}
+    for name in names:
+        by_upper.setdefault(str(name).strip().upper(), name)
+    roles = {}
+    for role, candidates in ROLE_FIELDS.items():
+        match = next((by_upper[candidate] for candidate in candidates if candidate in by_upper), None)
+        if match is not None:
+            roles[role] = match
+    return roles
+
+
+class RecordCodec:
+    """
+    Field roles of one DBF layout, resolved by name and checked once, with
+    the record dtype built for it. Shared by every table with the same
+    layout (see get_codec). Encoded field values are remembered, so the
+    handful of distinct grades and remarks are each encoded once.
+    """
+
+    def __init__(self, header, required=GRADE_SHEET_ROLES):
+        self.fingerprint = schema_fingerprint(header)
+        self.encoding = header['encoding']
+        self.dtype = vfp_table.record_dtype(header)
+        self._encoded = {}
+
+        fields = vfp_table.user_fields(header)
+        by_name = {field['name']: field for field in fields}
+        self.fields = {role: by_name[name] for role, name in resolve_roles(by_name).items()}
+
+        missing = [role for role in required if role not in self.fields]
+        if missing:
+            wanted = ", ".join(ROLE_FIELDS[role][0] for role in missing)
+            available = ", ".join(by_name)
+            raise ValueError(f"DBF has no {wanted} field (fields: {available})")
+        for role, field in self.fields.items():
+            if field['type'] not in ROLE_TYPES[role]:
+                raise ValueError(f"DBF field '{field['name']}' has type {field['type']}, "
+                                 f"which can't hold {ROLE_FIELDS[role][0]}")
+
+    def field(self, role):
+        return self.fields.get(role)
+
+    def records(self, data, header):
+        """Structured array over the records (see vfp_table.record_array), with the compiled dtype"""
+        return np.frombuffer(data, dtype=self.dtype, count=header['record_count'], offset=header['header_length'])
+
+    def encode(self, role, value):
+        key = (role, type(value), value)
+        raw = self._encoded.get(key)
+        if raw is None:
+            raw = vfp_table.encode_value(self.fields[role], value, self.encoding)
+            if len(self._encoded) >= ENCODED_VALUES_SIZE:
+                self._encoded.clear()
+            self._encoded[key] = raw
+        return raw
+
+    def decode(self, role, raw):
+        return vfp_table.decode_value(self.fields[role], raw, self.encoding)
+
+
+_codecs = OrderedDict()
+_codecs_lock = threading.Lock()
+codec_stats = {'hits': 0, 'misses': 0}
+
+
+def get_codec(header):
+    """
+    The compiled codec of a table's layout, built on first sight of the
+    layout and reused for every table that shares it. Raises ValueError
+    when the layout lacks a grade sheet field, so grades are never written
+    into whatever column happens to sit where GRADE usually is.
+    """
+    fingerprint = schema_fingerprint(header)
+    with _codecs_lock:
+        codec = _codecs.get(fingerprint)
+        if codec is not None:
+            _codecs.move_to_end(fingerprint)
+            codec_stats['hits'] += 1
+            return codec
+
+    codec = RecordCodec(header)
+    with _codecs_lock:
+        codec_stats['misses'] += 1
+        _codecs[fingerprint] = codec
+        while len(_codecs) > CODEC_CACHE_SIZE:
+            _codecs.popitem(last=False)
+    return codec
+
+
+def clear_codec_cache():
+    with _codecs_lock:
+        _codecs.clear()
+        codec_stats.update(hits=0, misses=0)
@@ -0,0 +1,156 @@
+import math
+
+import numpy as np
+
+import vfp_table
+from dbf_schema import get_codec
+from id_join import join_ids, normalize_ids
+from perf import traced
+
+
+# --- Helper function to clean numeric values ---
+def clean_value(val):
+    if val is None:
+        return ''
+    if isinstance(val, (int, float)):
+        return f"{val:.1f}"
+    return val
+
+
+def update_grades(dbf_bytes, excel_data):
+    """
+    Write grades and remarks from the Excel data into a copy of the DBF bytes.
+
+    Returns:
+        tuple: (updated_dbf_bytes, matched_count)
+    """
+    updated_dbf_bytes, matched, _ = update_grades_with_changes(dbf_bytes, excel_data)
+    return updated_dbf_bytes, matched
+
+
+def update_grades_with_changes(dbf_bytes, excel_data):
+    """
+    Write grades and remarks from the Excel data into a copy of the DBF bytes,
+    touching only the fields whose stored bytes actually change.
+
+    Returns:
+        tuple: (updated_dbf_bytes, matched_count, changes) where changes is a
+               list of (ID, field name, old value, new value); old is None
+               for a VFP null
+    """
+    updated_dbf_bytes, reconciliation = reconcile_grades(dbf_bytes, excel_data)
+    return updated_dbf_bytes, reconciliation['matched'], reconciliation['changes']
+
+
+def _id_text(value):
+    """Printable form of a decoded ID field value"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+@traced('dbf.update_grades')
+def reconcile_grades(dbf_bytes, excel_data):
+    """
+    Match the Excel rows to the DBF records by student ID and write their
+    grades and remarks into a copy of the DBF bytes.
+
+    The IDs of both sides are joined in one vectorized pass (see
+    id_join.join_ids), which also yields the rows that didn't match and the
+    IDs that appear more than once. The ID, GRADE, REMARKS and FULLNAME
+    fields are found by name through the layout's cached codec (see
+    dbf_schema), so a sheet missing one of them is rejected rather than
+    written positionally. For each matched record the GRADE/REMARKS
+    bytes are patched directly inside a bytearray using the header's field
+    offsets and lengths, so nothing touches the filesystem. Each new value is
+    encoded and compared with the field's current bytes (and null flag)
+    first, so re-posting an unchanged workbook writes nothing and the result
+    is byte-identical to rewriting every matched record.
+
+    Args:
+        dbf_bytes: Raw bytes of the uploaded DBF grade sheet
+        excel_data: Rows from excel_grades.read_ffg_records, or a dict of
+                    student ID string -> (grade, remark)
+
+    Returns:
+        tuple: (updated_dbf_bytes, reconciliation) where reconciliation is a dict:
+            matched: number of DBF records matched
+            changes: (ID, field name, old value, new value) list; old is None for a VFP null
+            excel_only: (sheet row, ID) of the Excel rows matching no record (row is
+                        None for dict input)
+            dbf_only: (record number, ID, FULLNAME) of the records matching no row
+            duplicate_excel_ids: ID -> sheet rows; the last row's grade is the one written
+            duplicate_dbf_ids: ID -> record numbers; each of them is written
+    """
+    if isinstance(excel_data, dict):
+        excel_data = [(None, id_str, grade, remark) for id_str, (grade, remark) in excel_data.items()]
+
+    buffer = bytearray(dbf_bytes)
+    header = vfp_table.read_header(buffer)
+    codec = get_codec(header)
+
+    id_field = codec.field('id')
+    grade_field = codec.field('grade')
+    remark_field = codec.field('remarks')
+    name_field = codec.field('fullname')
+
+    # Live records (before the EOF marker, not deleted) and their ID values
+    records = codec.records(buffer, header)
+    flags = records[vfp_table.DELETION_FLAG_COLUMN]
+    live = flags != vfp_table.DELETED_FLAG
+    eof = np.flatnonzero(flags == vfp_table.EOF_MARKER)
+    if eof.size:
+        live[eof[0]:] = False
+    record_numbers = np.flatnonzero(live)
+    dbf_ids = vfp_table.decode_columns(header, records[record_numbers], [id_field])[id_field['name']]
+    excel_ids = [row[1] for row in excel_data]
+
+    join = join_ids(excel_ids, dbf_ids)
+
+    changes = []
+    for excel_pos, dbf_pos in zip(join['excel'].tolist(), join['dbf'].tolist()):
+        _, dbf_id, grade_val, remark_val = excel_data[excel_pos]
+        record_number = int(record_numbers[dbf_pos])
+        start, end = vfp_table.record_slice(header, record_number)
+        record = buffer[start:end]
+
+        values = []
+        if grade_val is not None:
+            values.append(('grade', grade_field, clean_value(grade_val)))
+        if remark_val is not None:
+            values.append(('remarks', remark_field, clean_value(remark_val)))
+
+        changed = []
+        for role, field, value in values:
+            new_raw = codec.encode(role, value)
+            old_raw = bytes(record[field['offset']:field['offset'] + field['length']])
+            was_null = vfp_table.is_null(header, record, field)
+            if was_null or old_raw != new_raw:
+                old_value = None if was_null else codec.decode(role, old_raw)
+                changes.append((dbf_id, field['name'], old_value, codec.decode(role, new_raw)))
+                changed.append((field, value))
+        if changed:
+            vfp_table.write_values(header, buffer, record_number, changed)
+
+    # Records without a usable ID can't match anything either
+    dbf_only = np.sort(np.concatenate([join['dbf_only'], join['dbf_invalid']]))
+    names = [None] * len(dbf_only)
+    if name_field is not None and len(dbf_only):
+        names = vfp_table.decode_columns(header, records[record_numbers[dbf_only]], [name_field])[name_field['name']]
+
+    excel_keys, _ = normalize_ids(excel_ids)
+    dbf_keys, _ = normalize_ids(dbf_ids)
+    reconciliation = {
+        'matched': len(join['dbf']),
+        'changes': changes,
+        'excel_only': [(excel_data[pos][0], excel_data[pos][1]) for pos in join['excel_only'].tolist()],
+        'dbf_only': [(int(record_numbers[pos]), _id_text(dbf_ids[pos]), name)
+                     for pos, name in zip(dbf_only.tolist(), names)],
+        'duplicate_excel_ids': {str(key): [excel_data[pos][0] for pos in np.flatnonzero(excel_keys == key).tolist()]
+                                for key in join['duplicate_excel_ids'].tolist()},
+        'duplicate_dbf_ids': {str(key): record_numbers[dbf_keys == key].tolist()
+                              for key in join['duplicate_dbf_ids'].tolist()},
+    }
+    return bytes(buffer), reconciliation
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Headless entry point for the E-Class to DBF pipeline.
+
+Posts grades from E-Class Excel records (FFG sheet) into DBF grade sheets
+and renders the Word reports without starting Streamlit, e.g. from cron or
+the registrar's batch jobs:
+
+    python eclass2dbf.py --jle DSO_20243_565.JLE --dbf 'grades/*.DBF' \\
+        --excel 'records/*.xlsm' --out posted
+
+A JSON summary with matched counts, the (ID, field, old, new) change log
+and timings is printed to stdout.
+The same steps are available as functions: load_jle, update_dbf,
+render_report and run.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+# pandas, openpyxl and python-docx are imported inside the functions that
+# need them, so --help and argument errors don't pay for loading them
+
+# The report template shipped with the app, found wherever the command is run from
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Report_template.docx')
+
+
+def expand_patterns(patterns):
+    """
+    Expand shell-style globs (quoted so the shell leaves them alone)
+
+    Returns:
+        tuple: (sorted list of matching file paths, patterns that matched nothing)
+    """
+    paths = []
+    unmatched = []
+    for pattern in patterns:
+        matches = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+        if not matches:
+            unmatched.append(pattern)
+        paths.extend(matches)
+    return sorted(set(paths)), unmatched
+
+
+def by_basename(paths, kind):
+    """
+    Filename -> path, for pairing by filename and writing the outputs under
+    the same names. Raises ValueError when two paths share a filename,
+    since one would be dropped and their outputs would overwrite each other.
+    """
+    by_name = {}
+    for path in paths:
+        by_name.setdefault(os.path.basename(path), []).append(path)
+    duplicates = {name: found for name, found in by_name.items() if len(found) > 1}
+    if duplicates:
+        listed = "; ".join(f"{name}: {', '.join(found)}" for name, found in sorted(duplicates.items()))
+        raise ValueError(f"Several {kind} files share a filename ({listed})")
+    return {name: found[0] for name, found in by_name.items()}
+
+
+def load_jle(jle_path):
+    """Parse a JLE file into the jle_data dict the app and reports use"""
+    from parse_cache import cached_jle_data
+
+    with open(jle_path, 'rb') as f:
+        jle_bytes = f.read()
+    return cached_jle_data(jle_bytes, os.path.basename(jle_path))
+
+
+def update_dbf(jle_data, dbf_path, excel_path):
+    """
+    Post the grades of one Excel class record into a DBF grade sheet
+
+    Returns:
+        tuple: (updated DBF bytes, number of students matched, list of (ID, field, old, new) changes)
+    """
+    from pipeline import process_files_with_jle
+
+    with open(excel_path, 'rb') as f:
+        excel_file = io.BytesIO(f.read())
+    excel_file.name = os.path.basename(excel_path)
+    with open(dbf_path, 'rb') as f:
+        dbf_file = io.BytesIO(f.read())
+    dbf_file.name = os.path.basename(dbf_path)
+
+    return process_files_with_jle(jle_data, excel_file, dbf_file, dbf_file.name, with_changes=True)
+
+
+def render_report(jle_data, dbf_filename, dbf_bytes, template_path=None):
+    """Word report bytes for an (updated) DBF grade sheet"""
+    from pipeline import read_dbf_to_dataframe
+    from reports import generate_word_report_from_jle_and_uploaded_dbf
+
+    df = read_dbf_to_dataframe(dbf_bytes)
+    return generate_word_report_from_jle_and_uploaded_dbf(jle_data, os.path.basename(dbf_filename), df, template_path)
+
+
+def run(jle_path, dbf_patterns, excel_patterns, out_dir, template_path=None, make_reports=True, max_workers=None):
+    """
+    Pair every DBF grade sheet with its Excel class record, post the grades
+    and write the updated DBFs (and Word reports) to out_dir.
+
+    Returns:
+        dict: JSON-serializable summary with per-sheet matched counts, changes, errors and timings
+
+    Raises:
+        ValueError: when two matched DBF (or Excel) files share a filename
+    """
+    from batch import pair_files, process_pairs
+
+    started = time.perf_counter()
+    timings = {}
+
+    dbf_paths, unmatched_dbf = expand_patterns(dbf_patterns)
+    excel_paths, unmatched_excel = expand_patterns(excel_patterns)
+    # Pairing works on filenames; the paths are looked up again afterwards
+    dbf_by_name = by_basename(dbf_paths, 'DBF')
+    excel_by_name = by_basename(excel_paths, 'Excel')
+
+    start = time.perf_counter()
+    jle_data = load_jle(jle_path)
+    timings['load_jle'] = time.perf_counter() - start
+
+    pairs, unpaired_dbf, unpaired_excel = pair_files(list(dbf_by_name), list(excel_by_name))
+
+    jobs = []
+    for dbf_name, excel_name in pairs:
+        with open(dbf_by_name[dbf_name], 'rb') as f:
+            dbf_bytes = f.read()
+        with open(excel_by_name[excel_name], 'rb') as f:
+            excel_bytes = f.read()
+        jobs.append((jle_data, dbf_name, dbf_bytes, excel_name, excel_bytes, template_path, make_reports))
+
+    start = time.perf_counter()
+    results = process_pairs(jobs, max_workers)
+    timings['process'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    sheets = []
+    for r in results:
+        sheet = {
+            'dbf': dbf_by_name[r['dbf_name']],
+            'excel': excel_by_name[r['excel_name']],
+            'matched': r['matched'],
+            'changes': r['changes'],
+            'output': None,
+            'report': None,
+            'error': r['error'],
+            'timings': r['timings'],
+        }
+        if r['dbf_bytes'] is not None:
+            sheet['output'] = os.path.join(out_dir, r['dbf_name'])
+            with open(sheet['output'], 'wb') as f:
+                f.write(r['dbf_bytes'])
+        if r['report_bytes'] is not None:
+            sheet['report'] = os.path.join(out_dir, r['report_name'])
+            with open(sheet['report'], 'wb') as f:
+                f.write(r['report_bytes'])
+        sheets.append(sheet)
+    timings['write'] = time.perf_counter() - start
+    timings['total'] = time.perf_counter() - started
+
+    return {
+        'jle': jle_path,
+        'academic_year': jle_data['academic_year'],
+        'semester': jle_data['semester'],
+        'sheets': sheets,
+        'unpaired_dbf': [dbf_by_name[name] for name in unpaired_dbf],
+        'unpaired_excel': [excel_by_name[name] for name in unpaired_excel],
+        'unmatched_patterns': unmatched_dbf + unmatched_excel,
+        'total_matched': sum(sheet['matched'] for sheet in sheets),
+        'total_changes': sum(len(sheet['changes']) for sheet in sheets),
+        'failed': sum(1 for sheet in sheets if sheet['error']),
+        'timings': timings,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='eclass2dbf',
+        description='Post E-Class Excel grades into DBF grade sheets and render the Word reports.')
+    parser.add_argument('--jle', required=True, help='JLE course schedule file for the term')
+    parser.add_argument('--dbf', required=True, nargs='+', metavar='GLOB', help='DBF grade sheets (paths or quoted globs)')
+    parser.add_argument('--excel', required=True, nargs='+', metavar='GLOB', help='E-Class Excel records (paths or quoted globs)')
+    parser.add_argument('--out', required=True, help='Directory for the updated DBFs and reports')
+    parser.add_argument('--template', default=DEFAULT_TEMPLATE,
+                        help='Word report template (defaults to the Report_template.docx next to this script)')
+    parser.add_argument('--no-report', action='store_true', help='Only update the DBFs, skip the Word reports')
+    parser.add_argument('--workers', type=int, help='Worker processes (defaults to one per sheet, up to the CPU count)')
+    return parser
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    Exit status is 0 when every paired sheet was updated, 1 when a sheet
+    failed or nothing could be paired.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.template != DEFAULT_TEMPLATE and not os.path.isfile(args.template):
+        parser.error(f"template not found: {args.template}")
+
+    try:
+        summary = run(args.jle, args.dbf, args.excel, args.out,
+                      template_path=args.template, make_reports=not args.no_report,
+                      max_workers=args.workers)
+    except Exception as e:
+        json.dump({'error': str(e)}, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+        return 1
+
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0 if summary['sheets'] and not summary['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from itertools import chain, islice
+
+from perf import span, traced
+from workbook_readers import iter_sheet_rows
+
+logger = logging.getLogger('eclass2dbf.excel')
+
+SHEET_NAME = "FFG"
+HEADER_ROW = 7       # Row holding the "EG" and "REMARKS" headers
+DATA_START_ROW = 11  # First student row
+ID_COLUMN = 3        # Column C holds the student ID
+
+# Headers that name the student ID column in a non-standard template (else column C)
+ID_HEADERS = ('ID', 'ID NO', 'ID NO.', 'STUDENT ID', 'STUDENT NO', 'STUDENT NO.')
+
+# Leading rows the layout fingerprint is taken from (the template's header
+# band, above any student rows)
+FINGERPRINT_ROWS = 10
+
+# Rows searched for the header row when it isn't on HEADER_ROW
+HEADER_SCAN_ROWS = 30
+
+# Rows after the header searched for the first student row
+DATA_START_SCAN_ROWS = 20
+
+# Resolved layouts kept per fingerprint
+LAYOUT_CACHE_SIZE = 64
+
+
+def _cell(row_values, col_idx):
+    """Value of a 1-based column in a values_only row tuple (None past the end)"""
+    if col_idx is None or col_idx > len(row_values):
+        return None
+    return row_values[col_idx - 1]
+
+
+def _label(value):
+    return str(value).strip().upper() if value is not None else ''
+
+
+def find_grade_columns(header_values, header_row=HEADER_ROW):
+    """
+    Locate the "EG" and "REMARKS" columns in the header row values.
+
+    Returns:
+        tuple: 1-based (grade column, remark column)
+    """
+    col_grade_idx = None
+    col_remark_idx = None
+
+    for col_idx, cell_value in enumerate(header_values, start=1):
+        if cell_value and str(cell_value).strip().upper() == "EG":
+            col_grade_idx = col_idx
+        elif cell_value and str(cell_value).strip().upper() == "REMARKS":
+            col_remark_idx = col_idx
+
+    if col_grade_idx is None:
+        raise ValueError(f"Column with 'EG' header not found in row {header_row}")
+    if col_remark_idx is None:
+        raise ValueError(f"Column with 'REMARKS' header not found in row {header_row}")
+
+    return col_grade_idx, col_remark_idx
+
+
+def _student_id(value):
+    """Student ID string of an ID cell, or None if it doesn't hold an integer"""
+    try:
+        return str(int(value)).strip()
+    except (ValueError, TypeError):
+        return None
+
+
+def layout_fingerprint(band):
+    """
+    Fingerprint of an FFG sheet's header band: the positions of its
+    non-empty cells. Class records made from the same template share it,
+    whatever course or section text they carry; resolve_layout checks the
+    header labels before trusting a cached layout.
+    """
+    digest = hashlib.sha1()
+    for row_idx, row_values in enumerate(band[:FINGERPRINT_ROWS], start=1):
+        for col_idx, value in enumerate(row_values, start=1):
+            if value is not None and value != '':
+                digest.update(f"{row_idx}:{col_idx};".encode())
+    return digest.hexdigest()
+
+
+def _labelled_id_column(header_values):
+    """1-based column headed by an ID_HEADERS label, else ID_COLUMN"""
+    return next((col_idx for col_idx, value in enumerate(header_values, start=1)
+                 if _label(value) in ID_HEADERS), ID_COLUMN)
+
+
+def detect_layout(band):
+    """
+    Find the header row, data start row and column map in the header band.
+
+    HEADER_ROW is tried first (the standard E-Class template: IDs in
+    column C, students from DATA_START_ROW). Otherwise the first
+    HEADER_SCAN_ROWS rows are searched for a row with both headers, the ID
+    column is the one headed by an ID_HEADERS label (else column C), and
+    students start at the first following row whose ID cell holds an integer.
+
+    Returns:
+        dict: header_row, data_start_row, id_column, grade_column, remark_column
+    """
+    def has_headers(row_values):
+        labels = set(_label(value) for value in row_values)
+        return 'EG' in labels and 'REMARKS' in labels
+
+    if len(band) >= HEADER_ROW and has_headers(band[HEADER_ROW - 1]):
+        header_row = HEADER_ROW
+    else:
+        header_row = next((row_idx for row_idx, row_values in enumerate(band, start=1) if has_headers(row_values)), None)
+        if header_row is None:
+            # Report the missing header for the standard header row
+            find_grade_columns(band[HEADER_ROW - 1] if len(band) >= HEADER_ROW else ())
+
+    header_values = band[header_row - 1]
+    grade_column, remark_column = find_grade_columns(header_values, header_row)
+
+    if header_row == HEADER_ROW:
+        id_column = ID_COLUMN
+        data_start_row = DATA_START_ROW
+    else:
+        id_column = _labelled_id_column(header_values)
+        if id_column != ID_COLUMN:
+            logger.warning("FFG header found on row %d; reading student IDs from column %d (%r) instead of column %d",
+                           header_row, id_column, header_values[id_column - 1], ID_COLUMN)
+        data_start_row = header_row + 1
+        for row_idx in range(header_row + 1, min(header_row + DATA_START_SCAN_ROWS, len(band)) + 1):
+            if _student_id(_cell(band[row_idx - 1], id_column)) is not None:
+                data_start_row = row_idx
+                break
+
+    return {
+        'header_row': header_row,
+        'data_start_row': data_start_row,
+        'id_column': id_column,
+        'grade_column': grade_column,
+        'remark_column': remark_column,
+    }
+
+
+def _layout_matches(layout, band):
+    """Cheap check that a cached layout's headers are where it says they are"""
+    if len(band) < layout['header_row']:
+        return False
+    header_values = band[layout['header_row'] - 1]
+    if layout['header_row'] != HEADER_ROW and _labelled_id_column(header_values) != layout['id_column']:
+        return False
+    return (_label(_cell(header_values, layout['grade_column'])) == 'EG' and
+            _label(_cell(header_values, layout['remark_column'])) == 'REMARKS')
+
+
+_layouts = OrderedDict()
+_layouts_lock = threading.Lock()
+layout_stats = {'hits': 0, 'misses': 0}
+
+
+def resolve_layout(band):
+    """
+    Layout of an FFG sheet from its header band, served from the layout
+    cache when a workbook from the same template was seen before.
+    """
+    fingerprint = layout_fingerprint(band)
+    with _layouts_lock:
+        layout = _layouts.get(fingerprint)
+        if layout is not None:
+            _layouts.move_to_end(fingerprint)
+
+    if layout is not None and _layout_matches(layout, band):
+        with _layouts_lock:
+            layout_stats['hits'] += 1
+        return layout
+
+    layout = detect_layout(band)
+    with _layouts_lock:
+        layout_stats['misses'] += 1
+        _layouts[fingerprint] = layout
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return layout
+
+
+def clear_layout_cache():
+    with _layouts_lock:
+        _layouts.clear()
+        layout_stats.update(hits=0, misses=0)
+
+
+@traced('excel.read_ffg_records')
+def read_ffg_records(excel_bytes, backend=None):
+    """
+    Stream the student rows from the FFG sheet of an E-Class record.
+
+    The FFG sheet's rows are parsed one at a time by the fastest reader
+    installed for the file type (see workbook_readers), and reading stops at
+    the first empty ID cell. Memory and time grow with the rows actually
+    used rather than with the whole macro workbook. The header row and
+    columns are resolved from the sheet's header band (see resolve_layout),
+    so records from a known template skip header discovery.
+
+    Args:
+        excel_bytes: Raw bytes of the uploaded .xlsx/.xlsm/.xls file (or an .ods/.csv export)
+        backend: Workbook reader backend to force (default: the fastest available)
+
+    Returns:
+        list: (sheet row number, student ID string, grade, remark) in sheet
+              order, repeated IDs included
+    """
+    with closing(iter_sheet_rows(excel_bytes, SHEET_NAME, backend)) as rows:
+        with span('excel.load_workbook'):
+            band = list(islice(rows, HEADER_SCAN_ROWS))
+
+        with span('excel.layout'):
+            layout = resolve_layout(band)
+        id_column = layout['id_column']
+        col_grade_idx = layout['grade_column']
+        col_remark_idx = layout['remark_column']
+
+        records = []
+        data_rows = islice(chain(band, rows), layout['data_start_row'] - 1, None)
+        for row_number, row_values in enumerate(data_rows, start=layout['data_start_row']):
+            cell_val = _cell(row_values, id_column)
+            if cell_val is None:
+                break
+
+            id_str = _student_id(cell_val)
+            if id_str is None:
+                # Skip rows where the ID column doesn't contain a valid integer
+                continue
+
+            records.append((row_number, id_str, _cell(row_values, col_grade_idx), _cell(row_values, col_remark_idx)))
+
+    return records
+
+
+def grades_by_id(records):
+    """Student ID -> (grade, remark) from read_ffg_records rows; a repeated ID keeps its last row"""
+    return {id_str: (grade, remark) for _, id_str, grade, remark in records}
+
+
+def read_ffg_grades(excel_bytes, backend=None):
+    """
+    Student IDs, grades and remarks from the FFG sheet of an E-Class record.
+
+    Returns:
+        dict: student ID string -> (grade, remark)
+    """
+    return grades_by_id(read_ffg_records(excel_bytes, backend))
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+def normalize_ids(values):
+    """
+    Student IDs as int64 keys, whatever form they come in: ints, whole
+    floats (20232214.0), digit strings with padding (' 20232214 ') or
+    leading zeros. Anything else (blank, text, fractions) is invalid.
+
+    Returns:
+        tuple: (int64 keys, bool mask of the valid ones); invalid keys are 0
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+        return values.astype(np.int64), np.ones(len(values), dtype=bool)
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        numbers = values
+    else:
+        text = pd.Series(values, dtype=object).astype(str).str.strip()
+        numbers = pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(numbers) & (numbers == np.floor(numbers))
+    keys = np.where(valid, numbers, 0).astype(np.int64)
+    return keys, valid
+
+
+def _last_of_each(keys, positions):
+    """
+    Sort keys, keeping positions in their original order within equal keys
+
+    Returns:
+        tuple: (unique keys, position of each key's last occurrence, duplicated keys)
+    """
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    positions = positions[order]
+    last = np.ones(len(keys), dtype=bool)
+    last[:-1] = keys[1:] != keys[:-1]
+    return keys[last], positions[last], np.unique(keys[~last])
+
+
+def join_ids(excel_ids, dbf_ids):
+    """
+    Match Excel student IDs against the DBF ID field in one pass.
+
+    Both sides are normalized to integers once, the Excel side is sorted and
+    every DBF ID is looked up with a binary search. When an ID appears on
+    several Excel rows, the last one is used (as it always was) and the ID
+    is reported as a duplicate; every DBF record with a matching ID is matched.
+
+    Args:
+        excel_ids: Student IDs in sheet order
+        dbf_ids: ID field values in record order
+
+    Returns:
+        dict of numpy arrays:
+            excel / dbf: positions of the matched pairs (aligned, in DBF order)
+            excel_only: positions of Excel rows whose ID is in no DBF record
+            dbf_only: positions of DBF records whose ID is on no Excel row
+            dbf_invalid: positions of DBF records without a usable ID
+            duplicate_excel_ids / duplicate_dbf_ids: IDs appearing more than once
+    """
+    excel_keys, excel_valid = normalize_ids(excel_ids)
+    dbf_keys, dbf_valid = normalize_ids(dbf_ids)
+
+    excel_positions = np.flatnonzero(excel_valid)
+    unique_keys, unique_positions, duplicate_excel = _last_of_each(excel_keys[excel_positions], excel_positions)
+
+    dbf_positions = np.flatnonzero(dbf_valid)
+    dbf_valid_keys = dbf_keys[dbf_positions]
+    slots = np.searchsorted(unique_keys, dbf_valid_keys)
+    slots[slots == len(unique_keys)] = 0
+    found = (unique_keys[slots] == dbf_valid_keys) if len(unique_keys) else np.zeros(len(dbf_positions), dtype=bool)
+
+    matched_keys = np.unique(dbf_valid_keys[found])
+    excel_in_dbf = np.isin(excel_keys[excel_positions], matched_keys)
+    _, _, duplicate_dbf = _last_of_each(dbf_valid_keys, dbf_positions)
+
+    return {
+        'excel': unique_positions[slots[found]],
+        'dbf': dbf_positions[found],
+        'excel_only': excel_positions[~excel_in_dbf],
+        'dbf_only': dbf_positions[~found],
+        'dbf_invalid': np.flatnonzero(~dbf_valid),
+        'duplicate_excel_ids': duplicate_excel,
+        'duplicate_dbf_ids': duplicate_dbf,
+    }
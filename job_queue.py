@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Durable queue for bulk grade posting (a whole college at term end).
+
+Submissions, their input files, every stage's output and each job's state
+live in one SQLite database in WAL mode, so a crash or redeploy loses
+nothing: workers pick up the queued jobs and the jobs whose worker died
+(expired lease), and a job whose DBF was already updated resumes at the
+report stage. Each job's idempotency key is derived from its input hashes,
+so re-submitting the same files enqueues only what isn't there yet.
+
+    python job_queue.py --db grades.db submit --jle DSO_20243_565.JLE --dbf-dir dbf/ --excel-dir records/
+    python job_queue.py --db grades.db work --workers 4
+    python job_queue.py --db grades.db status
+    python job_queue.py --db grades.db export <batch id> --out batch.zip
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from blob_store import blob_key
+
+
+DEFAULT_DB_PATH = os.environ.get('ECLASS_JOB_DB', 'eclass_jobs.db')
+
+# Attempts per job before it is marked failed, and the wait before retry n (n * RETRY_DELAY_SECONDS)
+MAX_ATTEMPTS = int(os.environ.get('ECLASS_JOB_ATTEMPTS', '3'))
+RETRY_DELAY_SECONDS = 5
+
+# A running job whose worker hasn't reported back for this long is taken over by another worker
+LEASE_SECONDS = int(os.environ.get('ECLASS_JOB_LEASE', '600'))
+
+# Part of every idempotency key: bump when a stage's output for the same inputs changes
+QUEUE_VERSION = 1
+
+STAGES = ('update', 'report')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    jle_name TEXT NOT NULL,
+    jle_key TEXT NOT NULL,
+    unpaired TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    batch_id TEXT NOT NULL,
+    jle_name TEXT NOT NULL,
+    jle_key TEXT NOT NULL,
+    dbf_name TEXT NOT NULL,
+    dbf_key TEXT NOT NULL,
+    excel_name TEXT NOT NULL,
+    excel_key TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_until REAL,
+    worker TEXT,
+    error TEXT,
+    updated_dbf_key TEXT,
+    report_key TEXT,
+    report_name TEXT,
+    reconciliation TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    batch_id TEXT NOT NULL,
+    job_id INTEGER NOT NULL,
+    PRIMARY KEY (batch_id, job_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, not_before);
+"""
+
+
+class LeaseLost(Exception):
+    """The job was taken over by another worker (or finished) after this worker's lease expired"""
+
+
+def idempotency_key(jle_key, dbf_name, dbf_key, excel_name, excel_key):
+    """Same inputs, same key: the JLE, the DBF (name and bytes) and the Excel record (name and bytes)"""
+    text = f"{QUEUE_VERSION}|{jle_key}|{dbf_name}|{dbf_key}|{excel_name}|{excel_key}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue. One instance per process; it may be shared by
+    that process's threads.
+
+    Job states: queued -> running -> done, or back to queued (with a delay)
+    after a failure until max_attempts, then failed. stage records the
+    last stage finished, which is where an interrupted job resumes.
+
+    A claim is a lease: only the worker holding the job, on the attempt it
+    claimed, can record its stages or its failure. The worker renews the
+    lease while it runs; once the lease lapses the job may be taken over,
+    and the old worker's writes are refused (LeaseLost).
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, retry_delay=RETRY_DELAY_SECONDS, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _transaction(self, statements):
+        """Run (sql, params) pairs in one write transaction and return the last cursor"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = None
+                for sql, params in statements:
+                    cursor = self._db.execute(sql, params)
+                self._db.execute('COMMIT')
+                return cursor
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # --- Blobs ---
+
+    def put_blob(self, data):
+        key = blob_key(data)
+        with self._lock:
+            self._db.execute('INSERT OR IGNORE INTO blobs (key, data) VALUES (?, ?)', (key, sqlite3.Binary(data)))
+        return key
+
+    def get_blob(self, key):
+        rows = self._query('SELECT data FROM blobs WHERE key = ?', (key,))
+        if not rows:
+            raise KeyError(key)
+        return bytes(rows[0]['data'])
+
+    # --- Submitting ---
+
+    def submit_batch(self, jle_name, jle_bytes, dbf_files, excel_files, max_attempts=MAX_ATTEMPTS):
+        """
+        Pair the DBF grade sheets with their Excel records (see
+        batch.pair_files) and enqueue one job per pair. Pairs already in the
+        queue with the same inputs keep their job (and its progress) instead
+        of being enqueued again.
+
+        Args:
+            dbf_files / excel_files: dict of filename -> bytes
+
+        Returns:
+            tuple: (batch id, list of job ids in pair order)
+        """
+        from batch import pair_files
+
+        pairs, unpaired_dbf, unpaired_excel = pair_files(list(dbf_files), list(excel_files))
+        jle_key = self.put_blob(jle_bytes)
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        self._transaction([('INSERT INTO batches (id, created_at, jle_name, jle_key, unpaired) VALUES (?, ?, ?, ?, ?)',
+                            (batch_id, now, jle_name, jle_key,
+                             json.dumps({'dbf': unpaired_dbf, 'excel': unpaired_excel})))])
+
+        job_ids = []
+        for dbf_name, excel_name in pairs:
+            dbf_key = self.put_blob(dbf_files[dbf_name])
+            excel_key = self.put_blob(excel_files[excel_name])
+            key = idempotency_key(jle_key, dbf_name, dbf_key, excel_name, excel_key)
+            self._transaction([
+                ('INSERT OR IGNORE INTO jobs (idempotency_key, batch_id, jle_name, jle_key, dbf_name, dbf_key, '
+                 'excel_name, excel_key, max_attempts, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                 (key, batch_id, jle_name, jle_key, dbf_name, dbf_key, excel_name, excel_key, max_attempts, now, now)),
+            ])
+            job_id = self._query('SELECT id FROM jobs WHERE idempotency_key = ?', (key,))[0]['id']
+            self._transaction([('INSERT OR IGNORE INTO batch_jobs (batch_id, job_id) VALUES (?, ?)', (batch_id, job_id))])
+            job_ids.append(job_id)
+        return batch_id, job_ids
+
+    def retry_failed(self, batch_id=None):
+        """Put failed jobs (of one batch, or all) back in the queue with a fresh set of attempts"""
+        sql = ("UPDATE jobs SET state = 'queued', attempts = 0, not_before = 0, error = NULL, updated_at = ? "
+               "WHERE state = 'failed'")
+        params = [time.time()]
+        if batch_id is not None:
+            sql += ' AND id IN (SELECT job_id FROM batch_jobs WHERE batch_id = ?)'
+            params.append(batch_id)
+        return self._transaction([(sql, params)]).rowcount
+
+    # --- Working ---
+
+    def claim(self, worker, lease_seconds=None):
+        """
+        Take the oldest runnable job: queued and due, or running with an
+        expired lease (its worker died or hung). Expired jobs that have used
+        up their attempts are marked failed instead. Returns the job row, or
+        None.
+        """
+        now = time.time()
+        lease_seconds = self.lease_seconds if lease_seconds is None else lease_seconds
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET state = 'failed', lease_until = NULL, updated_at = ?, "
+                    "error = 'Worker ' || worker || ' stopped reporting on the last attempt' "
+                    "WHERE state = 'running' AND lease_until < ? AND attempts >= max_attempts", (now, now))
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE (state = 'queued' AND not_before <= ?) "
+                    "OR (state = 'running' AND lease_until < ?) ORDER BY id LIMIT 1", (now, now)).fetchone()
+                if row is None:
+                    self._db.execute('COMMIT')
+                    return None
+                self._db.execute(
+                    "UPDATE jobs SET state = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?", (worker, now + lease_seconds, now, row['id']))
+                job = self._db.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+                self._db.execute('COMMIT')
+                return dict(job)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def _update_held(self, job, assignments, params):
+        """UPDATE a job this worker still holds; False when the lease was lost"""
+        cursor = self._transaction([(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND worker = ? AND attempts = ? AND state = 'running'",
+            (*params, job['id'], job['worker'], job['attempts']))])
+        return cursor.rowcount == 1
+
+    def renew(self, job, lease_seconds=None):
+        """Extend the lease on a claimed job; False when it was lost"""
+        now = time.time()
+        lease_seconds = self.lease_seconds if lease_seconds is None else lease_seconds
+        return self._update_held(job, 'lease_until = ?, updated_at = ?', (now + lease_seconds, now))
+
+    def finish_stage(self, job, stage, lease_seconds=None, **outputs):
+        """
+        Record a finished stage of a claimed job and its outputs, and renew
+        the lease; the last stage completes the job. Raises LeaseLost when
+        the job is no longer this worker's.
+        """
+        now = time.time()
+        lease_seconds = self.lease_seconds if lease_seconds is None else lease_seconds
+        columns = ''.join(f', {name} = ?' for name in outputs)
+        state = 'done' if stage == STAGES[-1] else 'running'
+        if not self._update_held(job, f"stage = ?, state = ?, lease_until = ?, updated_at = ?{columns}",
+                                 (stage, state, now + lease_seconds, now, *outputs.values())):
+            raise LeaseLost(f"Job {job['id']} is no longer held by {job['worker']}")
+
+    def fail(self, job, error):
+        """
+        Send a claimed job back to the queue after a delay, or mark it failed
+        once out of attempts. False (nothing recorded) when the lease was lost.
+        """
+        now = time.time()
+        return self._update_held(
+            job,
+            "error = ?, updated_at = ?, lease_until = NULL, "
+            "state = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+            "not_before = ? + attempts * ?",
+            (error, now, now, self.retry_delay))
+
+    # --- Reading back ---
+
+    def job(self, job_id):
+        rows = self._query('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        return dict(rows[0]) if rows else None
+
+    def batch_jobs(self, batch_id):
+        return [dict(row) for row in self._query(
+            'SELECT jobs.* FROM jobs JOIN batch_jobs ON jobs.id = batch_jobs.job_id '
+            'WHERE batch_jobs.batch_id = ? ORDER BY jobs.id', (batch_id,))]
+
+    def counts(self, batch_id=None):
+        """Job count per state (of one batch, or all)"""
+        if batch_id is None:
+            rows = self._query('SELECT state, COUNT(*) AS n FROM jobs GROUP BY state')
+        else:
+            rows = self._query('SELECT state, COUNT(*) AS n FROM jobs JOIN batch_jobs ON jobs.id = batch_jobs.job_id '
+                               'WHERE batch_jobs.batch_id = ? GROUP BY state', (batch_id,))
+        return {row['state']: row['n'] for row in rows}
+
+    def export_batch(self, batch_id):
+        """
+        ZIP of a batch's finished DBFs and reports with a batch_summary.json,
+        laid out like batch.run_batch's
+
+        Returns:
+            tuple: (zip_bytes, summary dict)
+        """
+        batch = self._query('SELECT * FROM batches WHERE id = ?', (batch_id,))
+        if not batch:
+            raise KeyError(batch_id)
+        unpaired = json.loads(batch[0]['unpaired'])
+        jobs = self.batch_jobs(batch_id)
+
+        sheets = []
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for job in jobs:
+                reconciliation = json.loads(job['reconciliation']) if job['reconciliation'] else {}
+                sheets.append({
+                    'dbf_name': job['dbf_name'],
+                    'excel_name': job['excel_name'],
+                    'state': job['state'],
+                    'matched': reconciliation.get('matched', 0),
+                    'changes': reconciliation.get('changes', []),
+                    'excel_only': reconciliation.get('excel_only', []),
+                    'dbf_only': reconciliation.get('dbf_only', []),
+                    'duplicate_excel_ids': reconciliation.get('duplicate_excel_ids', {}),
+                    'duplicate_dbf_ids': reconciliation.get('duplicate_dbf_ids', {}),
+                    'report_name': job['report_name'],
+                    'error': job['error'] if job['state'] != 'done' else None,
+                })
+                if job['updated_dbf_key']:
+                    zf.writestr(job['dbf_name'], self.get_blob(job['updated_dbf_key']))
+                if job['report_key']:
+                    zf.writestr(job['report_name'], self.get_blob(job['report_key']))
+            summary = {
+                'batch_id': batch_id,
+                'sheets': sheets,
+                'unpaired_dbf': unpaired['dbf'],
+                'unpaired_excel': unpaired['excel'],
+                'total_matched': sum(sheet['matched'] for sheet in sheets),
+                'total_changes': sum(len(sheet['changes']) for sheet in sheets),
+                'failed': sum(1 for job in jobs if job['state'] == 'failed'),
+                'pending': sum(1 for job in jobs if job['state'] in ('queued', 'running')),
+            }
+            zf.writestr('batch_summary.json', json.dumps(summary, indent=2))
+        return buffer.getvalue(), summary
+
+
+def run_job(queue, job, template_path=None):
+    """
+    Run the stages of a claimed job that haven't finished yet: the DBF
+    update, then the Word report from the updated DBF.
+    """
+    from batch import report_filename
+    from parse_cache import cached_jle_data
+
+    jle_data = cached_jle_data(queue.get_blob(job['jle_key']), job['jle_name'])
+
+    if job['stage'] is None:
+        from pipeline import reconcile_files_with_jle
+
+        excel_file = io.BytesIO(queue.get_blob(job['excel_key']))
+        excel_file.name = job['excel_name']
+        dbf_file = io.BytesIO(queue.get_blob(job['dbf_key']))
+        dbf_file.name = job['dbf_name']
+        updated_dbf_bytes, reconciliation = reconcile_files_with_jle(jle_data, excel_file, dbf_file, job['dbf_name'])
+        job['updated_dbf_key'] = queue.put_blob(updated_dbf_bytes)
+        queue.finish_stage(job, 'update', updated_dbf_key=job['updated_dbf_key'],
+                           reconciliation=json.dumps(reconciliation))
+        job['stage'] = 'update'
+
+    if job['stage'] == 'update':
+        from pipeline import read_dbf_to_dataframe
+        from reports import generate_word_report_from_jle_and_uploaded_dbf
+
+        df = read_dbf_to_dataframe(queue.get_blob(job['updated_dbf_key']))
+        report_bytes = generate_word_report_from_jle_and_uploaded_dbf(jle_data, job['dbf_name'], df, template_path)
+        queue.finish_stage(job, 'report', report_key=queue.put_blob(report_bytes),
+                           report_name=report_filename(job['excel_name']))
+
+
+def run_next(queue, worker, template_path=None):
+    """
+    Claim one job and run it, renewing its lease from a heartbeat thread
+    and recording a failure on the job for a later retry. Returns the job
+    as claimed, or None when nothing is runnable.
+    """
+    job = queue.claim(worker)
+    if job is None:
+        return None
+
+    done = threading.Event()
+
+    def heartbeat():
+        while not done.wait(queue.lease_seconds / 3):
+            if not queue.renew(job):
+                return
+
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+    try:
+        run_job(queue, dict(job), template_path)
+    except LeaseLost:
+        pass  # Another worker has the job now; its outcome is the one recorded
+    except Exception as e:
+        queue.fail(job, f"{type(e).__name__}: {e}\n{traceback.format_exc()}")
+    finally:
+        done.set()
+        beat.join()
+    return job
+
+
+def work(path=DEFAULT_DB_PATH, worker=None, stop_when_empty=True, poll_seconds=1.0, template_path=None):
+    """
+    Worker loop: claim jobs and run them until nothing is queued or running
+    (or forever when stop_when_empty is False).
+
+    Returns:
+        int: jobs this worker claimed
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(path)
+    claimed = 0
+    try:
+        while True:
+            if run_next(queue, worker, template_path) is not None:
+                claimed += 1
+                continue
+            pending = queue.counts()
+            if stop_when_empty and not pending.get('queued') and not pending.get('running'):
+                return claimed
+            time.sleep(poll_seconds)
+    finally:
+        queue.close()
+
+
+def work_in_processes(path=DEFAULT_DB_PATH, workers=None, stop_when_empty=True, template_path=None):
+    """Run work() in several worker processes (see work); returns the jobs claimed"""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return work(path, stop_when_empty=stop_when_empty, template_path=template_path)
+    host = socket.gethostname()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(work, path, f"{host}:{os.getpid()}-{n}", stop_when_empty, 1.0, template_path)
+                   for n in range(workers)]
+        return sum(future.result() for future in futures)
+
+
+def _read_dir(directory, extensions):
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(extensions):
+            with open(os.path.join(directory, name), 'rb') as f:
+                files[name] = f.read()
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Durable queue for bulk E-Class grade posting.')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Queue database (SQLite)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help='Enqueue every DBF/Excel pair of two directories')
+    submit.add_argument('--jle', required=True, help='The term JLE file')
+    submit.add_argument('--dbf-dir', required=True, help='Directory of DBF grade sheets')
+    submit.add_argument('--excel-dir', required=True, help='Directory of Excel class records')
+
+    worker = commands.add_parser('work', help='Run workers until the queue is empty')
+    worker.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    worker.add_argument('--forever', action='store_true', help='Keep polling for new jobs instead of stopping when none are left')
+
+    status = commands.add_parser('status', help='Job counts per state')
+    status.add_argument('batch', nargs='?', help='Only this batch')
+
+    retry = commands.add_parser('retry', help='Requeue failed jobs')
+    retry.add_argument('batch', nargs='?', help='Only this batch')
+
+    export = commands.add_parser('export', help="Write a batch's DBFs, reports and summary to a ZIP")
+    export.add_argument('batch', help='Batch id')
+    export.add_argument('--out', required=True, help='ZIP file to write')
+
+    args = parser.parse_args(argv)
+    if args.command == 'work':
+        print(f"Ran {work_in_processes(args.db, args.workers, stop_when_empty=not args.forever)} job(s)")
+        return 0
+
+    queue = JobQueue(args.db)
+    try:
+        if args.command == 'submit':
+            with open(args.jle, 'rb') as f:
+                jle_bytes = f.read()
+            batch_id, job_ids = queue.submit_batch(
+                os.path.basename(args.jle), jle_bytes,
+                _read_dir(args.dbf_dir, ('.dbf',)), _read_dir(args.excel_dir, ('.xlsx', '.xlsm', '.xls', '.ods', '.csv')))
+            print(f"Batch {batch_id}: {len(job_ids)} job(s)")
+        elif args.command == 'status':
+            print(json.dumps(queue.counts(args.batch), indent=2))
+        elif args.command == 'retry':
+            print(f"Requeued {queue.retry_failed(args.batch)} job(s)")
+        elif args.command == 'export':
+            zip_bytes, summary = queue.export_batch(args.batch)
+            with open(args.out, 'wb') as f:
+                f.write(zip_bytes)
+            print(f"{len(summary['sheets'])} sheet(s), {summary['pending']} pending, {summary['failed']} failed")
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
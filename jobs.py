@@ -0,0 +1,272 @@
+import contextlib
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import perf
+
+
+# Worker threads shared by every Streamlit session; jobs beyond this queue up
+MAX_WORKERS = int(os.environ.get('ECLASS_JOB_WORKERS', '2'))
+
+# Finished jobs are kept this long so a session can still pick up the results
+JOB_TTL_SECONDS = int(os.environ.get('ECLASS_JOB_TTL', '3600'))
+
+# (stage name, label shown in the progress bar) of an Update DBF job
+UPDATE_DBF_STAGES = [
+    ('jle.parse', 'Reading the JLE course schedule'),
+    ('excel.grades', 'Reading grades from the Excel record'),
+    ('dbf.update', 'Writing grades into the DBF'),
+    ('dbf.dataframe', 'Reading back the updated DBF'),
+    ('report.render', 'Rendering the Word report'),
+]
+
+
+class Job:
+    """
+    One unit of background work and its progress.
+
+    The worker thread moves through the job's stages with step() and adds
+    user-facing notes with message(); the Streamlit script reads progress(),
+    stage_label() and the messages back on every rerun. Each stage is also a
+    perf span, so the finished job carries the same per-stage trace as a
+    foreground run.
+    """
+
+    def __init__(self, label, stages):
+        self.job_id = uuid.uuid4().hex
+        self.label = label
+        self.stages = list(stages)
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.stage = None
+        self.completed = []
+        self.messages = []  # (level, text), level as in st.info/st.warning/st.error
+        self.result = None
+        self.error = None
+        self.error_details = None
+        self.trace = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._future = None
+        self._cleanups = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """Mark stage `name` as running for the duration of the block"""
+        with self._lock:
+            self.stage = name
+        with perf.span(name):
+            yield
+        with self._lock:
+            self.completed.append(name)
+            self.stage = None
+
+    def message(self, level, text):
+        with self._lock:
+            self.messages.append((level, text))
+
+    def add_cleanup(self, func, *args):
+        """Call func(*args) when the job is dropped from the registry (e.g. to release blobs)"""
+        with self._lock:
+            self._cleanups.append((func, args))
+
+    def discard(self):
+        with self._lock:
+            cleanups, self._cleanups = self._cleanups, []
+        for func, args in cleanups:
+            func(*args)
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def progress(self):
+        """Fraction of the stages completed (0.0 - 1.0)"""
+        with self._lock:
+            if self.status == 'done' or not self.stages:
+                return 1.0
+            return len(self.completed) / len(self.stages)
+
+    def stage_label(self):
+        """Label of the running stage, or the job status when none is running"""
+        with self._lock:
+            for name, label in self.stages:
+                if name == self.stage:
+                    return label
+            return self.status.capitalize()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes (for scripts and tests; the app polls instead)"""
+        if self._future is not None:
+            self._future.result(timeout)
+        return self
+
+    def _run(self, func, args, kwargs):
+        with self._lock:
+            self.status = 'running'
+        job_trace = None
+        try:
+            with perf.trace(self.label) as job_trace:
+                result = func(self, *args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+                self.error_details = traceback.format_exc()
+                self.status = 'failed'
+        else:
+            with self._lock:
+                self.result = result
+                self.status = 'done'
+        finally:
+            with self._lock:
+                self.stage = None
+                self.trace = job_trace.to_dict() if job_trace is not None else None
+                self.finished_at = time.time()
+
+
+class JobRunner:
+    """
+    Thread pool plus a registry of the jobs it has run, keyed by job ID.
+
+    Threads rather than processes: the results (DataFrames, report bytes)
+    go straight back to the session without pickling, and the parse cache
+    is shared with the script thread.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, ttl=JOB_TTL_SECONDS):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='eclass-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, label, stages, func, *args, **kwargs):
+        """
+        Run func(job, *args, **kwargs) in the background
+
+        Returns:
+            str: Job ID to keep in st.session_state and look up with get()
+        """
+        job = Job(label, stages)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        job._future = self._executor.submit(job._run, func, args, kwargs)
+        return job.job_id
+
+    def get(self, job_id):
+        """The job with this ID, or None if it was never submitted or has expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            self._jobs.pop(job_id).discard()
+
+
+# Process-wide runner; Streamlit keeps imported modules across reruns, so
+# jobs outlive the script run that started them
+_runner = JobRunner()
+
+
+def get_runner():
+    return _runner
+
+
+def submit(label, stages, func, *args, **kwargs):
+    return _runner.submit(label, stages, func, *args, **kwargs)
+
+
+def get_job(job_id):
+    return _runner.get(job_id)
+
+
+def report_messages(job, render):
+    """Add warnings for a report whose course didn't match or that still has [Insert ...] placeholders"""
+    if render.course_matched is False:
+        job.message('warning', "⚠️ Warning: Could not match DBF file with JLE data. Please verify your file naming "
+                               "conventions follow the pattern: ORG_YYYYX_SUBJNUM_SUBJCODE_ID.DBF")
+        return
+
+    for partname, keys in render.unfilled.items():
+        job.message('warning', f"⚠️ Warning: Found {len(keys)} unfilled placeholders in {partname.lstrip('/')}: {keys[:5]}")
+    if render.unfilled:
+        job.message('info', "This may indicate the template uses [Insert *] placeholders the report doesn't fill")
+
+
+def run_update_dbf(job, jle_bytes, jle_filename, excel_bytes, excel_filename, dbf_bytes, dbf_name):
+    """
+    The Update DBF chain as a background job: parse the JLE, post the Excel
+    grades into the DBF, read it back and render the Word report.
+
+    The updated DBF and the report go into the shared blob store; the job
+    holds a reference to each until it expires, and the session takes its
+    own when it picks the results up. A failing report doesn't fail the
+    job; the updated DBF is still handed back with report_key None and the
+    error as a message.
+
+    Returns:
+        dict: jle_data, dbf_name, updated_dbf_key, matched, changes,
+              reconciliation (see dbf_update.reconcile_grades), df, report_name
+              and report_key (blob store keys)
+    """
+    from batch import report_filename
+    from blob_store import get_store
+    from dbf_update import reconcile_grades
+    from parse_cache import cached_jle_data, cached_excel_records, cached_dbf_dataframe
+
+    with job.step('jle.parse'):
+        jle_data = cached_jle_data(jle_bytes, jle_filename or 'extracted.jle')
+
+    with job.step('excel.grades'):
+        excel_records = cached_excel_records(excel_bytes)
+
+    store = get_store()
+    with job.step('dbf.update'):
+        updated_dbf_bytes, reconciliation = reconcile_grades(dbf_bytes, excel_records)
+        updated_dbf_key = store.put(updated_dbf_bytes)
+        job.add_cleanup(store.release, updated_dbf_key)
+
+    with job.step('dbf.dataframe'):
+        df = cached_dbf_dataframe(updated_dbf_bytes)
+
+    result = {
+        'jle_data': jle_data,
+        'dbf_name': dbf_name,
+        'updated_dbf_key': updated_dbf_key,
+        'matched': reconciliation['matched'],
+        'changes': reconciliation['changes'],
+        'reconciliation': reconciliation,
+        'df': df,
+        'report_name': report_filename(excel_filename),
+        'report_key': None,
+    }
+
+    try:
+        with job.step('report.render'):
+            from course_index import parse_dbf_filename
+            from reports import render_word_report_from_jle_and_uploaded_dbf
+
+            meta = parse_dbf_filename(dbf_name)
+            if meta is not None:
+                job.message('info', f"🔍 Attempting to match: Year/Sem={meta['year_semester']}, "
+                                    f"SubjNum={meta['subj_num']}, SubjCode={meta['subj_code']}")
+            jle_df = jle_data.get('course_data')
+            if jle_df is not None and not jle_df.empty:
+                job.message('info', f"📚 JLE contains {len(jle_df)} course(s): "
+                                    f"{(jle_df['Subject Code'] + '(' + jle_df['Subject Num'] + ')').tolist()}")
+
+            render = render_word_report_from_jle_and_uploaded_dbf(jle_data, dbf_name, df)
+
+        report_messages(job, render)
+        result['report_key'] = store.put(render.document_bytes)
+        job.add_cleanup(store.release, result['report_key'])
+    except Exception as e:
+        job.message('error', f"Error generating Word report: {str(e)}")
+
+    return result
@@ -0,0 +1,141 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# Bump a version whenever that parser's output changes, so stale entries
+# from an older parser are never served
+PARSER_VERSIONS = {
+    'jle': 2,    # native VFP table reader
+    'dbf': 2,    # numpy reader, deleted records skipped
+    'excel': 3,  # sheet rows (repeated IDs kept), layout resolved per template
+}
+
+DEFAULT_MAX_BYTES = int(os.environ.get('ECLASS_PARSE_CACHE_MB', '64')) * 1024 * 1024
+
+
+def content_key(kind, data, *extra):
+    """Cache key: parser kind and version, SHA-256 of the bytes, plus any extra inputs (e.g. the filename)"""
+    return (kind, PARSER_VERSIONS.get(kind, 0), hashlib.sha256(data).hexdigest()) + tuple(extra)
+
+
+def estimate_size(value):
+    """Rough in-memory size of a parsed result, used for the cache's memory cap"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ParseCache:
+    """
+    Least-recently-used cache of parsed uploads, keyed by content hash.
+
+    Entries are evicted oldest-first once the estimated size of all cached
+    results exceeds max_bytes. A single result larger than the cap is
+    returned but not stored. Cached results are shared between callers and
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._total += size
+            while self._total > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total -= evicted_size
+
+    def get_or_parse(self, key, parse):
+        """Return the cached result for key, running parse() and caching it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = parse()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Process-wide cache shared by every Streamlit session and rerun
+_cache = ParseCache()
+
+
+def get_cache():
+    return _cache
+
+
+def cached_jle_data(jle_bytes, filename):
+    """Parsed JLE info (as config.extract_jle_data returns) for the uploaded bytes"""
+    from config import extract_jle_data
+
+    def parse():
+        jle_file = io.BytesIO(jle_bytes)
+        jle_file.name = filename
+        return extract_jle_data(jle_file)
+
+    # The filename is part of the key: academic year and semester come from it
+    return _cache.get_or_parse(content_key('jle', jle_bytes, filename), parse)
+
+
+def cached_dbf_dataframe(dbf_bytes):
+    """DataFrame of a DBF grade sheet (as pipeline.read_dbf_to_dataframe returns)"""
+    from pipeline import read_dbf_to_dataframe
+    return _cache.get_or_parse(content_key('dbf', dbf_bytes), lambda: read_dbf_to_dataframe(dbf_bytes))
+
+
+def cached_excel_records(excel_bytes):
+    """FFG student rows of an E-Class record (as excel_grades.read_ffg_records returns)"""
+    from excel_grades import read_ffg_records
+    return _cache.get_or_parse(content_key('excel', excel_bytes), lambda: read_ffg_records(excel_bytes))
+
+
+def cached_excel_grades(excel_bytes):
+    """Student ID -> (grade, remark) map of an E-Class record (as excel_grades.read_ffg_grades returns)"""
+    from excel_grades import grades_by_id
+    return grades_by_id(cached_excel_records(excel_bytes))
@@ -0,0 +1,175 @@
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+
+logger = logging.getLogger('eclass2dbf.perf')
+
+# Append every finished trace as one JSON line to this file (unset = logger only)
+PERF_LOG_PATH = os.environ.get('ECLASS_PERF_LOG')
+
+# Peak memory tracking (tracemalloc) slows allocation-heavy stages down about
+# 2-3x, so it is off unless ECLASS_PERF_MEMORY=1
+TRACE_MEMORY = os.environ.get('ECLASS_PERF_MEMORY', '0') == '1'
+
+_current_trace = contextvars.ContextVar('eclass_perf_trace', default=None)
+
+_log_lock = threading.Lock()
+_memory_lock = threading.Lock()
+_memory_users = 0
+_started_tracemalloc = False
+
+
+def _acquire_tracemalloc():
+    """Start tracemalloc for a trace (if nobody else has), counting concurrent users"""
+    global _memory_users, _started_tracemalloc
+    with _memory_lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracemalloc = True
+        _memory_users += 1
+
+
+def _release_tracemalloc():
+    global _memory_users, _started_tracemalloc
+    with _memory_lock:
+        _memory_users -= 1
+        if _memory_users == 0 and _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+
+class Trace:
+    """
+    Spans recorded for one unit of work (e.g. one "Update DBF" click).
+
+    Each span records wall time, CPU time of the running thread and, when
+    memory tracking is on, the peak tracemalloc bytes allocated above what
+    was live when the span started. Nested spans fold their peak into the
+    enclosing span. tracemalloc is process-wide, so peaks of traces running
+    concurrently in other threads can bleed into each other.
+    """
+
+    def __init__(self, label, memory=True):
+        self.trace_id = uuid.uuid4().hex
+        self.label = label
+        self.memory = memory
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.spans = []
+        self._stack = []  # open span records, innermost last
+
+    def _enter(self, name, attrs):
+        record = {'name': name, 'depth': len(self._stack)}
+        if attrs:
+            record['attrs'] = attrs
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent['_max_traced'] = max(parent['_max_traced'], peak)
+            tracemalloc.reset_peak()
+            record['_start_traced'] = current
+            record['_max_traced'] = current
+        self.spans.append(record)
+        self._stack.append(record)
+        record['_start_wall'] = time.perf_counter()
+        record['_start_cpu'] = time.thread_time()
+        return record
+
+    def _exit(self, record, error=None):
+        record['wall_s'] = time.perf_counter() - record.pop('_start_wall')
+        record['cpu_s'] = time.thread_time() - record.pop('_start_cpu')
+        if self.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            max_traced = max(record.pop('_max_traced'), peak)
+            record['peak_bytes'] = max_traced - record.pop('_start_traced')
+            if len(self._stack) > 1:
+                parent = self._stack[-2]
+                parent['_max_traced'] = max(parent['_max_traced'], max_traced)
+        if error is not None:
+            record['error'] = error
+        self._stack.pop()
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'label': self.label,
+            'started_at': self.started_at,
+            'spans': [{k: v for k, v in span.items() if not k.startswith('_')} for span in self.spans],
+        }
+
+
+@contextlib.contextmanager
+def trace(label, memory=None):
+    """
+    Record every span opened (in this thread/context) until the block exits,
+    then write the trace to the JSON log.
+
+    Yields:
+        Trace: The trace being recorded; its root span is named after label
+    """
+    memory = TRACE_MEMORY if memory is None else memory
+    current = Trace(label, memory)
+    if memory:
+        _acquire_tracemalloc()
+    token = _current_trace.set(current)
+    root = current._enter(label, None)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        current._exit(root, error)
+        _current_trace.reset(token)
+        if memory:
+            _release_tracemalloc()
+        write_log(current.to_dict())
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time a stage of the current trace; does nothing when no trace is active"""
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+    record = current._enter(name, attrs)
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        current._exit(record, error)
+
+
+def traced(name):
+    """Decorator form of span() for a whole function"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_log(record):
+    """Emit a finished trace as one JSON line (logger, plus ECLASS_PERF_LOG if set)"""
+    line = json.dumps(record)
+    logger.info(line)
+    if PERF_LOG_PATH:
+        with _log_lock:
+            with open(PERF_LOG_PATH, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
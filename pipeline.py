@@ -0,0 +1,68 @@
+import pandas as pd
+
+import vfp_table
+from dbf_update import reconcile_grades, update_grades
+from parse_cache import cached_excel_grades, cached_excel_records
+from perf import traced
+
+
+def process_files(excel_file, dbf_file, original_dbf_filename):
+    """Process the Excel and DBF files based on the original logic"""
+    excel_data = cached_excel_grades(excel_file.getvalue())
+
+    # Patch the DBF in memory and return the updated bytes
+    return update_grades(dbf_file.getvalue(), excel_data)
+
+
+def process_files_with_jle(jle_data, excel_file, dbf_file, original_dbf_filename, with_changes=False):
+    """
+    Process the Excel and DBF files with additional JLE data.
+    This function extends the original process_files function to incorporate JLE data.
+
+    The whole update runs in memory: the FFG sheet is streamed from the uploaded
+    bytes and GRADE/REMARKS are patched straight into a copy of the DBF bytes.
+    Only fields whose value actually changes are written.
+
+    Returns:
+        tuple: (updated_dbf_bytes, matched_count), plus the list of
+               (ID, field, old, new) changes when with_changes is True
+    """
+    updated_dbf_bytes, reconciliation = reconcile_files_with_jle(jle_data, excel_file, dbf_file, original_dbf_filename)
+    if with_changes:
+        return updated_dbf_bytes, reconciliation['matched'], reconciliation['changes']
+    return updated_dbf_bytes, reconciliation['matched']
+
+
+def reconcile_files_with_jle(jle_data, excel_file, dbf_file, original_dbf_filename):
+    """
+    Post the Excel grades into the DBF and report how the two sides matched up.
+
+    Returns:
+        tuple: (updated_dbf_bytes, reconciliation) with the matched count, the
+               changes, the Excel-only rows, the DBF-only records and the
+               repeated IDs (see dbf_update.reconcile_grades)
+    """
+    excel_records = cached_excel_records(excel_file.getvalue())
+
+    # Patch the DBF in memory and return the updated bytes
+    return reconcile_grades(dbf_file.getvalue(), excel_records)
+
+
+@traced('dbf.read_dataframe')
+def read_dbf_to_dataframe(dbf_bytes):
+    """
+    Convert DBF bytes to a pandas DataFrame for display
+
+    The records are read in place as a numpy structured array and decoded
+    column by column. Deleted records are skipped and VFP nulls become None;
+    character values keep their fixed-width padding, as the dbf library
+    returned them.
+    """
+    header = vfp_table.read_header(dbf_bytes)
+    field_names = [field['name'] for field in vfp_table.user_fields(header)]
+    columns = vfp_table.read_columns(dbf_bytes, header, strip_text=False)
+
+    if not columns or len(next(iter(columns.values()))) == 0:
+        # If no records, create empty dataframe with proper columns
+        return pd.DataFrame(columns=field_names)
+    return pd.DataFrame(columns, columns=field_names)
@@ -1,4 +1,3 @@
-import streamlit as st
 import pandas as pd
 import tempfile
 import base64
@@ -9,7 +8,16 @@ import json
 import tempfile
 import os
 import re
-from dbf import Table
+import copy
+import threading
+from docx.table import Table as DocxTable
+from docx.text.paragraph import Paragraph
+from docx.oxml.ns import qn
+from docx.oxml.shared import OxmlElement
+
+from course_index import build_course_index, dbf_course_key, find_course
+from dbf_schema import resolve_roles
+from perf import span, traced
 
 
 def parse_jle_with_filename_fixed(file_path):
@@ -177,33 +185,17 @@ def find_matching_dbf(jle_file_path, dbf_directory="testfiles"):
     if jle_df.empty:
         return None, None
 
+    # Index the courses once; each DBF filename is then a single lookup
+    course_index = build_course_index(jle_df)
+
     # Get all DBF files in the directory
     dbf_files = [f for f in os.listdir(dbf_directory) if f.lower().endswith('.dbf')]
 
     for dbf_file in dbf_files:
-        dbf_path = os.path.join(dbf_directory, dbf_file)
-
-        # Extract parts from DBF filename to match against JLE
         # Pattern: ORG_YYYYX_SUBJNUM_SUBJCODE_ID.DBF
-        parts = dbf_file.replace('.DBF', '').split('_')
-        if len(parts) >= 4:
-            year_semester = parts[1]  # YYYYX
-            subj_num = parts[2]       # SUBJNUM
-            subj_code = parts[3]      # SUBJCODE
-
-            # Check if any of the JLE records match
-            for _, jle_record in jle_df.iterrows():
-                jle_academic_year = jle_record['Academic Year']  # Full format like "2024-2025"
-                jle_year = jle_academic_year.split('-')[0]  # Get first part like "2024"
-                jle_year_semester = f"{jle_year}{get_semester_digit(jle_record['Semester'])}"  # Full format like "20243"
-                jle_subj_num = jle_record['Subject Num']
-                jle_subj_code = jle_record['Subject Code']
-
-                # Check if the components match
-                if (year_semester == jle_year_semester and
-                    subj_num == jle_subj_num and
-                    subj_code == jle_subj_code):
-                    return dbf_path, jle_record  # Return the matching DBF path and JLE record
+        pos = course_index.get(dbf_course_key(dbf_file))
+        if pos is not None:
+            return os.path.join(dbf_directory, dbf_file), jle_df.iloc[pos]  # Return the matching DBF path and JLE record
 
     return None, None
 
@@ -214,66 +206,271 @@ def find_matching_dbf_from_jle_data(jle_data, dbf_directory="testfiles"):
     if jle_data is None or 'course_data' not in jle_data or jle_data['course_data'] is None or jle_data['course_data'].empty:
         return None, None
 
-    jle_df = jle_data['course_data']
-
     # Get all DBF files in the directory
     dbf_files = [f for f in os.listdir(dbf_directory) if f.lower().endswith('.dbf')]
 
     for dbf_file in dbf_files:
-        dbf_path = os.path.join(dbf_directory, dbf_file)
-
-        # Extract parts from DBF filename to match against JLE
         # Pattern: ORG_YYYYX_SUBJNUM_SUBJCODE_ID.DBF
-        parts = dbf_file.replace('.DBF', '').split('_')
-        if len(parts) >= 4:
-            year_semester = parts[1]  # YYYYX
-            subj_num = parts[2]       # SUBJNUM
-            subj_code = parts[3]      # SUBJCODE
-
-            # Check if any of the JLE records match
-            for _, jle_record in jle_df.iterrows():
-                jle_academic_year = jle_record.get('Academic Year', '')  # Full format like "2024-2025"
-                if jle_academic_year:
-                    jle_year = jle_academic_year.split('-')[0]  # Get first part like "2024"
-                    jle_year_semester = f"{jle_year}{get_semester_digit(jle_record.get('Semester', ''))}"  # Full format like "20243"
-                    jle_subj_num = jle_record.get('Subject Num', '')
-                    jle_subj_code = jle_record.get('Subject Code', '')
-
-                    # Check if the components match
-                    if (year_semester == jle_year_semester and
-                        subj_num == jle_subj_num and
-                        subj_code == jle_subj_code):
-                        return dbf_path, jle_record  # Return the matching DBF path and JLE record
+        jle_record = find_course(jle_data, dbf_file)
+        if jle_record is not None:
+            return os.path.join(dbf_directory, dbf_file), jle_record  # Return the matching DBF path and JLE record
 
     return None, None
 
 
-def get_semester_digit(semester_str):
-    """Convert semester string to digit"""
-    semester_map = {
-        '1st Semester': '1',
-        '2nd Semester': '2',
-        'Summer': '3'
-    }
-    return semester_map.get(semester_str, '0')
-
-
 def extract_dbf_data(dbf_path):
     """Extract data from DBF file"""
-    table = Table(dbf_path)
-    table.open()
+    from pipeline import read_dbf_to_dataframe
+
+    with open(dbf_path, 'rb') as f:
+        return read_dbf_to_dataframe(f.read())
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\[Insert ([^\]]+)\]")
+
+
+def _element_path(root, element):
+    """Child-index path from root down to element"""
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return tuple(reversed(path))
+
+
+def _resolve_path(root, path):
+    """Follow a child-index path recorded by _element_path"""
+    element = root
+    for index in path:
+        element = element[index]
+    return element
+
+
+def _story_parts(doc):
+    """The main document part plus every header and footer part, keyed by partname"""
+    parts = {}
+    for part in doc.part.package.iter_parts():
+        partname = str(part.partname)
+        if partname == '/word/document.xml' or re.match(r'^/word/(header|footer)\d*\.xml$', partname):
+            parts[partname] = part
+    return parts
+
+
+# Characters XML 1.0 cannot carry: control characters other than tab, newline
+# and carriage return, lone surrogates and the U+FFFE/U+FFFF non-characters
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+
+def sanitize_xml_text(text):
+    """Replace characters that are not XML compatible with '?' ("N/A" for None)"""
+    if text is None:
+        return "N/A"
+    text = str(text)
+    if XML_INVALID_CHARS.search(text) is None:
+        return text
+    return XML_INVALID_CHARS.sub('?', text)
+
+
+def sanitize_xml_column(values):
+    """
+    Vectorized sanitize_xml_text for a pandas Series: cell text of every
+    value, with missing values as "" rather than "N/A"
+
+    Returns:
+        list: Sanitized strings in row order
+    """
+    strings = values.map(str).where(values.notna(), "").astype(object)
+    return strings.str.replace(XML_INVALID_CHARS, '?', regex=True).tolist()
+
+
+# Remark keywords for the report statistics, in precedence order:
+# passed, no grade, failed, dropped
+REMARK_CATEGORIES = (
+    ('PASSED', 'PASS', 'OK', 'COMPLETED'),
+    ('NO GRADE', 'N/A', 'NO REMARK', 'NONE', 'INC', 'INCOMPLETE'),
+    ('FAILED', 'FAIL'),
+    ('DROPPED', 'DROP', 'WITHDRAWN', 'WITHDREW', 'DRP'),
+)
+
+# Characters python-docx writes as w:tab / w:br rather than plain w:t text
+RUN_BREAK_CHARS = re.compile(r'[\t\n\r]')
+
+
+def _set_run_text(r, text):
+    """Set the text of a cloned w:r exactly as python-docx's run.text setter would"""
+    t = r.find(qn('w:t'))
+    if t is None or RUN_BREAK_CHARS.search(text):
+        r.text = text
+    elif not text:
+        r.remove(t)
+    else:
+        t.text = text
+        if len(text.strip()) < len(text):
+            t.set(qn('xml:space'), 'preserve')
+        else:
+            t.attrib.pop(qn('xml:space'), None)
+
+
+# Border edges in the order w:tblBorders / w:tcBorders require them
+BORDER_EDGES = ('top', 'start', 'left', 'bottom', 'end', 'right', 'insideH', 'insideV', 'tl2br', 'tr2bl')
+
+# (edge, style, size in eighths of a point); 'nil' removes the edge
+SINGLE_GRID_BORDERS = tuple((edge, 'single', 4) for edge in ('top', 'left', 'bottom', 'right', 'insideH', 'insideV'))
+
+# Student table: a single 1/2 pt rule under every row, no vertical rules
+STUDENT_TABLE_BORDERS = (
+    ('top', 'single', 4),
+    ('left', 'nil', None),
+    ('bottom', 'single', 4),
+    ('right', 'nil', None),
+    ('insideH', 'single', 4),
+    ('insideV', 'nil', None),
+)
+STUDENT_ROW_BORDERS = (('bottom', 'single', 4), ('left', 'nil', None), ('right', 'nil', None))
+FINAL_ROW_BORDERS = (('bottom', 'double', 6),)
+
+# Children of w:tblPr / w:tcPr that must follow the borders element
+TBL_BORDERS_SUCCESSORS = ('w:shd', 'w:tblLayout', 'w:tblCellMar', 'w:tblLook', 'w:tblCaption',
+                          'w:tblDescription', 'w:tblPrChange')
+TC_BORDERS_SUCCESSORS = ('w:shd', 'w:noWrap', 'w:tcMar', 'w:textDirection', 'w:tcFitText', 'w:vAlign',
+                         'w:hideMark', 'w:headers', 'w:cellIns', 'w:cellDel', 'w:cellMerge', 'w:tcPrChange')
+
+
+def _set_borders(borders, edges):
+    """Set edges on a w:tblBorders/w:tcBorders element, replacing any earlier setting of the same edge"""
+    for edge, style, size in edges:
+        for old in borders.findall(qn(f'w:{edge}')):
+            borders.remove(old)
+        border = OxmlElement(f'w:{edge}')
+        border.set(qn('w:val'), style)
+        if style != 'nil':
+            border.set(qn('w:sz'), str(size))
+            border.set(qn('w:space'), '0')
+            border.set(qn('w:color'), '000000')
+
+        later = set(qn(f'w:{e}') for e in BORDER_EDGES[BORDER_EDGES.index(edge) + 1:])
+        successor = next((child for child in borders if child.tag in later), None)
+        if successor is None:
+            borders.append(border)
+        else:
+            successor.addprevious(border)
+
+
+def _get_or_add_borders(properties, tag, successors):
+    borders = properties.find(qn(tag))
+    if borders is None:
+        borders = OxmlElement(tag)
+        properties.insert_element_before(borders, *successors)
+    return borders
+
 
-    records = []
-    for record in table:
-        record_dict = {}
-        for field in table.field_names:
-            record_dict[field] = record[field]
-        records.append(record_dict)
+class CompiledTemplate:
+    """
+    A report template parsed once, with the location of every [Insert KEY]
+    slot and of the student data table recorded as child-index paths.
+
+    render() deep-copies the parsed document and resolves those paths on
+    the copy, so filling a report only touches the paragraphs that actually
+    hold placeholders instead of re-reading the template and testing every
+    key against every paragraph.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.slots = []  # (partname, paragraph path, placeholder keys in order of appearance)
+        self.student_table_path = None
+
+        for partname, part in _story_parts(doc).items():
+            root = part.element
+            for p_element in root.iter(qn('w:p')):
+                text = Paragraph(p_element, None).text
+                keys = list(dict.fromkeys(PLACEHOLDER_PATTERN.findall(text)))
+                if keys:
+                    self.slots.append((partname, _element_path(root, p_element), keys))
+
+        # The student table is the first body table with a row of at least 5 cells
+        for table in doc.tables:
+            if WordReport.is_student_data_table(table):
+                self.student_table_path = _element_path(doc.element, table._tbl)
+                break
+
+    def render(self):
+        """
+        Clone the compiled document.
+
+        Returns:
+            tuple: (document, list of (partname, paragraph, keys) slots, student data table or None)
+        """
+        doc = copy.deepcopy(self.doc)
+        parts = _story_parts(doc)
+        slots = [
+            (partname, Paragraph(_resolve_path(parts[partname].element, path), None), keys)
+            for partname, path, keys in self.slots
+        ]
+        student_table = None
+        if self.student_table_path is not None:
+            student_table = DocxTable(_resolve_path(doc.element, self.student_table_path), doc._body)
+        return doc, slots, student_table
+
+
+_compiled_templates = {}
+_compiled_templates_lock = threading.Lock()
+
+
+def get_compiled_template(template_path=None):
+    """
+    Compiled form of the report template, parsed once per file version.
+
+    Resolves the template the same way WordReport always has: the given path
+    if it exists, else Report_template.docx in the current directory, else
+    the basic in-memory template.
+    """
+    if not (template_path and os.path.exists(template_path)):
+        template_path = "Report_template.docx" if os.path.exists("Report_template.docx") else None
+
+    if template_path:
+        stat = os.stat(template_path)
+        key = (os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size)
+    else:
+        key = None
 
-    df = pd.DataFrame(records)
-    table.close()
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is None:
+            doc = Document(template_path) if template_path else WordReport.create_basic_template()
+            compiled = CompiledTemplate(doc)
+            _compiled_templates[key] = compiled
+    return compiled
 
-    return df
+
+class RenderResult:
+    """
+    A rendered report: the DOCX bytes plus what went into them, so callers
+    can check the outcome without unzipping the document again.
+
+    Attributes:
+        document_bytes: The .docx file
+        course_matched: True/False whether the DBF was matched to a JLE
+            course, None for generators that don't match courses
+        filled: partname -> placeholder keys that were filled
+        unfilled: partname -> placeholder keys left as [Insert KEY]
+    """
+
+    def __init__(self, document_bytes, course_matched, filled, unfilled):
+        self.document_bytes = document_bytes
+        self.course_matched = course_matched
+        self.filled = filled
+        self.unfilled = unfilled
+
+    @property
+    def unfilled_keys(self):
+        """Every unfilled key, whichever part it is in"""
+        return sorted(set(key for keys in self.unfilled.values() for key in keys))
+
+    @property
+    def ok(self):
+        return self.course_matched is not False and not self.unfilled
 
 
 class WordReport:
@@ -281,19 +478,16 @@ class WordReport:
         """
         Initialize the Word report generator with a template
         If no template_path is provided, look for Report_template.docx in the current directory
+
+        The template is compiled once and cloned for each report.
         """
-        if template_path and os.path.exists(template_path):
-            self.doc = Document(template_path)
-        else:
-            # Look for template in the current directory (for Streamlit sharing)
-            default_template = "Report_template.docx"
-            if os.path.exists(default_template):
-                self.doc = Document(default_template)
-            else:
-                # Create a basic template in memory if file doesn't exist
-                self.doc = self.create_basic_template()
+        with span('report.template'):
+            self.doc, self.placeholder_slots, self.student_table = get_compiled_template(template_path).render()
+        self.placeholder_values = {}
+        self.course_matched = None  # set by the populate methods that match a JLE course
 
-    def create_basic_template(self):
+    @staticmethod
+    def create_basic_template():
         """Create a basic template in memory if file is not available"""
         doc = Document()
 
@@ -317,6 +511,19 @@ class WordReport:
 
         return doc
 
+    @traced('report.placeholders')
+    def replace_placeholders(self, placeholders):
+        """
+        Replace placeholders throughout the document using the slots recorded
+        when the template was compiled. Only paragraphs that contain
+        [Insert KEY] text are visited, and only for the keys they contain.
+        """
+        self.placeholder_values = placeholders
+        for _, paragraph, keys in self.placeholder_slots:
+            slot_placeholders = {key: placeholders[key] for key in placeholders if key in keys}
+            if slot_placeholders:
+                self.replace_placeholders_in_paragraph(paragraph, slot_placeholders)
+
     def replace_placeholders_in_paragraph(self, paragraph, placeholders):
         """
         Replace placeholders in a paragraph using square brackets [Insert KEY]
@@ -360,17 +567,7 @@ class WordReport:
         """
         Remove or replace characters that are not XML compatible
         """
-        if text is None:
-            return "N/A"
-
-        # Remove control characters (0x00-0x1F) except for tab, newline, and carriage return
-        # These are the only control characters allowed in XML
-        sanitized = ''.join(char if ord(char) >= 0x20 or ord(char) in (0x09, 0x0A, 0x0D) else '?' for char in str(text))
-
-        # Handle any remaining problematic characters
-        sanitized = sanitized.replace('\x00', '')  # Remove null bytes specifically
-
-        return sanitized
+        return sanitize_xml_text(text)
 
     def replace_placeholders_in_header_footer(self, section, placeholders):
         """
@@ -409,8 +606,10 @@ class WordReport:
         """
         # Find matching DBF file for the JLE
         matching_dbf, jle_record = find_matching_dbf(jle_file_path, dbf_directory)
+        self.course_matched = bool(matching_dbf)
 
         if not matching_dbf:
+            import streamlit as st
             st.warning("No matching DBF file found for the JLE file.")
             # Still proceed with JLE-only data
             placeholders = {
@@ -467,17 +666,8 @@ class WordReport:
             # No matching DBF file, so no student data to populate
             pass
 
-        # Replace placeholders in headers and footers for all sections
-        for section in self.doc.sections:
-            self.replace_placeholders_in_header_footer(section, placeholders)
-
-        # Replace placeholders in the main document body
-        for paragraph in self.doc.paragraphs:
-            self.replace_placeholders_in_paragraph(paragraph, placeholders)
-
-        # Replace placeholders in tables in the main document body
-        for table in self.doc.tables:
-            self.replace_placeholders_in_tables(table, placeholders)
+        # Replace placeholders in headers, footers, body paragraphs and tables
+        self.replace_placeholders(placeholders)
 
     def populate_template_with_jle_dbf_data_from_jle_data(self, jle_data, dbf_directory="testfiles"):
         """
@@ -485,6 +675,7 @@ class WordReport:
         """
         # Find matching DBF file for the JLE data
         matching_dbf, jle_record = find_matching_dbf_from_jle_data(jle_data, dbf_directory)
+        self.course_matched = bool(matching_dbf)
 
         if not matching_dbf:
             # Still proceed with JLE-only data
@@ -542,17 +733,8 @@ class WordReport:
             # No matching DBF file, so no student data to populate
             pass
 
-        # Replace placeholders in headers and footers for all sections
-        for section in self.doc.sections:
-            self.replace_placeholders_in_header_footer(section, placeholders)
-
-        # Replace placeholders in the main document body
-        for paragraph in self.doc.paragraphs:
-            self.replace_placeholders_in_paragraph(paragraph, placeholders)
-
-        # Replace placeholders in tables in the main document body
-        for table in self.doc.tables:
-            self.replace_placeholders_in_tables(table, placeholders)
+        # Replace placeholders in headers, footers, body paragraphs and tables
+        self.replace_placeholders(placeholders)
 
     def populate_template_with_jle_and_uploaded_dbf_data(self, jle_data, uploaded_dbf_filename, dbf_data_df):
         """
@@ -563,33 +745,9 @@ class WordReport:
 
         # Strategy 1: Try to match based on filename pattern
         # Pattern: ORG_YYYYX_SUBJNUM_SUBJCODE_ID.DBF
-        if uploaded_dbf_filename:
-            parts = uploaded_dbf_filename.replace('.DBF', '').replace('.dbf', '').split('_')
-            if len(parts) >= 4:
-                year_semester = parts[1]  # YYYYX
-                subj_num = parts[2]       # SUBJNUM
-                subj_code = parts[3]      # SUBJCODE
-
-                # Find the matching course in JLE data
-                if jle_data and 'course_data' in jle_data and jle_data['course_data'] is not None and not jle_data['course_data'].empty:
-                    jle_df = jle_data['course_data']
-
-                    # Find the matching record
-                    for _, jle_record in jle_df.iterrows():
-                        jle_academic_year = jle_record.get('Academic Year', '')  # Full format like "2024-2025"
-                        if jle_academic_year:
-                            jle_year = jle_academic_year.split('-')[0]  # Get first part like "2024"
-                            jle_year_semester = f"{jle_year}{get_semester_digit(jle_record.get('Semester', ''))}"  # Full format like "20243"
-                            jle_subj_num = jle_record.get('Subject Num', '')
-                            jle_subj_code = jle_record.get('Subject Code', '')
-
-                            # Check if the components match
-                            if (year_semester == jle_year_semester and
-                                subj_num == jle_subj_num and
-                                subj_code == jle_subj_code):
-                                matched_course = jle_record
-                                matching_successful = True
-                                break  # Found the match, exit loop
+        if jle_data and 'course_data' in jle_data and jle_data['course_data'] is not None and not jle_data['course_data'].empty:
+            matched_course = find_course(jle_data, uploaded_dbf_filename)
+            matching_successful = matched_course is not None
 
         # If no match found by filename, try other strategies
         if matched_course is None and jle_data and 'course_data' in jle_data and jle_data['course_data'] is not None and not jle_data['course_data'].empty:
@@ -601,6 +759,8 @@ class WordReport:
                 matched_course = jle_df.iloc[0]
                 matching_successful = True
 
+        self.course_matched = matching_successful
+
         # Prepare placeholders based on whether we found a match
         if matched_course is not None:
             # Found matching course, prepare detailed placeholders
@@ -645,29 +805,26 @@ class WordReport:
                 'Faculty': self.sanitize_text_for_xml('NO MATCH FOUND')
             }
 
-        # Replace placeholders in headers and footers for all sections
-        for section in self.doc.sections:
-            self.replace_placeholders_in_header_footer(section, placeholders)
-
-        # Replace placeholders in the main document body
-        for paragraph in self.doc.paragraphs:
-            self.replace_placeholders_in_paragraph(paragraph, placeholders)
-
-        # Replace placeholders in tables in the main document body
-        for table in self.doc.tables:
-            self.replace_placeholders_in_tables(table, placeholders)
+        # Replace placeholders in headers, footers, body paragraphs and tables
+        self.replace_placeholders(placeholders)
 
         # Handle the student data table specifically - look for the table with student information
         # Use the DBF data that was passed as parameter
         if dbf_data_df is not None and not dbf_data_df.empty:
             self.populate_student_data_table(dbf_data_df)
 
+    @traced('report.student_table')
     def populate_student_data_table(self, df):
         """
         Populate the student data table with records from the DataFrame.
         The table should have at least 5 columns: No., Name, Grade, [empty], Remarks
         Duplicate rows as needed to accommodate all student records.
         """
+        # The compiled template already located the student data table
+        if self.student_table is not None:
+            self.fill_student_data_table(self.student_table, df)
+            return
+
         # Find the table that contains student data (look for tables that might have student info)
         for table in self.doc.tables:
             # Check if this table is likely the student data table by checking if it has at least 5 columns
@@ -676,7 +833,8 @@ class WordReport:
                 self.fill_student_data_table(table, df)
                 break  # Only process the first student data table found
 
-    def is_student_data_table(self, table):
+    @staticmethod
+    def is_student_data_table(table):
         """
         Check if a table is likely the student data table by checking if it has at least 5 columns
         We expect at least 5 columns for student data: No., Name, Grade, [empty], Remarks
@@ -690,177 +848,64 @@ class WordReport:
                 return True
         return False
 
+    def set_table_borders(self, table, edges=SINGLE_GRID_BORDERS):
+        """
+        Set the table's border grid once in its w:tblBorders; rows and cells
+        without borders of their own inherit it
+        """
+        tbl_pr = table._tbl.tblPr
+        _set_borders(_get_or_add_borders(tbl_pr, 'w:tblBorders', TBL_BORDERS_SUCCESSORS), edges)
+
+    def set_row_borders(self, row, edges):
+        """Row-level override of the table grid, replacing the cells' earlier settings of those edges"""
+        for cell in row.cells:
+            tc_pr = cell._element.get_or_add_tcPr()
+            _set_borders(_get_or_add_borders(tc_pr, 'w:tcBorders', TC_BORDERS_SUCCESSORS), edges)
+
     def apply_borders_to_table(self, table):
         """
-        Apply borders to all cells in the table
+        Apply single borders around and between all cells of the table
         """
-        # Apply borders to each cell in the table
-        for row in table.rows:
-            for cell in row.cells:
-                # Access the cell's XML element to modify its properties
-                from docx.oxml.shared import OxmlElement, qn
-
-                # Get the table cell properties element
-                tc_pr = cell._element.tcPr
-
-                # Create a table cell borders element if it doesn't exist
-                tbl_borders = tc_pr.first_child_found_in("w:tcBorders")
-                if tbl_borders is None:
-                    tbl_borders = OxmlElement('w:tcBorders')
-                    tc_pr.append(tbl_borders)
-
-                # Create border elements
-                top_border = OxmlElement('w:top')
-                top_border.set(qn('w:val'), 'single')  # Single line style
-                top_border.set(qn('w:sz'), '4')        # Border size (4 half-points = 1/2pt)
-                top_border.set(qn('w:space'), '0')     # Space
-                top_border.set(qn('w:color'), '000000') # Black color
-                tbl_borders.append(top_border)
-
-                left_border = OxmlElement('w:left')
-                left_border.set(qn('w:val'), 'single')
-                left_border.set(qn('w:sz'), '4')
-                left_border.set(qn('w:space'), '0')
-                left_border.set(qn('w:color'), '000000')
-                tbl_borders.append(left_border)
-
-                bottom_border = OxmlElement('w:bottom')
-                bottom_border.set(qn('w:val'), 'single')
-                bottom_border.set(qn('w:sz'), '4')
-                bottom_border.set(qn('w:space'), '0')
-                bottom_border.set(qn('w:color'), '000000')
-                tbl_borders.append(bottom_border)
-
-                right_border = OxmlElement('w:right')
-                right_border.set(qn('w:val'), 'single')
-                right_border.set(qn('w:sz'), '4')
-                right_border.set(qn('w:space'), '0')
-                right_border.set(qn('w:color'), '000000')
-                tbl_borders.append(right_border)
-
-                # Add horizontal and vertical inner borders
-                inside_h_border = OxmlElement('w:insideH')
-                inside_h_border.set(qn('w:val'), 'single')
-                inside_h_border.set(qn('w:sz'), '4')
-                inside_h_border.set(qn('w:space'), '0')
-                inside_h_border.set(qn('w:color'), '000000')
-                tbl_borders.append(inside_h_border)
-
-                inside_v_border = OxmlElement('w:insideV')
-                inside_v_border.set(qn('w:val'), 'single')
-                inside_v_border.set(qn('w:sz'), '4')
-                inside_v_border.set(qn('w:space'), '0')
-                inside_v_border.set(qn('w:color'), '000000')
-                tbl_borders.append(inside_v_border)
+        self.set_table_borders(table, SINGLE_GRID_BORDERS)
 
     def copy_borders_from_template_row(self, template_row, target_row):
         """
         Apply only bottom border (single 1/2 pt) to target row cells, no left or right borders
         """
-        from docx.oxml.shared import OxmlElement, qn
-
-        # Apply only bottom border to each cell in the target row
-        for target_cell in target_row.cells:
-            # Access the cell's XML element to modify its properties
-            tc_pr = target_cell._element.tcPr
-
-            # Create a table cell borders element
-            tbl_borders = OxmlElement('w:tcBorders')
-            tc_pr.append(tbl_borders)
-
-            # Create bottom border element (single, 1/2 pt = 4 half-points)
-            bottom_border = OxmlElement('w:bottom')
-            bottom_border.set(qn('w:val'), 'single')  # Single line style
-            bottom_border.set(qn('w:sz'), '4')        # Border size (4 half-points = 1/2pt)
-            bottom_border.set(qn('w:space'), '0')     # Space
-            bottom_border.set(qn('w:color'), '000000') # Black color
-            tbl_borders.append(bottom_border)
-
-            # Explicitly set left and right borders to 'nil' to remove them
-            left_border = OxmlElement('w:left')
-            left_border.set(qn('w:val'), 'nil')  # No border
-            tbl_borders.append(left_border)
-
-            right_border = OxmlElement('w:right')
-            right_border.set(qn('w:val'), 'nil')  # No border
-            tbl_borders.append(right_border)
+        self.set_row_borders(target_row, STUDENT_ROW_BORDERS)
 
     def fill_student_data_table(self, table, df):
         """
         Fill the student data table with DataFrame content, handling pagination
         Each page holds up to 23 records, then continues on the next page if needed.
+
+        Cell strings are computed column-wise up front. Rows already in the
+        template are filled in place; every further row is cloned from one
+        pre-styled prototype row and the clones are appended in one go.
         """
-        # Identify the appropriate columns for Name, Grade, and Remark
-        name_col = self.find_column_name(df, ['name', 'student', 'stud', 'fullname', 'full_name', 'first_name', 'last_name', 'lname', 'fname'])
-        grade_col = self.find_column_name(df, ['grade', 'h', 'g', 'score', 'result', 'mark'])
-        remark_col = self.find_column_name(df, ['remark', 'i', 'remarks', 'status', 'comment', 'comments'])
-
-        # Add row numbers column
-        df_with_numbers = df.copy()
-        df_with_numbers.insert(0, 'row_number', range(1, len(df_with_numbers) + 1))
-
-        # Process each student record with pagination (max 23 records per page)
-        records_per_page = 23
-
-        for idx, row in df_with_numbers.iterrows():
-            # Determine which row in the table to use
-            target_row_idx = idx  # Start from the first row (0-indexed)
-
-            # Check if we need to add a new row
-            if target_row_idx >= len(table.rows):
-                # Need to add a new row
-                new_row = table.add_row()
-                target_row = new_row
-                # Copy border styles from the first row to the new row (if there's an existing row to copy from)
-                if len(table.rows) > 1:
-                    # Use the first data row as template (if it exists)
-                    first_row_idx = 0
-                    if len(table.rows) > first_row_idx + 1:  # Make sure we have a row to copy from
-                        template_row = table.rows[first_row_idx]
-                        self.copy_borders_from_template_row(template_row, target_row)
-            else:
-                target_row = table.rows[target_row_idx]
-
-            # Fill the row with data using column positions:
-            # Column 0: Number (row index)
-            # Column 1: Name (determined by find_column_name)
-            # Column 2: Grade (determined by find_column_name)
-            # Column 3: Empty (should be empty)
-            # Column 4: Remarks (determined by find_column_name)
-            for cell_idx, cell in enumerate(target_row.cells):
-                if cell_idx == 0:  # Number column
-                    cell.text = str(row['row_number'])
-                elif cell_idx == 1:  # Name column
-                    name_value = ""
-                    if name_col and name_col in df.columns:
-                        name_value = str(row[name_col]) if pd.notna(row[name_col]) else ""
-                    elif len(df.columns) >= 1:
-                        # Fallback to first column if name column not found
-                        name_value = str(df.iloc[idx, 0]) if pd.notna(df.iloc[idx, 0]) else ""
-                    cell.text = name_value
-                elif cell_idx == 2:  # Grade column
-                    grade_value = ""
-                    if grade_col and grade_col in df.columns:
-                        grade_value = str(row[grade_col]) if pd.notna(row[grade_col]) else ""
-                    elif len(df.columns) >= 2:
-                        # Fallback to second column if grade column not found
-                        grade_value = str(df.iloc[idx, 1]) if pd.notna(df.iloc[idx, 1]) else ""
-                    cell.text = grade_value
-                elif cell_idx == 3:  # Additional column (empty)
-                    cell.text = ""
-                elif cell_idx == 4:  # Remarks column
-                    remark_value = ""
-                    if remark_col and remark_col in df.columns:
-                        remark_value = str(row[remark_col]) if pd.notna(row[remark_col]) else ""
-                    elif len(df.columns) >= 3:
-                        # Fallback to third column if remark column not found
-                        remark_value = str(df.iloc[idx, 2]) if pd.notna(df.iloc[idx, 2]) else ""
-                    cell.text = remark_value
-                elif cell_idx >= 5:  # Additional columns beyond the 5th
-                    cell.text = ""
-
-                # Sanitize the text to ensure it's XML compatible
-                cell.text = self.sanitize_text_for_xml(cell.text)
+        # Name, Grade and Remark columns by their DBF field names (see dbf_schema);
+        # without a known name field the first column is taken as the name, as it always was
+        roles = resolve_roles(df.columns)
+        name_col = roles.get('fullname', df.columns[0] if len(df.columns) else None)
+        grade_col = roles.get('grade')
+        remark_col = roles.get('remarks')
+
+        # Column 0: Number, 1: Name, 2: Grade, 3: Empty, 4: Remarks, 5+: Empty
+        numbers = [str(n) for n in range(1, len(df) + 1)]
+        names = self._cell_strings(df, name_col)
+        grades = self._cell_strings(df, grade_col)
+        remarks = self._cell_strings(df, remark_col)
+
+        def row_texts(pos, width):
+            texts = [numbers[pos], names[pos], grades[pos], "", remarks[pos]][:width]
+            return texts + [""] * (width - len(texts))
+
+        # Rows that already exist in the template are reused in place
+        existing_rows = list(table.rows)
+        for pos, target_row in enumerate(existing_rows[:len(df)]):
+            cells = target_row.cells
+            for cell, text in zip(cells, row_texts(pos, len(cells))):
+                cell.text = text
 
                 # Set font to Arial 10 and make all cell content bold
                 for paragraph in cell.paragraphs:
@@ -869,32 +914,38 @@ class WordReport:
                         run.font.size = Pt(10)
                         run.font.bold = True
 
+        # One border grid for the whole table; added rows carry no borders of their own
+        self.set_table_borders(table, STUDENT_TABLE_BORDERS)
+
+        if len(df) > len(existing_rows):
+            prototype = self._student_row_prototype(table)
+            cells_per_row = len(prototype.tc_lst)
+
+            new_rows = []
+            for pos in range(len(existing_rows), len(df)):
+                tr = copy.deepcopy(prototype)
+                for r, text in zip(tr.xpath('./w:tc/w:p/w:r'), row_texts(pos, cells_per_row)):
+                    _set_run_text(r, text)
+                new_rows.append(tr)
+            table._tbl.extend(new_rows)
 
         # Calculate statistics based on the remarks column
         remarks_values = pd.Series(dtype='object')  # Initialize empty series
-        if remark_col and remark_col in df.columns:
-            # Use the identified remark column
+        if remark_col is not None:
             remarks_values = df[remark_col].astype(str).str.upper()
-        elif len(df.columns) > 2:  # Fallback to 3rd column (index 2) if remark column not found
-            remarks_values = df.iloc[:, 2].astype(str).str.upper()
-
-        # Count each category separately to avoid double counting
-        passed_count = 0
-        no_grade_count = 0
-        failed_count = 0
-        dropped_count = 0
-
-        for value in remarks_values:
-            # Check each category separately and only count once per value
-            value_str = str(value) if value is not None and pd.notna(value) else ""
-            if 'PASSED' in value_str or 'PASS' in value_str or 'OK' in value_str or 'COMPLETED' in value_str:
-                passed_count += 1
-            elif 'NO GRADE' in value_str or 'N/A' in value_str or 'NO REMARK' in value_str or 'NONE' in value_str or 'INC' in value_str or 'INCOMPLETE' in value_str:
-                no_grade_count += 1
-            elif 'FAILED' in value_str or 'FAIL' in value_str:
-                failed_count += 1
-            elif 'DROPPED' in value_str or 'DROP' in value_str or 'WITHDRAWN' in value_str or 'WITHDREW' in value_str or 'DRP' in value_str:
-                dropped_count += 1
+
+        # Count each category separately to avoid double counting: a value
+        # belongs to the first category (in this order) whose keywords it contains
+        def contains_any(keywords):
+            return remarks_values.str.contains('|'.join(map(re.escape, keywords)), regex=True, na=False)
+
+        counted = pd.Series(False, index=remarks_values.index)
+        category_counts = []
+        for keywords in REMARK_CATEGORIES:
+            in_category = contains_any(keywords) & ~counted
+            category_counts.append(int(in_category.sum()))
+            counted |= in_category
+        passed_count, no_grade_count, failed_count, dropped_count = category_counts
 
         # Total number of students is the length of the dataframe
         total_count = len(df)
@@ -980,61 +1031,41 @@ class WordReport:
         # Modify the last row's bottom border to use double lines
         self.apply_double_bottom_border_to_last_rows(table)
 
-    def apply_double_bottom_border_to_last_rows(self, table):
+    def _cell_strings(self, df, col):
+        """Sanitized cell text of a DataFrame column ("" for missing values), in row order"""
+        if col is None or col not in df.columns:
+            return [""] * len(df)
+        return sanitize_xml_column(df[col])
+
+    def _student_row_prototype(self, table):
         """
-        Apply double bottom borders to the last few rows of the table to indicate the end of the data
+        Build one styled student row (Arial 10 bold runs) the same way
+        add_row() would, and detach it from the table for cloning. Its
+        borders come from the table grid.
         """
-        if not table.rows:
-            return
-
-        # Get the last row (typically the final data row)
-        if len(table.rows) > 1:  # Need at least header + one data row
-            last_row = table.rows[-1]  # Last row in the table
+        prototype_row = table.add_row()
 
-            # Apply double border to all cells in the last row
-            for cell in last_row.cells:
-                # Access the cell's XML element to modify its properties
-                from docx.oxml.shared import OxmlElement, qn
+        for cell in prototype_row.cells:
+            cell.text = "X"
+            for paragraph in cell.paragraphs:
+                for run in paragraph.runs:
+                    run.font.name = 'Arial'
+                    run.font.size = Pt(10)
+                    run.font.bold = True
 
-                # Get the table cell properties element
-                tc_pr = cell._element.tcPr
+        prototype = prototype_row._tr
+        table._tbl.remove(prototype)
+        return prototype
 
-                # Create a table cell borders element if it doesn't exist
-                tbl_borders = tc_pr.first_child_found_in("w:tcBorders")
-                if tbl_borders is None:
-                    tbl_borders = OxmlElement('w:tcBorders')
-                    tc_pr.append(tbl_borders)
-
-                # Create the bottom border element
-                bottom_border = OxmlElement('w:bottom')
-
-                # Set the border attributes for double line
-                bottom_border.set(qn('w:val'), 'double')  # Double line style
-                bottom_border.set(qn('w:sz'), '6')       # Border size (6 half-points = 1/2pt)
-                bottom_border.set(qn('w:space'), '0')    # Space
-                bottom_border.set(qn('w:color'), '000000')  # Black color
-
-                # Add the bottom border to the table cell borders
-                tbl_borders.append(bottom_border)
-
-    def find_column_name(self, df, possible_names):
+    def apply_double_bottom_border_to_last_rows(self, table):
         """
-        Find a column in the DataFrame based on possible names (case-insensitive)
+        Apply a double bottom border to the last row of the table to indicate the end of the data
         """
-        df_columns = [col.lower() for col in df.columns]
-        for name in possible_names:
-            for col in df.columns:
-                if name.lower() in col.lower():
-                    return col
-        # If no exact match, return the first column that seems appropriate
-        for col in df.columns:
-            for name in possible_names:
-                if name.lower() in col.lower():
-                    return col
-        # If still no match, return the first column as a fallback
-        return df.columns[0] if len(df.columns) > 0 else None
-
+        # Need at least header + one data row
+        if len(table.rows) > 1:
+            self.set_row_borders(table.rows[-1], FINAL_ROW_BORDERS)
 
+    @traced('report.save')
     def get_document_bytes(self):
         """
         Get the document as bytes for download
@@ -1044,7 +1075,23 @@ class WordReport:
         buffer.seek(0)
         return buffer.getvalue()
 
-
+    def render_result(self):
+        """
+        Save the document and report which [Insert KEY] slots were filled,
+        per story part, from the slots the compiled template recorded
+        """
+        filled = {}
+        unfilled = {}
+        for partname, _, keys in self.placeholder_slots:
+            for key in keys:
+                target = filled if key in self.placeholder_values else unfilled
+                part_keys = target.setdefault(partname, [])
+                if key not in part_keys:
+                    part_keys.append(key)
+        return RenderResult(self.get_document_bytes(), self.course_matched, filled, unfilled)
+
+
+@traced('report.generate')
 def generate_word_report_from_jle_dbf(jle_file_path, template_path=None, dbf_directory="testfiles"):
     """
     Generate a Word report from the matched JLE and DBF files using the template
@@ -1054,6 +1101,7 @@ def generate_word_report_from_jle_dbf(jle_file_path, template_path=None, dbf_dir
     return word_report.get_document_bytes()
 
 
+@traced('report.generate')
 def generate_word_report_from_jle_data(jle_data, template_path=None, dbf_directory="testfiles"):
     """
     Generate a Word report from the matched JLE data and DBF files using the template
@@ -1063,15 +1111,27 @@ def generate_word_report_from_jle_data(jle_data, template_path=None, dbf_directo
     return word_report.get_document_bytes()
 
 
-def generate_word_report_from_jle_and_uploaded_dbf(jle_data, uploaded_dbf_filename, dbf_data_df, template_path=None):
+@traced('report.generate')
+def render_word_report_from_jle_and_uploaded_dbf(jle_data, uploaded_dbf_filename, dbf_data_df, template_path=None):
     """
     Generate a Word report from JLE data and uploaded DBF file information
+
+    Returns:
+        RenderResult: The document bytes with the course match status and filled/unfilled placeholders
     """
     word_report = WordReport(template_path)
     word_report.populate_template_with_jle_and_uploaded_dbf_data(jle_data, uploaded_dbf_filename, dbf_data_df)
-    return word_report.get_document_bytes()
+    return word_report.render_result()
 
 
+def generate_word_report_from_jle_and_uploaded_dbf(jle_data, uploaded_dbf_filename, dbf_data_df, template_path=None):
+    """
+    Generate a Word report from JLE data and uploaded DBF file information
+    """
+    return render_word_report_from_jle_and_uploaded_dbf(jle_data, uploaded_dbf_filename, dbf_data_df, template_path).document_bytes
+
+
+@traced('report.generate')
 def generate_word_report(df, jle_data, template_path=None):
     """
     Generate a Word report from the DataFrame and JLE data using the template
@@ -1150,17 +1210,8 @@ def generate_word_report(df, jle_data, template_path=None):
                 'COLUMN_NAMES': word_report.sanitize_text_for_xml(', '.join(df.columns.tolist()))
             })
 
-        # Replace placeholders in headers and footers for all sections
-        for section in word_report.doc.sections:
-            word_report.replace_placeholders_in_header_footer(section, placeholders)
-
-        # Replace placeholders in the main document body
-        for paragraph in word_report.doc.paragraphs:
-            word_report.replace_placeholders_in_paragraph(paragraph, placeholders)
-
-        # Replace placeholders in tables in the main document body
-        for table in word_report.doc.tables:
-            word_report.replace_placeholders_in_tables(table, placeholders)
+        # Replace placeholders in headers, footers, body paragraphs and tables
+        word_report.replace_placeholders(placeholders)
 
         # Handle the student data table specifically - look for the table with student information
         if df is not None and not df.empty:
@@ -1181,6 +1232,9 @@ def show_word_report_ui(df, jle_data, excel_filename=None):
     """
     Display the Word report UI
     """
+    # Streamlit is only needed by the UI; importing it lazily keeps headless use fast
+    import streamlit as st
+
     # Initialize session state variables if they don't exist
     if 'word_report_generated' not in st.session_state:
         st.session_state.word_report_generated = False
@@ -1254,6 +1308,8 @@ def show_jle_dbf_report_ui(jle_file_path, excel_filename=None):
     """
     Display the Word report UI for JLE/DBF workflow
     """
+    import streamlit as st
+
     # Initialize session state variables if they don't exist
     if 'jle_dbf_word_report_generated' not in st.session_state:
         st.session_state.jle_dbf_word_report_generated = False
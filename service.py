@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+HTTP service for posting grades without the Streamlit UI.
+
+    python service.py --host 127.0.0.1 --port 8502 --workers 4
+
+Every POST takes multipart/form-data with the files as fields named jle,
+excel and dbf (the uploaded filenames matter: the JLE's gives the academic
+year and semester, the DBF's picks its course):
+
+    GET  /health         service settings and pool load (JSON)
+    POST /jle            jle -> the parsed course list (JSON)
+    POST /dbf/update     [jle], excel, dbf -> the updated DBF
+    POST /dbf/reconcile  [jle], excel, dbf -> matched/unmatched/duplicate IDs and changes (JSON)
+    POST /report         jle, dbf -> the Word report
+    POST /post           jle, excel, dbf -> ZIP of the updated DBF, its report and reconciliation.json
+
+The work runs in a bounded process pool, so throughput scales with cores:
+at most max_pending requests are queued or running, further ones get a 503
+with Retry-After. Requests larger than max_request_bytes get a 413.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlsplit
+
+logger = logging.getLogger('eclass2dbf.service')
+
+# Worker processes (default: one per core)
+DEFAULT_WORKERS = int(os.environ.get('ECLASS_SERVICE_WORKERS', str(os.cpu_count() or 1)))
+
+# Jobs queued or running in the pool at once (a timed-out job counts until
+# its worker finishes); beyond this the service answers 503
+DEFAULT_MAX_PENDING = int(os.environ.get('ECLASS_SERVICE_MAX_PENDING', str(2 * DEFAULT_WORKERS)))
+
+# Largest accepted request body
+DEFAULT_MAX_REQUEST_BYTES = int(os.environ.get('ECLASS_SERVICE_MAX_MB', '50')) * 1024 * 1024
+
+# Seconds a request may wait for its worker
+DEFAULT_TIMEOUT = int(os.environ.get('ECLASS_SERVICE_TIMEOUT', '300'))
+
+# Seconds a client connection may sit idle while sending or receiving
+CLIENT_TIMEOUT = int(os.environ.get('ECLASS_SERVICE_CLIENT_TIMEOUT', '60'))
+
+# Response bodies are written in slices of this size
+CHUNK_BYTES = 64 * 1024
+
+DOCX_MIME = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+class ServiceError(Exception):
+    """A request the service refuses, with the HTTP status to answer it with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Work done in the pool's worker processes (plain data in, plain data out) ---
+
+def _jle_data(jle_bytes, jle_name):
+    from parse_cache import cached_jle_data
+    return cached_jle_data(jle_bytes, jle_name or 'extracted.jle')
+
+
+def _named(name, data):
+    file_obj = io.BytesIO(data)
+    file_obj.name = name
+    return file_obj
+
+
+def parse_jle(jle_bytes, jle_name):
+    jle_data = _jle_data(jle_bytes, jle_name)
+    return {
+        'filename': jle_data['filename'],
+        'academic_year': jle_data['academic_year'],
+        'semester': jle_data['semester'],
+        'total_courses': jle_data['total_courses'],
+        'courses': json.loads(jle_data['course_data'].to_json(orient='records')),
+    }
+
+
+def update_dbf(jle_bytes, jle_name, excel_bytes, excel_name, dbf_bytes, dbf_name):
+    from pipeline import reconcile_files_with_jle
+
+    jle_data = _jle_data(jle_bytes, jle_name) if jle_bytes else {}
+    return reconcile_files_with_jle(jle_data, _named(excel_name, excel_bytes), _named(dbf_name, dbf_bytes), dbf_name)
+
+
+def render_report(jle_bytes, jle_name, dbf_bytes, dbf_name):
+    from pipeline import read_dbf_to_dataframe
+    from reports import render_word_report_from_jle_and_uploaded_dbf
+
+    render = render_word_report_from_jle_and_uploaded_dbf(_jle_data(jle_bytes, jle_name), dbf_name,
+                                                          read_dbf_to_dataframe(dbf_bytes))
+    return render.document_bytes, render.course_matched, render.unfilled_keys
+
+
+def post_grades(jle_bytes, jle_name, excel_bytes, excel_name, dbf_bytes, dbf_name):
+    from batch import process_pair
+
+    result = process_pair(_jle_data(jle_bytes, jle_name), dbf_name, dbf_bytes, excel_name, excel_bytes)
+    if result['error']:
+        raise ValueError(result['error'])
+
+    reconciliation = {key: result[key] for key in ('matched', 'changes', 'excel_only', 'dbf_only',
+                                                   'duplicate_excel_ids', 'duplicate_dbf_ids')}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(dbf_name, result['dbf_bytes'])
+        zf.writestr(result['report_name'], result['report_bytes'])
+        zf.writestr('reconciliation.json', json.dumps(reconciliation, indent=2))
+    return buffer.getvalue()
+
+
+class GradeService:
+    """
+    The process pool behind the HTTP handler, with a cap on the requests
+    it holds at once
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 max_request_bytes=DEFAULT_MAX_REQUEST_BYTES, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_request_bytes = max_request_bytes
+        self.timeout = timeout
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def run(self, func, *args):
+        """
+        Run func(*args) in a worker process; ServiceError 503 when the pool is
+        full, 504 on timeout. The slot is held until the worker is done with
+        the job, so a timed-out job that keeps running still counts.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ServiceError(503, "Service busy, retry shortly")
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # Only helps if it hasn't started yet
+            raise ServiceError(504, f"Processing took longer than {self.timeout} s")
+
+    def _release(self, *_):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def status(self):
+        with self._lock:
+            pending = self._pending
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': pending,
+            'max_request_bytes': self.max_request_bytes,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def content_disposition(filename):
+    """
+    Content-Disposition value for a download named after an uploaded file:
+    the basename with control characters dropped, as an ASCII filename= with
+    quotes and non-ASCII replaced, plus the exact name as UTF-8 filename*=
+    when the two differ
+    """
+    name = filename.replace('\\', '/').rsplit('/', 1)[-1]
+    name = ''.join(ch for ch in name if ch.isprintable()).strip() or 'download'
+    fallback = ''.join(ch if ch.isascii() and ch not in '"\\' else '_' for ch in name)
+    value = f'attachment; filename="{fallback}"'
+    if fallback != name:
+        value += f"; filename*=UTF-8''{quote(name, safe='')}"
+    return value
+
+
+def parse_form(content_type, body):
+    """
+    Files of a multipart/form-data body
+
+    Returns:
+        dict: field name -> (filename, bytes)
+    """
+    if not content_type or not content_type.startswith('multipart/form-data'):
+        raise ServiceError(415, "Expected multipart/form-data")
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    if not message.is_multipart():
+        raise ServiceError(400, "Malformed multipart body")
+    files = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            files[name] = (part.get_filename() or '', part.get_payload(decode=True) or b'')
+    return files
+
+
+class GradeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'EClassGradeService/1.0'
+    service = None  # GradeService, set by make_server
+    timeout = CLIENT_TIMEOUT  # Socket timeout, so a stalled client can't hold its thread
+
+    # path -> (handler method, required fields, optional fields)
+    ROUTES = {
+        '/jle': ('handle_jle', ('jle',), ()),
+        '/dbf/update': ('handle_update', ('excel', 'dbf'), ('jle',)),
+        '/dbf/reconcile': ('handle_reconcile', ('excel', 'dbf'), ('jle',)),
+        '/report': ('handle_report', ('jle', 'dbf'), ()),
+        '/post': ('handle_post', ('jle', 'excel', 'dbf'), ()),
+    }
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/health':
+            return self.send_json(404, {'error': 'Not found'})
+        self.send_json(200, self.service.status())
+
+    def do_POST(self):
+        route = self.ROUTES.get(urlsplit(self.path).path)
+        try:
+            if route is None:
+                raise ServiceError(404, "Not found")
+            method, required, optional = route
+            files = parse_form(self.headers.get('Content-Type'), self.read_body())
+            missing = [name for name in required if not files.get(name, ('', b''))[1]]
+            if missing:
+                raise ServiceError(400, f"Missing file field(s): {', '.join(missing)}")
+            uploads = {name: files.get(name, ('', b'')) for name in required + optional}
+            getattr(self, method)(uploads)
+        except ServiceError as e:
+            self.send_json(e.status, {'error': str(e)}, retry_after=e.status == 503)
+        except ValueError as e:
+            self.send_json(422, {'error': str(e)})
+        except Exception as e:
+            logger.exception("Request to %s failed", self.path)
+            self.send_json(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def read_body(self):
+        length = self.headers.get('Content-Length')
+        if length is not None:
+            length = length.strip()
+        if length is None:
+            raise ServiceError(411, "Content-Length required")
+        # The unread body can't be skipped safely, so refused requests close the connection
+        if not (length.isascii() and length.isdigit()):
+            self.close_connection = True
+            raise ServiceError(400, f"Invalid Content-Length: {length!r}")
+        length = int(length)
+        if length > self.service.max_request_bytes:
+            self.close_connection = True
+            raise ServiceError(413, f"Request body over {self.service.max_request_bytes} bytes")
+        try:
+            body = self.rfile.read(length)
+        except TimeoutError:
+            self.close_connection = True
+            raise ServiceError(408, f"Request body not received within {self.timeout} s")
+        if len(body) < length:
+            self.close_connection = True
+            raise ServiceError(400, "Request body shorter than its Content-Length")
+        return body
+
+    def handle_jle(self, uploads):
+        jle_name, jle_bytes = uploads['jle']
+        self.send_json(200, self.service.run(parse_jle, jle_bytes, jle_name))
+
+    def _update(self, uploads):
+        jle_name, jle_bytes = uploads['jle']
+        excel_name, excel_bytes = uploads['excel']
+        dbf_name, dbf_bytes = uploads['dbf']
+        return self.service.run(update_dbf, jle_bytes, jle_name, excel_bytes, excel_name, dbf_bytes, dbf_name)
+
+    def handle_update(self, uploads):
+        updated_dbf_bytes, reconciliation = self._update(uploads)
+        self.send_bytes(updated_dbf_bytes, 'application/octet-stream', uploads['dbf'][0] or 'updated.dbf', {
+            'X-Matched': reconciliation['matched'],
+            'X-Changed-Fields': len(reconciliation['changes']),
+            'X-Excel-Only': len(reconciliation['excel_only']),
+            'X-Dbf-Only': len(reconciliation['dbf_only']),
+        })
+
+    def handle_reconcile(self, uploads):
+        _, reconciliation = self._update(uploads)
+        self.send_json(200, reconciliation)
+
+    def handle_report(self, uploads):
+        from batch import report_filename
+
+        jle_name, jle_bytes = uploads['jle']
+        dbf_name, dbf_bytes = uploads['dbf']
+        document_bytes, course_matched, unfilled = self.service.run(render_report, jle_bytes, jle_name, dbf_bytes, dbf_name)
+        self.send_bytes(document_bytes, DOCX_MIME, report_filename(dbf_name), {
+            'X-Course-Matched': 'yes' if course_matched else 'no',
+            'X-Unfilled-Placeholders': ','.join(unfilled),
+        })
+
+    def handle_post(self, uploads):
+        jle_name, jle_bytes = uploads['jle']
+        excel_name, excel_bytes = uploads['excel']
+        dbf_name, dbf_bytes = uploads['dbf']
+        zip_bytes = self.service.run(post_grades, jle_bytes, jle_name, excel_bytes, excel_name, dbf_bytes, dbf_name)
+        self.send_bytes(zip_bytes, 'application/zip', dbf_name.rsplit('.', 1)[0] + '.zip')
+
+    def send_json(self, status, payload, retry_after=False):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Content-Length': len(body)}
+        if retry_after:
+            headers['Retry-After'] = 5
+        self.send_head(status, headers)
+        self.wfile.write(body)
+
+    def send_bytes(self, data, content_type, filename, headers=None):
+        """Stream a binary result in CHUNK_BYTES slices, without copying it"""
+        self.send_head(200, {
+            'Content-Type': content_type,
+            'Content-Length': len(data),
+            'Content-Disposition': content_disposition(filename),
+            **(headers or {}),
+        })
+        view = memoryview(data)
+        for start in range(0, len(view), CHUNK_BYTES):
+            self.wfile.write(view[start:start + CHUNK_BYTES])
+
+    def send_head(self, status, headers):
+        """
+        Status line and headers. Every value is checked (printable ASCII)
+        before anything is buffered, so a value that can't go in a header
+        raises while the caller can still answer with a clean error instead.
+        """
+        values = {}
+        for name, value in headers.items():
+            value = str(value)
+            if not (value.isprintable() and value.isascii()):
+                raise ServiceError(500, f"Invalid {name} header value: {value!r}")
+            values[name] = value
+        self.send_response(status)
+        for name, value in values.items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host='127.0.0.1', port=8502, service=None):
+    """HTTP server bound to host:port, handling each request on its own thread"""
+    handler = type('BoundGradeRequestHandler', (GradeRequestHandler,), {'service': service or GradeService()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP service for posting E-Class grades into DBF grade sheets.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8502, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Worker processes')
+    parser.add_argument('--max-pending', type=int, help='Requests queued or running at once (default: 2 per worker)')
+    parser.add_argument('--max-mb', type=int, default=DEFAULT_MAX_REQUEST_BYTES // (1024 * 1024), help='Largest request body in MB')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    service = GradeService(workers=args.workers, max_pending=args.max_pending or 2 * args.workers,
+                           max_request_bytes=args.max_mb * 1024 * 1024)
+    server = make_server(args.host, args.port, service)
+    logger.info("Serving on http://%s:%d with %d worker(s)", args.host, args.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
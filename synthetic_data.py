@@ -0,0 +1,287 @@
+import csv
+import io
+import random
+import struct
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+import vfp_table
+
+
+# Field layouts of the real files: (name, type, length, decimals, flags)
+JLE_FIELDS = [
+    ('SUBJNUM', 'N', 7, 0, 0),
+    ('S', 'C', 1, 0, 0),
+    ('SUBJCODE', 'C', 10, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('SUBMITTED', 'T', 8, 0, vfp_table.FIELD_FLAG_NULLABLE | vfp_table.FIELD_FLAG_BINARY),
+    ('RECORDED', 'T', 8, 0, vfp_table.FIELD_FLAG_NULLABLE | vfp_table.FIELD_FLAG_BINARY),
+    ('LECSKED', 'C', 60, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('LABSKED', 'C', 60, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('SUBJTITLE', 'C', 254, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('CREDIT', 'N', 7, 2, vfp_table.FIELD_FLAG_NULLABLE),
+    ('LECTURER', 'C', 15, 0, vfp_table.FIELD_FLAG_NULLABLE),
+]
+
+DBF_FIELDS = [
+    ('NUM', 'N', 10, 0, 0),
+    ('FULLNAME', 'C', 100, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('GRADE', 'C', 6, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('REMARKS', 'C', 30, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('CURRCODE', 'C', 10, 0, vfp_table.FIELD_FLAG_NULLABLE),
+    ('ID', 'N', 10, 0, 0),
+]
+
+ORG = 'DSO'
+YEAR_SEMESTER = '20243'    # 2024-2025, Summer
+JLE_FILENAME = f'{ORG}_{YEAR_SEMESTER}_565.JLE'
+TABLE_DATE = (25, 7, 28)   # YY MM DD written in the header, fixed so output is reproducible
+BACKLINK_LENGTH = 263      # VFP reserves this after the field terminator for the .DBC path
+
+SUBJECT_CODES = ['BACC104', 'FM101', 'GE102', 'ITE115', 'MGT201', 'ECO103', 'ACC211', 'HRM105']
+SUBJECT_TITLES = ['International Business and Trade', 'Financial Management', 'Purposive Communication',
+                  'Computer Programming', 'Operations Management', 'Basic Microeconomics',
+                  'Intermediate Accounting', 'Human Resource Management']
+LAST_NAMES = ['AIDAROS', 'ALILI', 'ALLOSO', 'AUTIDA', 'BAUTISTA', 'CRUZ', 'DELA CRUZ', 'GARCIA',
+              'MENDOZA', 'NAVARRO', 'OBERO', 'REYES', 'SANTOS', 'TAN', 'VILLANUEVA']
+FIRST_NAMES = ['ANALIE', 'JAIDE LOU', 'RICHELLE MAE', 'MHARK ANGELOU', 'JUAN', 'MARIA', 'JOSE',
+               'ANGELICA', 'KRISTINE', 'MARK', 'PAOLO', 'DANEVE']
+SCHEDULES = [' 730AM-1200PM SuSa B63', '100PM- 300PM MTW D41', '100PM- 230PM ThF D41', ' 900AM-1030AM MW A12']
+FFG_HEADERS = {2: 'NAME OF STUDENT', 3: 'ID', 4: 'FG', 6: 'FFG', 7: 'EG', 8: 'REMARKS', 9: 'STATUS'}
+
+
+def build_vfp_table(fields, rows, encoding='cp1252'):
+    """
+    Bytes of a Visual FoxPro table (signature 0x30, cp1252) laid out like the
+    registrar's files: field displacements, a _NullFlags system field, the
+    263-byte backlink and the 0x1A end-of-file marker.
+
+    Args:
+        fields: list of (name, type, length, decimals, flags)
+        rows: iterable of value lists in field order; None stores a null
+              (nullable fields) or blanks. C values are left-aligned, N
+              values right-aligned unless already padded to the field length.
+    """
+    nullable = [i for i, field in enumerate(fields) if field[4] & vfp_table.FIELD_FLAG_NULLABLE]
+    null_bits = {field_idx: bit for bit, field_idx in enumerate(nullable)}
+    null_length = (len(nullable) + 7) // 8 if nullable else 0
+
+    descriptors = []
+    offset = 1
+    for name, field_type, length, decimals, flags in fields:
+        descriptors.append((name, field_type, offset, length, decimals, flags))
+        offset += length
+    if null_length:
+        descriptors.append(('_NullFlags', '0', offset, null_length, 0,
+                            vfp_table.FIELD_FLAG_SYSTEM | vfp_table.FIELD_FLAG_BINARY))
+        offset += null_length
+    record_length = offset
+    header_length = 32 + 32 * len(descriptors) + 1 + BACKLINK_LENGTH
+
+    records = []
+    for values in rows:
+        parts = [b' ']
+        null_flags = 0
+        for field_idx, ((name, field_type, length, decimals, flags), value) in enumerate(zip(fields, values)):
+            if value is None:
+                if field_idx in null_bits:
+                    null_flags |= 1 << null_bits[field_idx]
+                parts.append(b' ' * length)
+            elif field_type == 'N':
+                raw = str(value).encode('ascii')
+                parts.append(raw if len(raw) == length else raw.rjust(length, b' '))
+            else:
+                raw = str(value).encode(encoding)
+                if len(raw) > length:
+                    raise ValueError(f"field '{name}': {len(raw)} bytes do not fit in {length}")
+                parts.append(raw.ljust(length, b' '))
+        if null_length:
+            parts.append(null_flags.to_bytes(null_length, 'little'))
+        records.append(b''.join(parts))
+
+    header = bytearray(32)
+    header[0] = 0x30
+    header[1:4] = bytes(TABLE_DATE)
+    struct.pack_into('<IHH', header, 4, len(records), header_length, record_length)
+    header[29] = 0x03
+    for name, field_type, field_offset, length, decimals, flags in descriptors:
+        descriptor = bytearray(32)
+        descriptor[:len(name)] = name.encode('ascii')
+        descriptor[11] = ord(field_type)
+        struct.pack_into('<I', descriptor, 12, field_offset)
+        descriptor[16] = length
+        descriptor[17] = decimals
+        descriptor[18] = flags
+        header += descriptor
+    header += b'\x0d' + b'\x00' * BACKLINK_LENGTH
+
+    return bytes(header) + b''.join(records) + bytes([vfp_table.EOF_MARKER])
+
+
+def course(i):
+    """The i-th synthetic course: (SUBJNUM, section letter, subject code)"""
+    return 1000 + i // 6, 'ABCDEF'[i % 6], SUBJECT_CODES[i % len(SUBJECT_CODES)]
+
+
+def dbf_filename(i=0):
+    """Grade sheet filename (ORG_YYYYX_SUBJNUM_SUBJCODE_ID.DBF) for the i-th course"""
+    subj_num, section, subj_code = course(i)
+    return f'{ORG}_{YEAR_SEMESTER}_{subj_num}{section}_{subj_code}_565.DBF'
+
+
+def excel_filename(i=0):
+    """Excel class record filename for the i-th course"""
+    subj_num, section, _ = course(i)
+    return f'{subj_num}{section}.xlsx'
+
+
+def make_jle(course_count, seed=0):
+    """JLE course schedule with course_count sections"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(course_count):
+        subj_num, section, subj_code = course(i)
+        title_idx = SUBJECT_CODES.index(subj_code)
+        lab = rng.choice(SCHEDULES) if rng.random() < 0.3 else ''
+        rows.append([
+            str(subj_num).ljust(7),           # SUBJNUM is stored left-aligned in the real files
+            section,
+            subj_code,
+            None,                             # SUBMITTED
+            None,                             # RECORDED
+            rng.choice(SCHEDULES),
+            lab,
+            SUBJECT_TITLES[title_idx],
+            '3.00',
+            f'{rng.choice(FIRST_NAMES)[:1]}. {rng.choice(LAST_NAMES)}'[:15],
+        ])
+    return build_vfp_table(JLE_FIELDS, rows)
+
+
+def student_id(i):
+    return 20230000 + i
+
+
+def make_dbf(student_count, seed=0):
+    """Grade sheet with student_count students and no grades posted yet"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(student_count):
+        name = f'{rng.choice(LAST_NAMES)}, {rng.choice(FIRST_NAMES)} {chr(65 + rng.randrange(26))}.'
+        rows.append([i + 1, name, None, '', '23BSBAMM', student_id(i)])
+    return build_vfp_table(DBF_FIELDS, rows)
+
+
+def make_ffg_workbook(student_count, seed=0, missing_every=0):
+    """
+    E-Class record (.xlsx) with an FFG sheet in the layout the grade reader
+    expects: headers in row 7 (EG in G, REMARKS in H), students from row 11
+    with the student ID in column C.
+
+    Args:
+        missing_every: leave out every n-th student (0 = everyone), so
+                       only part of the DBF matches
+    """
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    wb.create_sheet('Informations').append(['Synthetic E-Class record'])
+    ws = wb.create_sheet('FFG')
+
+    blank = [None] * max(FFG_HEADERS)
+    for row_idx in range(1, 11):
+        row = list(blank)
+        if row_idx == 7:
+            for col_idx, label in FFG_HEADERS.items():
+                row[col_idx - 1] = label
+        ws.append(row)
+
+    num = 0
+    for i in range(student_count):
+        if missing_every and i % missing_every == 0:
+            continue
+        num += 1
+        grade = round(rng.uniform(1.0, 5.0), 1)
+        final = round(rng.uniform(60, 99), 3)
+        ws.append([num, f'STUDENT {i}', student_id(i), final, None, final, grade,
+                   'PASSED' if grade <= 3.0 else 'FAILED', None])
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def ffg_sheet_rows(excel_bytes):
+    """Row tuples of a workbook's FFG sheet, as read with openpyxl"""
+    from workbook_readers import openpyxl_rows
+    return list(openpyxl_rows(excel_bytes, 'FFG'))
+
+
+def ffg_as_csv(excel_bytes):
+    """The FFG sheet of a workbook exported as CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    for row in ffg_sheet_rows(excel_bytes):
+        writer.writerow(['' if value is None else value for value in row])
+    return buffer.getvalue().encode('utf-8')
+
+
+ODS_NAMESPACES = (
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"'
+)
+
+
+def _ods_cell(value):
+    if value is None:
+        return '<table:table-cell/>'
+    if isinstance(value, (int, float)):
+        return f'<table:table-cell office:value-type="float" office:value="{value!r}"><text:p>{value}</text:p></table:table-cell>'
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(str(value))}</text:p></table:table-cell>'
+
+
+def ffg_as_ods(excel_bytes):
+    """
+    The FFG sheet of a workbook saved as an OpenDocument spreadsheet, padded
+    with repeated empty rows and columns the way LibreOffice writes them
+    """
+    rows = []
+    for row in ffg_sheet_rows(excel_bytes):
+        cells = ''.join(_ods_cell(value) for value in row)
+        rows.append(f'<table:table-row>{cells}<table:table-cell table:number-columns-repeated="16375"/></table:table-row>')
+    rows.append('<table:table-row table:number-rows-repeated="1048000"><table:table-cell table:number-columns-repeated="16384"/></table:table-row>')
+    content = (f'<?xml version="1.0" encoding="UTF-8"?><office:document-content {ODS_NAMESPACES}>'
+               f'<office:body><office:spreadsheet>'
+               f'<table:table table:name="Informations"><table:table-row><table:table-cell office:value-type="string">'
+               f'<text:p>Synthetic E-Class record</text:p></table:table-cell></table:table-row></table:table>'
+               f'<table:table table:name={quoteattr("FFG")}>{"".join(rows)}</table:table>'
+               f'</office:spreadsheet></office:body></office:document-content>')
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(zipfile.ZipInfo('mimetype'), 'application/vnd.oasis.opendocument.spreadsheet')
+        archive.writestr('content.xml', content)
+        archive.writestr('META-INF/manifest.xml',
+                         '<?xml version="1.0" encoding="UTF-8"?>'
+                         '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0">'
+                         '<manifest:file-entry manifest:full-path="/" '
+                         'manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>'
+                         '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+                         '</manifest:manifest>')
+    return buffer.getvalue()
+
+
+def make_dataset(size, seed=0):
+    """
+    JLE, DBF and FFG workbook bytes for one benchmark size, named so the
+    first course of the JLE matches the DBF and the workbook pairs with it
+
+    Returns:
+        dict: jle/dbf/excel -> (filename, bytes)
+    """
+    return {
+        'jle': (JLE_FILENAME, make_jle(size, seed)),
+        'dbf': (dbf_filename(0), make_dbf(size, seed)),
+        'excel': (excel_filename(0), make_ffg_workbook(size, seed)),
+    }
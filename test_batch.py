@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for batch pairing and processing of DBF grade sheets
+"""
+import io
+import json
+import os
+import zipfile
+
+from batch import pair_files, parse_dbf_filename, run_batch
+from config import extract_jle_data
+
+
+TESTFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles")
+
+
+def test_parse_dbf_filename():
+    """The ORG_YYYYX_SUBJNUM_SUBJCODE_ID convention is split into its parts"""
+    meta = parse_dbf_filename("DSO_20243_2506B_BACC104_565.DBF")
+    assert meta == {'org': 'DSO', 'year_semester': '20243', 'subj_num': '2506B', 'subj_code': 'BACC104'}
+    assert parse_dbf_filename("grades.dbf") is None
+
+
+def test_pair_files_by_subject_number():
+    """Excel records pair with the DBF that has the same SUBJNUM"""
+    dbf_names = [
+        "DSO_20243_2506B_BACC104_565.DBF",
+        "DSO_20243_2506A_BACC104_565.DBF",
+        "DSO_20243_2520B_FM101_565.DBF",
+    ]
+    excel_names = ["2506A.xlsm", "2506B.xlsm", "notes.xlsx"]
+
+    pairs, unpaired_dbf, unpaired_excel = pair_files(dbf_names, excel_names)
+
+    assert pairs == [
+        ("DSO_20243_2506B_BACC104_565.DBF", "2506B.xlsm"),
+        ("DSO_20243_2506A_BACC104_565.DBF", "2506A.xlsm"),
+    ]
+    assert unpaired_dbf == ["DSO_20243_2520B_FM101_565.DBF"]
+    assert unpaired_excel == ["notes.xlsx"]
+
+
+def test_pair_files_uses_subject_code_to_break_ties():
+    """When two Excel files share a SUBJNUM, the one naming the SUBJCODE wins"""
+    pairs, _, unpaired_excel = pair_files(
+        ["DSO_20243_2506B_BACC104_565.DBF"],
+        ["2506B_FM101.xlsx", "2506B_BACC104.xlsm"],
+    )
+    assert pairs == [("DSO_20243_2506B_BACC104_565.DBF", "2506B_BACC104.xlsm")]
+    assert unpaired_excel == ["2506B_FM101.xlsx"]
+
+
+def test_run_batch_builds_zip():
+    """Every pair yields an updated DBF and a report in the ZIP"""
+    with open(os.path.join(TESTFILES, "DSO_20243_565.JLE"), 'rb') as f:
+        jle_file = io.BytesIO(f.read())
+    jle_file.name = "DSO_20243_565.JLE"
+    with open(os.path.join(TESTFILES, "DSO_20243_2506B_BACC104_565.DBF"), 'rb') as f:
+        dbf_bytes = f.read()
+    with open(os.path.join(TESTFILES, "2506B.xlsm"), 'rb') as f:
+        excel_bytes = f.read()
+
+    zip_bytes, summary = run_batch(
+        extract_jle_data(jle_file),
+        {"DSO_20243_2506B_BACC104_565.DBF": dbf_bytes},
+        {"2506B.xlsm": excel_bytes},
+    )
+
+    assert summary['failed'] == 0
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+        names = zf.namelist()
+        assert "DSO_20243_2506B_BACC104_565.DBF" in names
+        assert "2506B_report.docx" in names
+        assert json.loads(zf.read("batch_summary.json"))['sheets'][0]['excel_name'] == "2506B.xlsm"
+
+
+if __name__ == "__main__":
+    test_parse_dbf_filename()
+    test_pair_files_by_subject_number()
+    test_pair_files_uses_subject_code_to_break_ties()
+    test_run_batch_builds_zip()
+    print("All batch tests passed")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed session blob store
+"""
+import gc
+import os
+import tempfile
+
+import pytest
+
+from blob_store import BlobStore, SessionBlobs
+
+
+def dbf_like(size, seed=0):
+    """Compressible, DBF-like payload (space-padded text records)"""
+    record = f" {seed:08d}  CRUZ, JUAN DELA".ljust(64).encode('ascii')
+    return (record * (size // len(record) + 1))[:size]
+
+
+def test_identical_bytes_are_stored_once():
+    """Two references to the same bytes share one blob, dropped after the last release"""
+    store = BlobStore()
+    data = dbf_like(10000)
+    key = store.put(data)
+    assert store.put(bytes(data)) == key
+    assert store.stats()['blobs'] == 1
+    assert store.refs(key) == 2
+
+    store.release(key)
+    assert store.get(key) == data
+    store.release(key)
+    assert key not in store
+    with pytest.raises(KeyError):
+        store.get(key)
+
+
+def test_cold_blobs_are_compressed_and_come_back_intact():
+    """Least recently used blobs beyond the hot budget are compressed, not lost"""
+    store = BlobStore(hot_bytes=15000)
+    first = store.put(dbf_like(10000, 1))
+    second = store.put(dbf_like(10000, 2))
+
+    assert store.tier(first) == 'cold'
+    assert store.tier(second) == 'hot'
+    assert store.stats()['memory_bytes'] < 15000
+
+    assert store.get(first) == dbf_like(10000, 1)
+    assert store.tier(first) == 'hot'
+    assert store.tier(second) == 'cold'
+
+
+def test_incompressible_blobs_are_kept_as_they_are():
+    """Already-compressed payloads (DOCX/XLSX) are not stored larger"""
+    store = BlobStore(hot_bytes=0)
+    data = os.urandom(5000)
+    key = store.put(data)
+    assert store.tier(key) == 'cold'
+    assert store.stats()['memory_bytes'] == 5000
+    assert store.get(key) == data
+
+
+def test_spill_to_disk_is_bounded():
+    """Large or overflowing blobs move to the spill directory until it is full"""
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = BlobStore(hot_bytes=0, memory_bytes=0, spill_threshold=50000,
+                          disk_bytes=1500, spill_dir=spill_dir)
+        big = store.put(dbf_like(60000, 1))
+        assert store.tier(big) == 'disk'
+        assert store.get(big) == dbf_like(60000, 1)
+        assert os.listdir(spill_dir) == [big]
+
+        # The disk area is full now: this one has to stay compressed in memory
+        overflow = store.put(os.urandom(2000))
+        assert store.tier(overflow) == 'cold'
+        assert store.stats()['disk_bytes'] <= 1500
+
+        store.release(big)
+        assert os.listdir(spill_dir) == []
+
+
+def test_session_blobs_release_on_reassign_and_collection():
+    """A session holds one reference per name and gives them all back when dropped"""
+    store = BlobStore()
+    blobs = SessionBlobs(store)
+    blobs['excel'] = b'first upload'
+    old_key = blobs.key('excel')
+    blobs['excel'] = b'second upload'
+    assert old_key not in store
+
+    blobs['report'] = b'report bytes'
+    other = SessionBlobs(store)
+    other.assign('report', blobs.key('report'))
+    assert store.refs(blobs.key('report')) == 2
+
+    del blobs
+    gc.collect()
+    assert store.stats()['blobs'] == 1
+    assert other['report'] == b'report bytes'
+
+
+if __name__ == "__main__":
+    test_identical_bytes_are_stored_once()
+    test_cold_blobs_are_compressed_and_come_back_intact()
+    test_incompressible_blobs_are_kept_as_they_are()
+    test_spill_to_disk_is_bounded()
+    test_session_blobs_release_on_reassign_and_collection()
+    print("All blob store tests passed")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled Word report template
+"""
+import io
+import os
+import zipfile
+
+from parse_cache import cached_jle_data
+from pipeline import read_dbf_to_dataframe
+from reports import CompiledTemplate, WordReport, get_compiled_template, render_word_report_from_jle_and_uploaded_dbf
+
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Report_template.docx")
+TESTFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles")
+
+
+def document_xml(word_report, part='word/header1.xml'):
+    """Save the report and return one XML part as text"""
+    with zipfile.ZipFile(io.BytesIO(word_report.get_document_bytes())) as docx_zip:
+        return docx_zip.read(part).decode('utf-8')
+
+
+def test_template_is_compiled_once():
+    """Repeated lookups of the same template return the same compiled object"""
+    assert get_compiled_template(TEMPLATE_PATH) is get_compiled_template(TEMPLATE_PATH)
+
+
+def test_slots_cover_header_placeholders():
+    """Every [Insert KEY] in the header table is recorded as a slot, including split runs"""
+    compiled = get_compiled_template(TEMPLATE_PATH)
+    keys = set(key for _, _, slot_keys in compiled.slots for key in slot_keys)
+
+    assert {'SY', 'Sem', 'SC', 'OC', 'Time', 'ST', 'LeS', 'LaS'} <= keys
+    assert compiled.student_table_path is not None
+
+
+def test_renders_are_independent_clones():
+    """Filling one report must not leak into the compiled template or other reports"""
+    first = WordReport(TEMPLATE_PATH)
+    first.replace_placeholders({'SY': '2024-2025', 'LeS': '730AM-1200PM SuSa B63'})
+    second = WordReport(TEMPLATE_PATH)
+
+    first_xml = document_xml(first)
+    second_xml = document_xml(second)
+
+    assert '2024-2025' in first_xml
+    assert '[Insert SY]' not in first_xml
+    assert '[Insert SY]' in second_xml
+    assert '2024-2025' not in second_xml
+
+
+def test_basic_template_compiles():
+    """The basic in-memory template compiles and fills like a file template"""
+    compiled = CompiledTemplate(WordReport.create_basic_template())
+    report = WordReport.__new__(WordReport)
+    report.doc, report.placeholder_slots, report.student_table = compiled.render()
+
+    report.replace_placeholders({'TITLE': 'Accounting'})
+
+    body_xml = document_xml(report, 'word/document.xml')
+    assert 'Accounting' in body_xml
+    assert '[Insert TITLE]' not in body_xml
+    assert '[Insert SY]' in body_xml
+
+
+def test_render_result_reports_slots_per_part():
+    """The render result lists filled and unfilled keys by part without reading the saved document"""
+    report = WordReport.__new__(WordReport)
+    report.doc, report.placeholder_slots, report.student_table = \
+        CompiledTemplate(WordReport.create_basic_template()).render()
+    report.course_matched = None
+    report.replace_placeholders({'TITLE': 'Accounting', 'SY': '2024-2025'})
+
+    result = report.render_result()
+    assert result.filled == {'/word/document.xml': ['TITLE', 'SY']}
+    assert result.unfilled == {'/word/document.xml': ['SC', 'SN', 'SEM', 'LECTURER', 'SCHED']}
+    assert result.unfilled_keys == ['LECTURER', 'SC', 'SCHED', 'SEM', 'SN']
+    assert not result.ok
+    assert b'Accounting' in zipfile.ZipFile(io.BytesIO(result.document_bytes)).read('word/document.xml')
+
+
+def test_render_result_course_match():
+    """A DBF matching a JLE course fills every slot; an unknown section is flagged as unmatched"""
+    with open(os.path.join(TESTFILES, "DSO_20243_565.JLE"), 'rb') as f:
+        jle_data = cached_jle_data(f.read(), "DSO_20243_565.JLE")
+    with open(os.path.join(TESTFILES, "DSO_20243_2506B_BACC104_565.DBF"), 'rb') as f:
+        df = read_dbf_to_dataframe(f.read())
+
+    matched = render_word_report_from_jle_and_uploaded_dbf(jle_data, "DSO_20243_2506B_BACC104_565.DBF", df, TEMPLATE_PATH)
+    assert matched.course_matched is True
+    assert matched.ok
+    assert 'SY' in matched.filled['/word/header1.xml']
+
+    unmatched = render_word_report_from_jle_and_uploaded_dbf(jle_data, "DSO_20243_9999Z_BACC104_565.DBF", df, TEMPLATE_PATH)
+    assert unmatched.course_matched is False
+    assert not unmatched.ok
+
+
+if __name__ == "__main__":
+    test_template_is_compiled_once()
+    test_slots_cover_header_placeholders()
+    test_renders_are_independent_clones()
+    test_basic_template_compiles()
+    test_render_result_reports_slots_per_part()
+    test_render_result_course_match()
+    print("All compiled template tests passed")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script for the hash-indexed JLE <-> DBF course matcher
+"""
+import os
+from io import BytesIO
+
+import pandas as pd
+
+from config import extract_jle_data
+from course_index import build_course_index, dbf_course_key, find_course, get_course_index
+from reports import find_matching_dbf_from_jle_data
+
+
+TESTFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles")
+
+
+def load_sample_jle_data():
+    """Parse the sample JLE the same way the app does"""
+    with open(os.path.join(TESTFILES, "DSO_20243_565.JLE"), 'rb') as f:
+        jle_file = BytesIO(f.read())
+    jle_file.name = "DSO_20243_565.JLE"
+    return extract_jle_data(jle_file)
+
+
+def test_dbf_course_key():
+    """The lookup key comes from the ORG_YYYYX_SUBJNUM_SUBJCODE_ID filename"""
+    assert dbf_course_key("DSO_20243_2506B_BACC104_565.DBF") == ('20243', '2506B', 'BACC104')
+    assert dbf_course_key("grades.dbf") is None
+    assert dbf_course_key(None) is None
+
+
+def test_extract_jle_data_builds_index_once():
+    """Parsed JLE data carries the index so later lookups don't rebuild it"""
+    jle_data = load_sample_jle_data()
+
+    assert len(jle_data['course_index']) == 6
+    assert get_course_index(jle_data) is jle_data['course_index']
+    assert find_course(jle_data, "DSO_20243_2520A_FM101_565.DBF")['Subject Num'] == '2520A'
+    assert find_course(jle_data, "DSO_20241_2520A_FM101_565.DBF") is None
+
+
+def test_first_duplicate_course_wins():
+    """A course listed twice resolves to its first row, like the old scan"""
+    jle_df = pd.DataFrame([
+        {'Subject Num': '2506B', 'Subject Code': 'BACC104', 'Academic Year': '2024-2025', 'Semester': 'Summer', 'Lecturer': 'FIRST'},
+        {'Subject Num': '2506B', 'Subject Code': 'BACC104', 'Academic Year': '2024-2025', 'Semester': 'Summer', 'Lecturer': 'SECOND'},
+        {'Subject Num': '2506A', 'Subject Code': 'BACC104', 'Academic Year': '', 'Semester': 'Summer', 'Lecturer': 'NO YEAR'},
+    ])
+
+    assert build_course_index(jle_df) == {('20243', '2506B', 'BACC104'): 0}
+
+
+def test_find_matching_dbf_from_jle_data():
+    """Directory matching returns the DBF path and its course record"""
+    dbf_path, jle_record = find_matching_dbf_from_jle_data(load_sample_jle_data(), TESTFILES)
+
+    assert os.path.basename(dbf_path) == "DSO_20243_2506B_BACC104_565.DBF"
+    assert jle_record['Subject Title'] == 'International Business and Trade'
+
+
+if __name__ == "__main__":
+    test_dbf_course_key()
+    test_extract_jle_data_builds_index_once()
+    test_first_duplicate_course_wins()
+    test_find_matching_dbf_from_jle_data()
+    print("All course index tests passed")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the column-wise DBF reader
+"""
+import math
+import os
+import tempfile
+
+import dbf
+
+import synthetic_data
+import vfp_table
+from pipeline import read_dbf_to_dataframe
+from reports import extract_dbf_data
+
+
+TESTFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles")
+DBF_PATH = os.path.join(TESTFILES, "DSO_20243_2506B_BACC104_565.DBF")
+
+
+def read_with_dbf_library(path):
+    """Rows as the dbf library returns them (dbf.Null mapped to None)"""
+    table = dbf.Table(path)
+    table.open()
+    try:
+        return [[None if value is dbf.Null else value for value in record] for record in table]
+    finally:
+        table.close()
+
+
+def test_matches_dbf_library():
+    """Values (including the fixed-width text padding and nulls) match the dbf library"""
+    with open(DBF_PATH, 'rb') as f:
+        df = read_dbf_to_dataframe(f.read())
+
+    expected = read_with_dbf_library(DBF_PATH)
+    assert list(df.columns) == ['NUM', 'FULLNAME', 'GRADE', 'REMARKS', 'CURRCODE', 'ID']
+    assert df.astype(object).where(df.notna(), None).values.tolist() == expected
+    assert str(df['ID'].dtype) == 'int64'
+
+
+def test_deleted_records_are_skipped():
+    """Records flagged '*' are left out"""
+    data = bytearray(synthetic_data.make_dbf(10))
+    header = vfp_table.read_header(data)
+    start, _ = vfp_table.record_slice(header, 3)
+    data[start] = vfp_table.DELETED_FLAG
+
+    df = read_dbf_to_dataframe(bytes(data))
+    assert len(df) == 9
+    assert 4 not in df['NUM'].tolist()
+
+    columns = vfp_table.read_columns(bytes(data), include_deleted=True)
+    assert len(columns['NUM']) == 10
+
+
+def test_null_flags_and_blank_numbers():
+    """VFP nulls decode to None in text columns and NaN in numeric ones"""
+    fields = synthetic_data.DBF_FIELDS + [('SCORE', 'N', 7, 2, vfp_table.FIELD_FLAG_NULLABLE)]
+    rows = [
+        [1, 'CRUZ, JUAN', None, '', 'BSA', 100, '85.50'],
+        [2, None, '1.25', 'PASSED', 'BSA', 101, None],
+    ]
+    columns = vfp_table.read_columns(synthetic_data.build_vfp_table(fields, rows))
+
+    assert columns['FULLNAME'] == ['CRUZ, JUAN', None]
+    assert columns['GRADE'] == [None, '1.25']
+    assert columns['REMARKS'] == ['', 'PASSED']
+    assert columns['ID'].tolist() == [100, 101]
+    assert columns['SCORE'][0] == 85.5
+    assert math.isnan(columns['SCORE'][1])
+
+
+def test_extract_dbf_data_reads_a_path():
+    """reports.extract_dbf_data returns the same frame for a file on disk"""
+    with open(DBF_PATH, 'rb') as f:
+        data = f.read()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'sheet.dbf')
+        with open(path, 'wb') as f:
+            f.write(data)
+        assert extract_dbf_data(path).equals(read_dbf_to_dataframe(data))
+
+
+def test_empty_table():
+    """A sheet without students still has its columns"""
+    df = read_dbf_to_dataframe(synthetic_data.make_dbf(0))
+    assert df.empty
+    assert list(df.columns) == ['NUM', 'FULLNAME', 'GRADE', 'REMARKS', 'CURRCODE', 'ID']
+
+
+if __name__ == "__main__":
+    test_matches_dbf_library()
+    test_deleted_records_are_skipped()
+    test_null_flags_and_blank_numbers()
+    test_extract_dbf_data_reads_a_path()
+    test_empty_table()
+    print("All DBF reader tests passed")
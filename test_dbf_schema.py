@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for the DBF layout fingerprints and the cached record codecs
+"""
+import pytest
+
+import dbf_schema
+import synthetic_data
+import vfp_table
+from dbf_update import reconcile_grades
+
+
+def variant_dbf(fields, student_count=3):
+    """Grade sheet with the given (name, type, length, decimals, flags) layout"""
+    samples = {'NUM': lambda i: i + 1, 'FULLNAME': lambda i: f'STUDENT {i}', 'GRADE': lambda i: None,
+               'REMARKS': lambda i: '', 'CURRCODE': lambda i: '23BSBAMM', 'ID': lambda i: int(synthetic_data.student_id(i))}
+    rows = [[samples[name](i) for name, *_ in fields] for i in range(student_count)]
+    return synthetic_data.build_vfp_table(fields, rows)
+
+
+def test_sheets_sharing_a_layout_share_one_codec():
+    """The codec is compiled once per layout and reused for every file with it"""
+    dbf_schema.clear_codec_cache()
+    first = dbf_schema.get_codec(vfp_table.read_header(synthetic_data.make_dbf(5)))
+    second = dbf_schema.get_codec(vfp_table.read_header(synthetic_data.make_dbf(50, seed=1)))
+
+    assert first is second
+    assert dbf_schema.codec_stats == {'hits': 1, 'misses': 1}
+    assert {role: field['name'] for role, field in first.fields.items()} == {
+        'id': 'ID', 'fullname': 'FULLNAME', 'grade': 'GRADE', 'remarks': 'REMARKS'}
+
+
+def test_reordered_layout_is_written_by_field_name():
+    """Grades land in GRADE/REMARKS wherever those fields sit in the record"""
+    fields = list(reversed(synthetic_data.DBF_FIELDS))
+    dbf_bytes = variant_dbf(fields)
+    updated, reconciliation = reconcile_grades(dbf_bytes, {synthetic_data.student_id(1): (1.5, 'PASSED')})
+
+    assert reconciliation['matched'] == 1
+    columns = vfp_table.read_columns(updated)
+    assert columns['GRADE'] == [None, '1.5', None]
+    assert columns['REMARKS'] == ['', 'PASSED', '']
+    assert columns['CURRCODE'] == ['23BSBAMM'] * 3
+
+
+def test_layout_without_a_grade_field_is_rejected():
+    """A variant layout is refused instead of having grades written into another column"""
+    fields = [field for field in synthetic_data.DBF_FIELDS if field[0] != 'GRADE']
+    with pytest.raises(ValueError, match="no GRADE field"):
+        reconcile_grades(variant_dbf(fields), {synthetic_data.student_id(0): (1.5, 'PASSED')})
+
+
+def test_roles_are_matched_by_whole_name_only():
+    """Column names are matched exactly (any case), never by single letters or substrings"""
+    assert dbf_schema.resolve_roles(['num', 'fullname', 'grade', 'remarks', 'id']) == {
+        'id': 'id', 'fullname': 'fullname', 'grade': 'grade', 'remarks': 'remarks'}
+    assert dbf_schema.resolve_roles(['G', 'H', 'I', 'GRADES_OLD', 'STATUS']) == {}
+
+
+if __name__ == "__main__":
+    test_sheets_sharing_a_layout_share_one_codec()
+    test_reordered_layout_is_written_by_field_name()
+    test_layout_without_a_grade_field_is_rejected()
+    test_roles_are_matched_by_whole_name_only()
+    print("All DBF schema tests passed")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-memory DBF grade update engine
+"""
+import os
+import tempfile
+
+import pytest
+from dbf import Table, READ_WRITE
+
+import vfp_table
+from dbf_update import reconcile_grades, update_grades, update_grades_with_changes, clean_value
+
+
+DBF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles", "DSO_20243_2506B_BACC104_565.DBF")
+
+EXCEL_DATA = {
+    '20232214': (2.4, 'PASSED'),
+    '20230597': (None, 'INC'),
+    '20230021': (3, None),
+    '99999999': (1.0, 'PASSED'),  # not in the DBF
+}
+
+
+def update_with_dbf_library(dbf_bytes, excel_data):
+    """Reference implementation: the original dbf.Table write loop on a temp file"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.dbf') as tmp_dbf:
+        tmp_dbf.write(dbf_bytes)
+        dbf_path = tmp_dbf.name
+    try:
+        table = Table(dbf_path)
+        table.open(mode=READ_WRITE)
+        matched = 0
+        for record in table:
+            dbf_id = str(record[5]).strip()
+            if dbf_id in excel_data:
+                grade_val, remark_val = excel_data[dbf_id]
+                with record:
+                    if grade_val is not None:
+                        record[2] = clean_value(grade_val)
+                    if remark_val is not None:
+                        record[3] = clean_value(remark_val)
+                matched += 1
+        table.close()
+        with open(dbf_path, 'rb') as f:
+            return f.read(), matched
+    finally:
+        os.remove(dbf_path)
+
+
+def test_update_matches_dbf_library_bytes():
+    """Patching in memory should produce byte-identical output to dbf.Table"""
+    with open(DBF_PATH, 'rb') as f:
+        dbf_bytes = f.read()
+
+    updated, matched = update_grades(dbf_bytes, EXCEL_DATA)
+    expected, expected_matched = update_with_dbf_library(dbf_bytes, EXCEL_DATA)
+
+    assert matched == expected_matched == 3
+    assert updated == expected
+
+
+def test_update_clears_null_flag():
+    """Writing a grade into a NULL field should clear its _NullFlags bit"""
+    with open(DBF_PATH, 'rb') as f:
+        dbf_bytes = f.read()
+
+    updated, _ = update_grades(dbf_bytes, {'20232214': (2.4, 'PASSED')})
+    header = vfp_table.read_header(updated)
+    _, record = next(vfp_table.iter_records(updated, header))
+    values = vfp_table.read_record(header, record)
+
+    assert values['GRADE'] == '2.4'
+    assert values['REMARKS'] == 'PASSED'
+
+
+def test_value_too_long_raises():
+    """Values that don't fit the field are rejected instead of truncated"""
+    with open(DBF_PATH, 'rb') as f:
+        dbf_bytes = f.read()
+
+    with pytest.raises(ValueError):
+        update_grades(dbf_bytes, {'20232214': ('TOO LONG FOR GRADE', None)})
+
+
+def test_reposting_the_same_grades_changes_nothing():
+    """A second run with the same workbook logs no changes and leaves the bytes alone"""
+    with open(DBF_PATH, 'rb') as f:
+        dbf_bytes = f.read()
+
+    first, _, first_changes = update_grades_with_changes(dbf_bytes, EXCEL_DATA)
+    second, matched, second_changes = update_grades_with_changes(first, EXCEL_DATA)
+
+    assert first_changes
+    assert matched == 3
+    assert second_changes == []
+    assert second == first
+
+
+def test_change_log_records_old_and_new_values():
+    """A corrected grade is logged once with its previous value; a null old value is logged as None"""
+    with open(DBF_PATH, 'rb') as f:
+        dbf_bytes = f.read()
+
+    posted, _, changes = update_grades_with_changes(dbf_bytes, {'20232214': (2.4, 'PASSED')})
+    assert changes == [('20232214', 'GRADE', None, '2.4'), ('20232214', 'REMARKS', '', 'PASSED')]
+
+    _, _, changes = update_grades_with_changes(posted, {'20232214': (2.5, 'PASSED')})
+    assert changes == [('20232214', 'GRADE', '2.4', '2.5')]
+
+
+def test_reconciliation_reports_both_sides():
+    """Unmatched rows on either side and repeated Excel IDs come back with the update"""
+    with open(DBF_PATH, 'rb') as f:
+        dbf_bytes = f.read()
+    header = vfp_table.read_header(dbf_bytes)
+    dbf_ids = [str(vfp_table.read_record(header, record)['ID']) for _, record in vfp_table.iter_records(dbf_bytes, header)]
+
+    rows = [(11, '20232214', 2.4, 'PASSED'), (12, '99999999', 1.0, 'PASSED'), (13, '20232214', 2.6, 'PASSED')]
+    updated, reconciliation = reconcile_grades(dbf_bytes, rows)
+
+    assert reconciliation['matched'] == 1
+    assert reconciliation['excel_only'] == [(12, '99999999')]
+    assert reconciliation['duplicate_excel_ids'] == {'20232214': [11, 13]}
+    assert reconciliation['duplicate_dbf_ids'] == {}
+    assert [dbf_id for _, dbf_id, _ in reconciliation['dbf_only']] == [i for i in dbf_ids if i != '20232214']
+    assert all(name for _, _, name in reconciliation['dbf_only'])
+    # The last of the repeated rows is the one posted, as with a dict
+    assert updated == update_grades(dbf_bytes, {'20232214': (2.6, 'PASSED')})[0]
+
+
+if __name__ == "__main__":
+    test_update_matches_dbf_library_bytes()
+    test_update_clears_null_flag()
+    test_value_too_long_raises()
+    test_reposting_the_same_grades_changes_nothing()
+    test_change_log_records_old_and_new_values()
+    test_reconciliation_reports_both_sides()
+    print("All DBF update tests passed")
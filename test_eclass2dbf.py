@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the headless eclass2dbf entry point
+"""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import eclass2dbf
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TESTFILES = os.path.join(HERE, "testfiles")
+
+
+def run_main(argv):
+    """Run the CLI in-process and return (exit status, parsed JSON output)"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        status = eclass2dbf.main(argv)
+    return status, json.loads(output.getvalue())
+
+
+def test_cli_writes_dbf_and_report():
+    """Globs are expanded, pairs processed and the outputs written next to a JSON summary"""
+    with tempfile.TemporaryDirectory() as out_dir:
+        status, summary = run_main([
+            '--jle', os.path.join(TESTFILES, 'DSO_20243_565.JLE'),
+            '--dbf', os.path.join(TESTFILES, '*.DBF'),
+            '--excel', os.path.join(TESTFILES, '*.xlsm'), os.path.join(TESTFILES, 'missing', '*.xlsx'),
+            '--out', out_dir,
+        ])
+
+        assert status == 0
+        assert summary['semester'] == 'Summer'
+        assert summary['failed'] == 0
+        assert summary['unmatched_patterns'] == [os.path.join(TESTFILES, 'missing', '*.xlsx')]
+        sheet = summary['sheets'][0]
+        assert os.path.isfile(sheet['output'])
+        assert os.path.isfile(sheet['report'])
+        assert set(sheet['timings']) == {'update', 'report'}
+        assert summary['timings']['total'] >= summary['timings']['process']
+
+
+def test_cli_without_reports():
+    """--no-report only writes the updated DBF"""
+    with tempfile.TemporaryDirectory() as out_dir:
+        status, summary = run_main([
+            '--jle', os.path.join(TESTFILES, 'DSO_20243_565.JLE'),
+            '--dbf', os.path.join(TESTFILES, 'DSO_20243_2506B_BACC104_565.DBF'),
+            '--excel', os.path.join(TESTFILES, '2506B.xlsm'),
+            '--out', out_dir, '--no-report',
+        ])
+
+        assert status == 0
+        assert summary['sheets'][0]['report'] is None
+        assert os.listdir(out_dir) == ['DSO_20243_2506B_BACC104_565.DBF']
+
+
+def test_cli_fails_when_nothing_pairs():
+    """An empty run is reported with a non-zero exit status"""
+    with tempfile.TemporaryDirectory() as out_dir:
+        status, summary = run_main([
+            '--jle', os.path.join(TESTFILES, 'DSO_20243_565.JLE'),
+            '--dbf', os.path.join(TESTFILES, '*.DBF'),
+            '--excel', os.path.join(TESTFILES, '*.docx'),
+            '--out', out_dir,
+        ])
+
+        assert status == 1
+        assert summary['sheets'] == []
+        assert summary['unpaired_dbf'] == [os.path.join(TESTFILES, 'DSO_20243_2506B_BACC104_565.DBF')]
+
+
+def test_cli_refuses_files_sharing_a_name():
+    """Two DBFs with the same filename in different directories are refused, not silently collapsed"""
+    dbf_name = 'DSO_20243_2506B_BACC104_565.DBF'
+    with tempfile.TemporaryDirectory() as tmp:
+        for sem in ('sem1', 'sem2'):
+            os.makedirs(os.path.join(tmp, sem))
+            with open(os.path.join(TESTFILES, dbf_name), 'rb') as src, \
+                    open(os.path.join(tmp, sem, dbf_name), 'wb') as dst:
+                dst.write(src.read())
+
+        status, summary = run_main([
+            '--jle', os.path.join(TESTFILES, 'DSO_20243_565.JLE'),
+            '--dbf', os.path.join(tmp, 'sem1', '*.DBF'), os.path.join(tmp, 'sem2', '*.DBF'),
+            '--excel', os.path.join(TESTFILES, '2506B.xlsm'),
+            '--out', os.path.join(tmp, 'out'),
+        ])
+
+        assert status == 1
+        assert os.path.join(tmp, 'sem1', dbf_name) in summary['error']
+        assert os.path.join(tmp, 'sem2', dbf_name) in summary['error']
+        assert not os.path.exists(os.path.join(tmp, 'out'))
+
+
+def test_startup_does_not_import_heavy_modules():
+    """Importing the entry point must not pull in Streamlit, pandas or python-docx"""
+    code = "import sys, eclass2dbf; print(sorted(m for m in ('streamlit', 'pandas', 'docx', 'openpyxl') if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+if __name__ == "__main__":
+    test_cli_writes_dbf_and_report()
+    test_cli_without_reports()
+    test_cli_fails_when_nothing_pairs()
+    test_cli_refuses_files_sharing_a_name()
+    test_startup_does_not_import_heavy_modules()
+    print("All eclass2dbf tests passed")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming FFG grade extractor
+"""
+import io
+
+import pytest
+from openpyxl import Workbook
+
+import excel_grades
+from excel_grades import read_ffg_grades, read_ffg_records
+
+
+def build_class_record(rows, headers=None, sheet_name="FFG", header_row=7, data_row=11):
+    """Build an in-memory E-Class record with the FFG layout (headers in row 7, data from row 11)"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = sheet_name
+    ws.cell(row=1, column=2, value='CLASS RECORD')
+    for col_idx, value in enumerate(headers or [None, 'NAME OF STUDENT', 'ID', 'FG', None, 'FFG', 'EG', 'REMARKS'], start=1):
+        ws.cell(row=header_row, column=col_idx, value=value)
+    for offset, (student_id, grade, remark) in enumerate(rows):
+        ws.cell(row=data_row + offset, column=3, value=student_id)
+        ws.cell(row=data_row + offset, column=7, value=grade)
+        ws.cell(row=data_row + offset, column=8, value=remark)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def test_reads_ids_grades_and_remarks():
+    """IDs from column C are paired with the EG and REMARKS columns"""
+    excel_bytes = build_class_record([
+        (20232214, 2.4, 'PASSED'),
+        ('20230597', 5.0, 'FAILED'),
+        ('not an id', 1.0, 'PASSED'),
+        (20230021, None, 'INC'),
+    ])
+
+    assert read_ffg_grades(excel_bytes) == {
+        '20232214': (2.4, 'PASSED'),
+        '20230597': (5.0, 'FAILED'),
+        '20230021': (None, 'INC'),
+    }
+
+
+def test_stops_at_first_empty_id():
+    """Rows after the first empty C cell are ignored"""
+    excel_bytes = build_class_record([
+        (20232214, 2.4, 'PASSED'),
+        (None, None, None),
+        (20230597, 5.0, 'FAILED'),
+    ])
+
+    assert list(read_ffg_grades(excel_bytes)) == ['20232214']
+
+
+def test_repeated_ids_are_kept_as_rows():
+    """read_ffg_records keeps every row with its sheet row number; the ID map keeps the last"""
+    excel_bytes = build_class_record([
+        (20232214, 2.4, 'PASSED'),
+        (20230597, 5.0, 'FAILED'),
+        (20232214, 2.6, 'PASSED'),
+    ])
+
+    assert read_ffg_records(excel_bytes) == [
+        (11, '20232214', 2.4, 'PASSED'),
+        (12, '20230597', 5.0, 'FAILED'),
+        (13, '20232214', 2.6, 'PASSED'),
+    ]
+    assert read_ffg_grades(excel_bytes)['20232214'] == (2.6, 'PASSED')
+
+
+def test_missing_sheet_and_headers_raise():
+    """A workbook without FFG or without the EG header is rejected"""
+    with pytest.raises(ValueError, match="Worksheet 'FFG' not found"):
+        read_ffg_grades(build_class_record([], sheet_name="Sheet1"))
+
+    with pytest.raises(ValueError, match="'EG' header"):
+        read_ffg_grades(build_class_record([], headers=['ID', 'REMARKS']))
+
+
+def test_layout_is_cached_per_template():
+    """Records from the same template reuse the resolved layout"""
+    excel_grades.clear_layout_cache()
+    read_ffg_grades(build_class_record([(20232214, 2.4, 'PASSED')]))
+    grades = read_ffg_grades(build_class_record([(20230597, 5.0, 'FAILED'), (20230021, 1.0, 'PASSED')]))
+
+    assert grades == {'20230597': (5.0, 'FAILED'), '20230021': (1.0, 'PASSED')}
+    assert excel_grades.layout_stats == {'hits': 1, 'misses': 1}
+
+
+def test_shifted_header_row_is_detected():
+    """A header band moved off row 7 is found, with students from the first ID row after it"""
+    excel_grades.clear_layout_cache()
+    excel_bytes = build_class_record([(20232214, 2.4, 'PASSED'), (20230597, 5.0, 'FAILED')],
+                                     header_row=9, data_row=12)
+
+    assert read_ffg_grades(excel_bytes) == {'20232214': (2.4, 'PASSED'), '20230597': (5.0, 'FAILED')}
+
+
+def test_cached_layout_is_checked_before_use():
+    """A workbook that fingerprints like a cached one but has its columns moved is re-detected"""
+    excel_grades.clear_layout_cache()
+    read_ffg_grades(build_class_record([(20232214, 2.4, 'PASSED')]))
+    moved = build_class_record([(20232214, 2.4, 'PASSED')],
+                               headers=[None, 'NAME OF STUDENT', 'ID', 'FG', None, 'FFG', 'REMARKS', 'EG'])
+
+    assert read_ffg_grades(moved) == {'20232214': ('PASSED', 2.4)}
+    assert excel_grades.layout_stats['misses'] == 2
+
+
+def test_standard_template_keeps_ids_in_column_c():
+    """An ID label elsewhere in the standard header row doesn't move the ID column off C"""
+    excel_grades.clear_layout_cache()
+    excel_bytes = build_class_record([(20232214, 2.4, 'PASSED')],
+                                     headers=[None, 'ID', 'NAME OF STUDENT', 'FG', None, 'FFG', 'EG', 'REMARKS'])
+
+    assert read_ffg_grades(excel_bytes) == {'20232214': (2.4, 'PASSED')}
+
+
+if __name__ == "__main__":
+    test_reads_ids_grades_and_remarks()
+    test_stops_at_first_empty_id()
+    test_repeated_ids_are_kept_as_rows()
+    test_missing_sheet_and_headers_raise()
+    test_layout_is_cached_per_template()
+    test_shifted_header_row_is_detected()
+    test_cached_layout_is_checked_before_use()
+    test_standard_template_keeps_ids_in_column_c()
+    print("All FFG extractor tests passed")
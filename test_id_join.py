@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized student ID join
+"""
+import numpy as np
+
+from id_join import join_ids, normalize_ids
+
+
+def test_ids_are_normalized_to_integers():
+    """Ints, whole floats and padded or zero-led digit strings give the same key; the rest is invalid"""
+    keys, valid = normalize_ids([20232214, 20232214.0, ' 20232214 ', '020232214', '', None, 'N/A', 2.5])
+    assert valid.tolist() == [True, True, True, True, False, False, False, False]
+    assert set(keys[valid].tolist()) == {20232214}
+
+    keys, valid = normalize_ids(np.array([5, 7], dtype=np.int64))
+    assert keys.tolist() == [5, 7] and valid.all()
+
+
+def test_join_returns_every_set_in_one_pass():
+    """Matched pairs, one-sided rows and repeated IDs on both sides"""
+    excel = ['101', '102', '105', '102', '107']
+    dbf = np.array([107.0, 101.0, 103.0, np.nan, 103.0, 102.0])
+    join = join_ids(excel, dbf)
+
+    # Pairs in DBF order; the repeated Excel ID 102 pairs with its last row
+    assert list(zip(join['excel'].tolist(), join['dbf'].tolist())) == [(4, 0), (0, 1), (3, 5)]
+    assert join['excel_only'].tolist() == [2]
+    assert join['dbf_only'].tolist() == [2, 4]
+    assert join['dbf_invalid'].tolist() == [3]
+    assert join['duplicate_excel_ids'].tolist() == [102]
+    assert join['duplicate_dbf_ids'].tolist() == [103]
+
+
+def test_empty_sides():
+    """Nothing on one side leaves everything on the other unmatched"""
+    join = join_ids([], ['1', '2'])
+    assert join['dbf_only'].tolist() == [0, 1] and len(join['excel']) == 0
+
+    join = join_ids(['1'], [])
+    assert join['excel_only'].tolist() == [0] and len(join['dbf']) == 0
+
+
+if __name__ == "__main__":
+    test_ids_are_normalized_to_integers()
+    test_join_returns_every_set_in_one_pass()
+    test_empty_sides()
+    print("All ID join tests passed")
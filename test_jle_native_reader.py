@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the native (VFP table) JLE reader
+"""
+import os
+from io import BytesIO
+
+import vfp_table
+from config import extract_jle_data, read_jle_table, _parse_jle_text, term_from_filename
+
+
+JLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles", "DSO_20243_565.JLE")
+
+
+def load_sample_jle():
+    """Load the sample JLE file as an uploaded-file-like object"""
+    with open(JLE_PATH, 'rb') as f:
+        jle_file = BytesIO(f.read())
+    jle_file.name = os.path.basename(JLE_PATH)
+    return jle_file
+
+
+def test_native_reader_matches_text_parser():
+    """The table reader should produce exactly what the regex parser produced"""
+    jle_file = load_sample_jle()
+    jle_bytes = jle_file.getvalue()
+    academic_year, semester = term_from_filename(jle_file.name)
+
+    native = read_jle_table(jle_bytes, academic_year, semester)
+    legacy = _parse_jle_text(jle_bytes.decode('latin1', errors='ignore'), academic_year, semester)
+
+    assert native == legacy
+    assert native[1]['Subject Num'] == '2506B'
+    assert native[1]['LAB_Schedule'] == '100PM- 230PM ThF D41'
+
+
+def test_extract_jle_data_uses_table_layout():
+    """extract_jle_data should return the same course_data frame shape"""
+    jle_info = extract_jle_data(load_sample_jle())
+
+    assert jle_info['total_courses'] == 6
+    assert jle_info['academic_year'] == '2024-2025'
+    assert jle_info['semester'] == 'Summer'
+    assert list(jle_info['course_data'].columns) == [
+        'Subject Num', 'Subject Code', 'Subject Title', 'Schedule', 'LEC_Schedule',
+        'LAB_Schedule', 'Credit', 'Lecturer', 'Academic Year', 'Semester'
+    ]
+
+
+def test_deleted_records_are_skipped():
+    """Records flagged as deleted in the table should not be returned"""
+    jle_bytes = bytearray(load_sample_jle().getvalue())
+    header = vfp_table.read_header(jle_bytes)
+    start, _ = vfp_table.record_slice(header, 0)
+    jle_bytes[start] = vfp_table.DELETED_FLAG
+
+    records = read_jle_table(bytes(jle_bytes))
+
+    assert len(records) == 5
+    assert records[0]['Subject Num'] == '2506B'
+
+
+def test_text_content_falls_back_to_regex_parser():
+    """Plain text JLE exports are still handled by the text parser"""
+    jle_file = BytesIO(b"2506   FBACC104 Introduction to Accounting 730AM- 900AM  MWF  C203 3      JOHN DOE\n")
+    jle_file.name = "DSO_20243_565.JLE"
+
+    assert read_jle_table(jle_file.getvalue()) is None
+    jle_info = extract_jle_data(jle_file)
+    assert jle_info['course_data'].iloc[0]['Subject Num'] == '2506F'
+
+
+if __name__ == "__main__":
+    test_native_reader_matches_text_parser()
+    test_extract_jle_data_uses_table_layout()
+    test_deleted_records_are_skipped()
+    test_text_content_falls_back_to_regex_parser()
+    print("All native JLE reader tests passed")
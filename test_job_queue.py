@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script for the durable grade-posting job queue
+"""
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+import synthetic_data
+from dbf_update import reconcile_grades
+from excel_grades import read_ffg_records
+from job_queue import JobQueue, LeaseLost, run_next, work
+
+
+def submit(queue, dataset, excel_bytes=None):
+    jle_name, jle_bytes = dataset['jle']
+    dbf_name, dbf_bytes = dataset['dbf']
+    excel_name, workbook = dataset['excel']
+    return queue.submit_batch(jle_name, jle_bytes, {dbf_name: dbf_bytes},
+                              {excel_name: workbook if excel_bytes is None else excel_bytes})
+
+
+def test_resubmitting_reuses_jobs_and_export_matches():
+    """The same inputs map to the same job, and a drained batch exports its DBF, report and summary"""
+    dataset = synthetic_data.make_dataset(8)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        queue = JobQueue(path)
+        try:
+            batch_id, job_ids = submit(queue, dataset)
+            again_id, again_job_ids = submit(queue, dataset)
+            assert again_id != batch_id and again_job_ids == job_ids
+            assert queue.counts() == {'queued': 1}
+
+            assert work(path, 'test') == 1
+            assert queue.counts(again_id) == {'done': 1}
+
+            expected, reconciliation = reconcile_grades(dataset['dbf'][1], read_ffg_records(dataset['excel'][1]))
+            zip_bytes, summary = queue.export_batch(again_id)
+            assert summary['total_matched'] == reconciliation['matched'] == 8
+            assert summary['pending'] == summary['failed'] == 0
+            with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+                assert zf.read(dataset['dbf'][0]) == expected
+                assert summary['sheets'][0]['report_name'] in zf.namelist()
+                assert json.loads(zf.read('batch_summary.json'))['batch_id'] == again_id
+
+            # Already done: nothing to run on a third submission
+            submit(queue, dataset)
+            assert work(path, 'test') == 0
+        finally:
+            queue.close()
+
+
+def test_interrupted_job_resumes_at_its_next_stage():
+    """A job whose worker died after the DBF update is taken over and only its report is rendered"""
+    dataset = synthetic_data.make_dataset(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        queue = JobQueue(path)
+        try:
+            _, (job_id,) = submit(queue, dataset)
+
+            # The first worker claims the job, finishes the update stage and dies
+            crashed = queue.claim('crashed', lease_seconds=60)
+            assert crashed['id'] == job_id
+            updated, reconciliation = reconcile_grades(dataset['dbf'][1], read_ffg_records(dataset['excel'][1]))
+            updated_key = queue.put_blob(updated)
+            queue.finish_stage(crashed, 'update', lease_seconds=-1, updated_dbf_key=updated_key,
+                               reconciliation=json.dumps(reconciliation))
+            assert queue.job(job_id)['state'] == 'running'
+
+            # Reopened queue (new process); the expired lease lets another worker take over
+            queue.close()
+            queue = JobQueue(path)
+            assert run_next(queue, 'second')['stage'] == 'update'
+            job = queue.job(job_id)
+            assert job['state'] == 'done' and job['stage'] == 'report'
+            assert job['worker'] == 'second' and job['attempts'] == 2
+            assert job['updated_dbf_key'] == updated_key and job['report_key']
+
+            # The first worker coming back can't touch the job any more
+            with pytest.raises(LeaseLost):
+                queue.finish_stage(crashed, 'report', report_key='stale')
+            assert not queue.fail(crashed, 'stale failure')
+            job = queue.job(job_id)
+            assert job['state'] == 'done' and job['report_key'] != 'stale' and job['error'] is None
+        finally:
+            queue.close()
+
+
+def test_lost_workers_count_against_attempts():
+    """A job whose worker keeps dying is failed once its last attempt's lease expires"""
+    dataset = synthetic_data.make_dataset(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'))
+        try:
+            _, (job_id,) = queue.submit_batch(
+                dataset['jle'][0], dataset['jle'][1], {dataset['dbf'][0]: dataset['dbf'][1]},
+                {dataset['excel'][0]: dataset['excel'][1]}, max_attempts=2)
+
+            first = queue.claim('first', lease_seconds=-1)
+            second = queue.claim('second', lease_seconds=-1)
+            assert first['id'] == second['id'] == job_id and second['attempts'] == 2
+
+            assert queue.claim('third') is None
+            job = queue.job(job_id)
+            assert job['state'] == 'failed' and 'second' in job['error']
+            assert not queue.renew(second)
+        finally:
+            queue.close()
+
+
+def test_failing_job_is_retried_then_failed():
+    """A job that keeps failing is requeued until it runs out of attempts, and can be requeued by hand"""
+    dataset = synthetic_data.make_dataset(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(os.path.join(tmp, 'jobs.db'), retry_delay=0)
+        try:
+            batch_id, (job_id,) = queue.submit_batch(
+                dataset['jle'][0], dataset['jle'][1], {dataset['dbf'][0]: dataset['dbf'][1]},
+                {dataset['excel'][0]: b'not a workbook'}, max_attempts=2)
+
+            assert run_next(queue, 'test') is not None
+            assert queue.job(job_id)['state'] == 'queued'
+            assert run_next(queue, 'test') is not None
+            job = queue.job(job_id)
+            assert job['state'] == 'failed' and job['attempts'] == 2 and job['error']
+            assert run_next(queue, 'test') is None
+
+            _, summary = queue.export_batch(batch_id)
+            assert summary['failed'] == 1 and summary['sheets'][0]['error']
+
+            assert queue.retry_failed(batch_id) == 1
+            assert queue.job(job_id)['state'] == 'queued'
+        finally:
+            queue.close()
+
+
+if __name__ == "__main__":
+    test_resubmitting_reuses_jobs_and_export_matches()
+    test_interrupted_job_resumes_at_its_next_stage()
+    test_lost_workers_count_against_attempts()
+    test_failing_job_is_retried_then_failed()
+    print("All job queue tests passed")
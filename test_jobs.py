@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the background job runner behind Update DBF
+"""
+import threading
+
+import jobs
+import synthetic_data
+from blob_store import get_store
+
+
+def test_update_dbf_job_runs_every_stage():
+    """The Update DBF job posts the grades, renders the report and traces each stage"""
+    dataset = synthetic_data.make_dataset(20)
+    jle_name, jle_bytes = dataset['jle']
+    dbf_name, dbf_bytes = dataset['dbf']
+    excel_name, excel_bytes = dataset['excel']
+
+    job_id = jobs.submit('update_dbf', jobs.UPDATE_DBF_STAGES, jobs.run_update_dbf,
+                         jle_bytes, jle_name, excel_bytes, excel_name, dbf_bytes, dbf_name)
+    job = jobs.get_job(job_id).wait(timeout=60)
+
+    assert job.status == 'done', job.error_details
+    assert job.completed == [name for name, _ in jobs.UPDATE_DBF_STAGES]
+    assert job.progress() == 1.0
+    assert job.result['matched'] == 20
+    assert len(job.result['df']) == 20
+    assert get_store().get(job.result['report_key'])[:2] == b'PK'
+    assert get_store().refs(job.result['updated_dbf_key']) >= 1
+    assert job.result['report_name'] == excel_name.rsplit('.', 1)[0] + '_report.docx'
+    traced = [span['name'] for span in job.trace['spans']]
+    assert all(name in traced for name, _ in jobs.UPDATE_DBF_STAGES)
+
+
+def test_progress_is_visible_while_running():
+    """Another thread sees the running stage and the completed fraction"""
+    runner = jobs.JobRunner(max_workers=1)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def work(job):
+        with job.step('first'):
+            pass
+        with job.step('second'):
+            entered.set()
+            release.wait(10)
+        return 'ok'
+
+    job = runner.get(runner.submit('two_steps', [('first', 'First'), ('second', 'Second')], work))
+    assert entered.wait(10)
+    assert job.status == 'running'
+    assert job.stage_label() == 'Second'
+    assert job.progress() == 0.5
+
+    release.set()
+    assert job.wait(10).result == 'ok'
+    assert job.finished
+
+
+def test_failures_are_kept_on_the_job():
+    """An exception fails the job instead of propagating into the caller"""
+    runner = jobs.JobRunner(max_workers=1)
+
+    def work(job):
+        with job.step('parse'):
+            raise ValueError("bad upload")
+
+    job = runner.get(runner.submit('failing', [('parse', 'Parse')], work)).wait(10)
+    assert job.status == 'failed'
+    assert job.error == "bad upload"
+    assert 'ValueError' in job.error_details
+    assert job.trace['spans'][1]['error'] == 'ValueError'
+
+
+def test_finished_jobs_expire():
+    """Jobs finished longer than the TTL ago are dropped (and cleaned up) on the next submit"""
+    runner = jobs.JobRunner(max_workers=1, ttl=0)
+    old_id = runner.submit('old', [], lambda job: None)
+    runner.get(old_id).wait(10)
+
+    released = []
+    runner.get(old_id).add_cleanup(released.append, 'blob')
+
+    new_id = runner.submit('new', [], lambda job: None)
+    assert runner.get(old_id) is None
+    assert runner.get(new_id) is not None
+    assert released == ['blob']
+
+
+if __name__ == "__main__":
+    test_update_dbf_job_runs_every_stage()
+    test_progress_is_visible_while_running()
+    test_failures_are_kept_on_the_job()
+    test_finished_jobs_expire()
+    print("All job tests passed")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed parse cache
+"""
+import os
+
+import parse_cache
+from parse_cache import ParseCache, content_key, cached_jle_data
+
+
+TESTFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles")
+
+
+def test_content_key_includes_version_and_extra():
+    """Same bytes under a different parser or filename get a different key"""
+    assert content_key('jle', b'abc') == content_key('jle', b'abc')
+    assert content_key('jle', b'abc') != content_key('dbf', b'abc')
+    assert content_key('jle', b'abc', 'DSO_20243_565.JLE') != content_key('jle', b'abc', 'DSO_20241_565.JLE')
+
+
+def test_get_or_parse_only_parses_once():
+    """A second request for the same key is served from the cache"""
+    cache = ParseCache(max_bytes=1024 * 1024)
+    calls = []
+
+    def parse():
+        calls.append(1)
+        return {'parsed': True}
+
+    first = cache.get_or_parse(('k',), parse)
+    second = cache.get_or_parse(('k',), parse)
+
+    assert first is second
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_lru_eviction_respects_memory_cap():
+    """The least recently used entry is evicted once the cap is exceeded"""
+    cache = ParseCache(max_bytes=2500)
+    cache.put('a', b'x' * 1000)
+    cache.put('b', b'x' * 1000)
+    cache.get('a')                   # 'a' is now the most recently used
+    cache.put('c', b'x' * 1000)      # pushes the total over the cap
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.stats()['bytes'] <= 2500
+
+
+def test_oversized_result_is_not_stored():
+    """A result bigger than the whole cap is returned but never cached"""
+    cache = ParseCache(max_bytes=100)
+    value = cache.get_or_parse('big', lambda: b'x' * 1000)
+
+    assert len(value) == 1000
+    assert cache.stats()['entries'] == 0
+
+
+def test_cached_jle_data_reuses_parse():
+    """Re-uploading the same JLE returns the already parsed course data"""
+    parse_cache.get_cache().clear()
+    with open(os.path.join(TESTFILES, "DSO_20243_565.JLE"), 'rb') as f:
+        jle_bytes = f.read()
+
+    first = cached_jle_data(jle_bytes, "DSO_20243_565.JLE")
+    second = cached_jle_data(bytes(jle_bytes), "DSO_20243_565.JLE")
+
+    assert first is second
+    assert first['total_courses'] == 6
+
+
+if __name__ == "__main__":
+    test_content_key_includes_version_and_extra()
+    test_get_or_parse_only_parses_once()
+    test_lru_eviction_respects_memory_cap()
+    test_oversized_result_is_not_stored()
+    test_cached_jle_data_reuses_parse()
+    print("All parse cache tests passed")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-stage performance traces
+"""
+import json
+import os
+import tempfile
+import tracemalloc
+
+import perf
+
+
+def test_spans_nest_under_the_trace():
+    """Spans are recorded in start order with their depth, timings and attributes"""
+    with perf.trace('update_dbf', memory=False) as t:
+        with perf.span('dbf.update', rows=3):
+            with perf.span('excel.read_ffg_records'):
+                pass
+        with perf.span('report.generate'):
+            pass
+
+    spans = t.to_dict()['spans']
+    assert [(s['name'], s['depth']) for s in spans] == [
+        ('update_dbf', 0), ('dbf.update', 1), ('excel.read_ffg_records', 2), ('report.generate', 1)]
+    assert spans[1]['attrs'] == {'rows': 3}
+    assert all(s['wall_s'] >= 0 and s['cpu_s'] >= 0 for s in spans)
+    assert spans[0]['wall_s'] >= spans[1]['wall_s']
+
+
+def test_span_outside_a_trace_is_a_no_op():
+    """Instrumented functions run normally when nothing is tracing"""
+    @perf.traced('stage')
+    def stage():
+        return 42
+
+    assert stage() == 42
+
+
+def test_errors_are_recorded_and_raised():
+    """A failing stage is marked with the exception type and the error propagates"""
+    try:
+        with perf.trace('update_dbf', memory=False) as t:
+            with perf.span('dbf.update'):
+                raise ValueError("bad DBF")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("ValueError was swallowed")
+
+    spans = t.to_dict()['spans']
+    assert spans[1]['error'] == 'ValueError'
+    assert spans[0]['error'] == 'ValueError'
+
+
+def test_peak_memory_folds_into_parent():
+    """A child's allocation peak counts towards its parent, and tracemalloc is stopped afterwards"""
+    was_tracing = tracemalloc.is_tracing()
+    with perf.trace('update_dbf', memory=True) as t:
+        with perf.span('allocate'):
+            block = bytearray(4 * 1024 * 1024)
+            del block
+        with perf.span('idle'):
+            pass
+
+    root, allocate, idle = t.to_dict()['spans']
+    assert allocate['peak_bytes'] >= 4 * 1024 * 1024
+    assert root['peak_bytes'] >= allocate['peak_bytes']
+    assert idle['peak_bytes'] < 1024 * 1024
+    assert tracemalloc.is_tracing() == was_tracing
+
+
+def test_trace_is_appended_to_json_log():
+    """Every finished trace becomes one JSON line in ECLASS_PERF_LOG"""
+    original = perf.PERF_LOG_PATH
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        perf.PERF_LOG_PATH = os.path.join(tmp_dir, 'perf.jsonl')
+        try:
+            with perf.trace('update_dbf', memory=False) as t:
+                with perf.span('dbf.update'):
+                    pass
+        finally:
+            perf.PERF_LOG_PATH = original
+
+        with open(os.path.join(tmp_dir, 'perf.jsonl'), encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+    assert len(records) == 1
+    assert records[0]['trace_id'] == t.trace_id
+    assert [s['name'] for s in records[0]['spans']] == ['update_dbf', 'dbf.update']
+
+
+if __name__ == "__main__":
+    test_spans_nest_under_the_trace()
+    test_span_outside_a_trace_is_a_no_op()
+    test_errors_are_recorded_and_raised()
+    test_peak_memory_folds_into_parent()
+    test_trace_is_appended_to_json_log()
+    print("All perf tests passed")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test script for the HTTP grade-posting service
+"""
+import io
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zipfile
+
+import pytest
+
+import synthetic_data
+from dbf_update import reconcile_grades
+from excel_grades import read_ffg_records
+from service import GradeService, ServiceError, content_disposition, make_server
+
+
+def multipart(files):
+    """multipart/form-data body for {field: (filename, bytes)}"""
+    boundary = uuid.uuid4().hex
+    body = b''
+    for field, (filename, data) in files.items():
+        quoted = filename.replace('\\', '\\\\').replace('"', '\\"')
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{quoted}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n').encode() + data + b'\r\n'
+    body += f'--{boundary}--\r\n'.encode()
+    return f'multipart/form-data; boundary={boundary}', body
+
+
+def serve(service):
+    server = make_server('127.0.0.1', 0, service)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def post(url, files):
+    content_type, body = multipart(files)
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_update_and_post_round_trip():
+    """The service posts grades, reports and reconciles as the in-process pipeline does"""
+    dataset = synthetic_data.make_dataset(12)
+    files = {'jle': dataset['jle'], 'excel': dataset['excel'], 'dbf': dataset['dbf']}
+    service = GradeService(workers=1, max_pending=2)
+    server, base = serve(service)
+    try:
+        with urllib.request.urlopen(base + '/health', timeout=10) as response:
+            assert json.load(response)['workers'] == 1
+
+        status, headers, body = post(base + '/dbf/update', files)
+        expected, reconciliation = reconcile_grades(dataset['dbf'][1], read_ffg_records(dataset['excel'][1]))
+        assert status == 200
+        assert body == expected
+        assert headers['X-Matched'] == '12'
+
+        status, _, body = post(base + '/jle', {'jle': dataset['jle']})
+        assert status == 200 and json.loads(body)['total_courses'] == 12
+
+        status, _, body = post(base + '/post', files)
+        assert status == 200
+        with zipfile.ZipFile(io.BytesIO(body)) as zf:
+            names = zf.namelist()
+            assert zf.read(dataset['dbf'][0]) == expected
+            assert json.loads(zf.read('reconciliation.json'))['matched'] == reconciliation['matched']
+        assert any(name.endswith('_report.docx') for name in names)
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_bad_requests_are_refused():
+    """Missing files, oversized bodies and a full pool get 400, 413 and 503"""
+    dataset = synthetic_data.make_dataset(3)
+    service = GradeService(workers=1, max_pending=1, max_request_bytes=64 * 1024)
+    server, base = serve(service)
+    try:
+        status, _, body = post(base + '/dbf/update', {'excel': dataset['excel']})
+        assert status == 400 and 'dbf' in json.loads(body)['error']
+
+        status, _, _ = post(base + '/dbf/update', {'excel': ('big.xlsx', b'x' * 100000), 'dbf': dataset['dbf']})
+        assert status == 413
+
+        assert service._slots.acquire(blocking=False)  # Take the only slot
+        try:
+            status, headers, _ = post(base + '/jle', {'jle': dataset['jle']})
+            assert status == 503 and headers['Retry-After']
+        finally:
+            service._slots.release()
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_download_names_are_safe_header_values():
+    """Non-ASCII and quoted upload names come back as an ASCII filename plus the exact UTF-8 filename*"""
+    dataset = synthetic_data.make_dataset(3)
+    service = GradeService(workers=1, max_pending=2)
+    server, base = serve(service)
+    try:
+        for dbf_name, fallback, encoded in [
+                ('DSO_20243_2506B_BACC104_565_成绩.DBF', 'DSO_20243_2506B_BACC104_565___.DBF',
+                 'DSO_20243_2506B_BACC104_565_%E6%88%90%E7%BB%A9.DBF'),
+                ('a".DBF', 'a_.DBF', 'a%22.DBF')]:
+            status, headers, body = post(base + '/dbf/update', {'excel': dataset['excel'],
+                                                                 'dbf': (dbf_name, dataset['dbf'][1])})
+            assert status == 200 and body[:1] == dataset['dbf'][1][:1]
+            assert headers['Content-Disposition'] == f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{encoded}'
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    assert content_disposition('uploads/../x\r\nSet-Cookie: a=b.DBF') == 'attachment; filename="xSet-Cookie: a=b.DBF"'
+
+
+def raw_request(base, content_length, body):
+    """Status line of a POST sent with a hand-written Content-Length header"""
+    host, port = base.rsplit('/', 1)[-1].split(':')
+    with socket.create_connection((host, int(port)), timeout=10) as sock:
+        sock.sendall(f'POST /jle HTTP/1.1\r\nHost: {host}\r\nContent-Type: multipart/form-data; boundary=x\r\n'
+                     f'Content-Length: {content_length}\r\n\r\n'.encode() + body)
+        return sock.makefile('rb').readline().decode()
+
+
+def test_invalid_content_length_is_refused_unread():
+    """Negative and non-numeric Content-Length headers get a 400 without the body being read"""
+    service = GradeService(workers=1, max_pending=1, max_request_bytes=1000)
+    server, base = serve(service)
+    try:
+        # The client keeps the connection open, so reading to EOF would hang here
+        assert ' 400 ' in raw_request(base, -1, b'x' * 5000)
+        assert ' 400 ' in raw_request(base, 'lots', b'x' * 10)
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_timed_out_job_keeps_its_slot():
+    """A job that outlives its request timeout still counts against max_pending until it finishes"""
+    service = GradeService(workers=1, max_pending=1, timeout=0.2)
+    try:
+        with pytest.raises(ServiceError) as timed_out:
+            service.run(time.sleep, 1.0)
+        assert timed_out.value.status == 504
+        assert service.status()['pending'] == 1
+        with pytest.raises(ServiceError) as busy:
+            service.run(time.sleep, 0)
+        assert busy.value.status == 503
+
+        deadline = time.monotonic() + 10
+        while service.status()['pending'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert service.run(time.sleep, 0) is None
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    test_update_and_post_round_trip()
+    test_bad_requests_are_refused()
+    test_download_names_are_safe_header_values()
+    test_invalid_content_length_is_refused_unread()
+    test_timed_out_job_keeps_its_slot()
+    print("All service tests passed")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for filling the Word report's student data table
+"""
+import os
+import time
+
+import pandas as pd
+
+from docx.oxml.ns import qn
+
+from reports import WordReport
+
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Report_template.docx")
+
+
+def make_students(count):
+    """DataFrame shaped like a DBF grade sheet"""
+    return pd.DataFrame({
+        'NUM': range(1, count + 1),
+        'FULLNAME': [f'STUDENT, NUMBER {i}' for i in range(1, count + 1)],
+        'GRADE': [f'{1 + i % 4}.00' for i in range(count)],
+        'REMARKS': [['PASSED', 'FAILED', 'INC', 'DRP'][i % 4] for i in range(count)],
+        'CURRCODE': ['BSA'] * count,
+        'ID': range(1000, 1000 + count),
+    })
+
+
+def test_rows_are_filled_in_order():
+    """Every student gets a numbered row with name, grade and remark in their columns"""
+    report = WordReport(TEMPLATE_PATH)
+    report.populate_student_data_table(make_students(30))
+
+    rows = report.student_table.rows
+    assert len(rows) == 30
+    for pos in (0, 1, 29):
+        texts = [cell.text for cell in rows[pos].cells]
+        assert texts[:5] == [str(pos + 1), f'STUDENT, NUMBER {pos + 1}', f'{1 + pos % 4}.00', '', ['PASSED', 'FAILED', 'INC', 'DRP'][pos % 4]]
+
+
+def test_added_rows_are_styled():
+    """Cloned rows keep the bold Arial 10 runs and take their rules from the table grid"""
+    report = WordReport(TEMPLATE_PATH)
+    report.populate_student_data_table(make_students(5))
+
+    cell = report.student_table.rows[2].cells[1]
+    run = cell.paragraphs[0].runs[0]
+    assert run.font.name == 'Arial'
+    assert run.font.size.pt == 10
+    assert run.font.bold
+    assert cell._element.tcPr.find(qn('w:tcBorders')) is None
+
+    tbl_borders = report.student_table._tbl.tblPr.find(qn('w:tblBorders'))
+    assert tbl_borders.find(qn('w:insideH')).get(qn('w:val')) == 'single'
+    assert tbl_borders.find(qn('w:insideV')).get(qn('w:val')) == 'nil'
+
+
+def test_only_the_last_row_has_the_double_rule():
+    """The final double rule is the one row-level override, one bottom edge per cell"""
+    report = WordReport(TEMPLATE_PATH)
+    report.populate_student_data_table(make_students(40))
+
+    rows = report.student_table.rows
+    for cell in rows[-1].cells:
+        bottoms = cell._element.tcPr.findall(f"{qn('w:tcBorders')}/{qn('w:bottom')}")
+        assert [b.get(qn('w:val')) for b in bottoms] == ['double']
+    assert all(row._tr.find(f".//{qn('w:tcBorders')}") is None for row in rows[1:-1])
+    assert len(report.student_table._tbl.xpath('.//w:tcBorders')) == len(rows[0].cells) + len(rows[-1].cells)
+
+
+def test_missing_and_special_values():
+    """Missing values render empty; tabs and padding are kept as python-docx would write them"""
+    df = make_students(4)
+    df.loc[2, 'FULLNAME'] = None
+    df.loc[3, 'FULLNAME'] = ' LEADING\tTAB '
+
+    report = WordReport(TEMPLATE_PATH)
+    report.populate_student_data_table(df)
+
+    rows = report.student_table.rows
+    assert rows[2].cells[1].text == ''
+    assert rows[3].cells[1].text == ' LEADING\tTAB '
+
+
+def test_statistics_counts_each_student_once():
+    """Remarks are counted in precedence order, e.g. "PASSED" is not also counted as dropped"""
+    report = WordReport(TEMPLATE_PATH)
+    report.populate_student_data_table(make_students(8))
+
+    body = report.doc.element.body.xml
+    assert 'Passed=2  No Grade=2  Failed=2  Dropped=2  TOTAL=8' in body
+
+
+def test_first_column_is_the_name_without_a_name_field():
+    """A DataFrame without a known name field (e.g. an Excel sheet) takes its names from the first column"""
+    df = pd.DataFrame({'Student': ['DELA CRUZ, JUAN'], 'Grade': ['1.50'], 'Remarks': ['PASSED']})
+
+    report = WordReport(TEMPLATE_PATH)
+    report.populate_student_data_table(df)
+
+    texts = [cell.text for cell in report.student_table.rows[0].cells]
+    assert texts[:5] == ['1', 'DELA CRUZ, JUAN', '1.50', '', 'PASSED']
+
+
+def test_large_section_renders_quickly():
+    """A 400-student lecture section fills well under a second"""
+    report = WordReport(TEMPLATE_PATH)
+    start = time.perf_counter()
+    report.populate_student_data_table(make_students(400))
+    elapsed = time.perf_counter() - start
+
+    assert len(report.student_table.rows) == 400
+    assert elapsed < 1.0
+
+
+if __name__ == "__main__":
+    test_rows_are_filled_in_order()
+    test_added_rows_are_styled()
+    test_only_the_last_row_has_the_double_rule()
+    test_missing_and_special_values()
+    test_statistics_counts_each_student_once()
+    test_first_column_is_the_name_without_a_name_field()
+    test_large_section_renders_quickly()
+    print("All student table tests passed")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the synthetic benchmark data and the benchmark runner
+"""
+import io
+import os
+
+import benchmark
+import synthetic_data
+import vfp_table
+from config import extract_jle_data
+from course_index import find_course
+from pipeline import process_files_with_jle, read_dbf_to_dataframe
+
+
+TESTFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testfiles")
+
+
+def header_layout(data):
+    """Table header without the record count (which differs between files)"""
+    header = vfp_table.read_header(data)
+    return header['fields'], header['null_flags'], header['header_length'], header['record_length'], header['codepage']
+
+
+def test_tables_match_the_real_layouts():
+    """Generated JLE and DBF headers match the registrar's files field for field"""
+    with open(os.path.join(TESTFILES, "DSO_20243_565.JLE"), 'rb') as f:
+        real_jle = f.read()
+    with open(os.path.join(TESTFILES, "DSO_20243_2506B_BACC104_565.DBF"), 'rb') as f:
+        real_dbf = f.read()
+
+    assert header_layout(synthetic_data.make_jle(3)) == header_layout(real_jle)
+    assert header_layout(synthetic_data.make_dbf(3)) == header_layout(real_dbf)
+
+
+def test_generation_is_deterministic():
+    """The same size and seed always produce the same bytes"""
+    assert synthetic_data.make_dataset(25) == synthetic_data.make_dataset(25)
+    assert synthetic_data.make_dbf(25, seed=1) != synthetic_data.make_dbf(25, seed=2)
+
+
+def test_dataset_runs_through_the_pipeline():
+    """The JLE matches the DBF's course and every student in the workbook is posted"""
+    dataset = synthetic_data.make_dataset(50)
+    jle_name, jle_bytes = dataset['jle']
+    dbf_name, dbf_bytes = dataset['dbf']
+    excel_name, excel_bytes = dataset['excel']
+
+    jle_file = io.BytesIO(jle_bytes)
+    jle_file.name = jle_name
+    jle_data = extract_jle_data(jle_file)
+    assert jle_data['total_courses'] == 50
+    assert find_course(jle_data, dbf_name)['Subject Code'] == 'BACC104'
+
+    excel_file = io.BytesIO(excel_bytes)
+    excel_file.name = excel_name
+    dbf_file = io.BytesIO(dbf_bytes)
+    dbf_file.name = dbf_name
+    updated, matched = process_files_with_jle(jle_data, excel_file, dbf_file, dbf_name)
+    assert matched == 50
+
+    df = read_dbf_to_dataframe(updated)
+    assert len(df) == 50
+    assert df['GRADE'].notna().all()
+
+
+def test_partial_workbook():
+    """missing_every leaves students out of the workbook"""
+    from excel_grades import read_ffg_grades
+    assert len(read_ffg_grades(synthetic_data.make_ffg_workbook(30, missing_every=3))) == 20
+
+
+def test_benchmark_results_are_json_ready():
+    """A tiny run yields one result per stage and size with timings and a span breakdown"""
+    results = benchmark.run_benchmarks(sizes=[5], repeat=1)
+
+    assert [r['stage'] for r in results['results']] == benchmark.STAGES
+    process = next(r for r in results['results'] if r['stage'] == 'process_files_with_jle')
+    assert process['size'] == 5
+    assert len(process['runs_s']) == 1
+    assert 'excel.read_ffg_records' in process['breakdown_s']
+    assert results['environment']['python']
+
+
+def test_backend_benchmark_compares_the_same_sheet():
+    """The backend comparison reads one FFG sheet with every backend it can and agrees with openpyxl"""
+    results = benchmark.run_backend_benchmarks(sizes=[5], repeat=1)
+
+    timed = {r['backend'] for r in results['results']}
+    assert {'ooxml', 'openpyxl', 'ods', 'csv'} <= timed
+    assert not timed & set(results['skipped_backends'])
+    assert all(r['matches_openpyxl'] and r['students'] == 5 for r in results['results'])
+
+
+if __name__ == "__main__":
+    test_tables_match_the_real_layouts()
+    test_generation_is_deterministic()
+    test_dataset_runs_through_the_pipeline()
+    test_partial_workbook()
+    test_benchmark_results_are_json_ready()
+    test_backend_benchmark_compares_the_same_sheet()
+    print("All synthetic data tests passed")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the memory-mapped, chunked DBF reader
+"""
+import os
+import tempfile
+
+import pandas as pd
+import pytest
+
+import synthetic_data
+import vfp_table
+from vfp_mmap import MappedTable
+
+
+def write_table(data):
+    fd, path = tempfile.mkstemp(suffix='.DBF')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def with_deleted(data, record_numbers):
+    buffer = bytearray(data)
+    header = vfp_table.read_header(buffer)
+    for record_number in record_numbers:
+        start, _ = vfp_table.record_slice(header, record_number)
+        buffer[start] = vfp_table.DELETED_FLAG
+    return bytes(buffer)
+
+
+def test_chunks_match_the_in_memory_reader():
+    """Chunk by chunk, the mapped table decodes exactly what read_columns decodes"""
+    data = with_deleted(synthetic_data.make_dbf(300), [0, 130, 299])
+    path = write_table(data)
+    try:
+        with MappedTable(path) as table:
+            chunks = list(table.iter_chunks(chunk_records=64))
+            assert len(table) == 300
+            assert [len(chunk) for chunk in chunks] == [63, 64, 63, 64, 43]
+            frame = pd.concat(chunks)
+            assert 0 not in frame.index and 130 not in frame.index
+            assert frame.index[0] == 1
+
+            expected = vfp_table.read_columns(data)
+            assert list(frame.columns) == table.field_names
+            for name, values in expected.items():
+                assert frame[name].tolist() == list(values)
+    finally:
+        os.remove(path)
+
+
+def test_random_access_by_record_number():
+    """Single records and arbitrary sets of records are read without scanning the table"""
+    data = with_deleted(synthetic_data.make_dbf(50), [7])
+    path = write_table(data)
+    try:
+        with MappedTable(path) as table:
+            header = vfp_table.read_header(data)
+            start, end = vfp_table.record_slice(header, 42)
+            assert table.record(42) == vfp_table.read_record(header, data[start:end])
+            assert table.record(7, fields=['ID']) == {'ID': int(synthetic_data.student_id(7))}
+            assert table.is_deleted(7) and not table.is_deleted(8)
+
+            picked = table.take([49, 3], fields=['ID', 'FULLNAME'])
+            assert picked.index.tolist() == [49, 3]
+            assert picked['ID'].tolist() == [int(synthetic_data.student_id(49)), int(synthetic_data.student_id(3))]
+
+            with pytest.raises(IndexError):
+                table.record(50)
+            with pytest.raises(KeyError, match="'SECTION'"):
+                table.take([0], fields=['SECTION'])
+    finally:
+        os.remove(path)
+
+
+def test_scan_stops_at_the_eof_marker():
+    """Records after an EOF marker inside the record area are not returned"""
+    buffer = bytearray(synthetic_data.make_dbf(20))
+    header = vfp_table.read_header(buffer)
+    start, _ = vfp_table.record_slice(header, 12)
+    buffer[start] = vfp_table.EOF_MARKER
+    path = write_table(bytes(buffer))
+    try:
+        with MappedTable(path) as table:
+            records = pd.concat(table.iter_chunks(chunk_records=5, fields=['ID']))
+            assert records.index.tolist() == list(range(12))
+    finally:
+        os.remove(path)
+
+
+def test_breaking_out_of_a_scan_closes_the_table():
+    """Leaving a with block in the middle of iter_chunks unmaps the file without a BufferError"""
+    path = write_table(synthetic_data.make_dbf(100))
+    try:
+        with MappedTable(path) as table:
+            chunks = table.iter_chunks(chunk_records=10, fields=['ID'])
+            for chunk in chunks:
+                break
+        assert table._map.closed
+        assert chunk['ID'].tolist()[:2] == [int(synthetic_data.student_id(0)), int(synthetic_data.student_id(1))]
+        assert list(chunks) == []
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    test_chunks_match_the_in_memory_reader()
+    test_random_access_by_record_number()
+    test_scan_stops_at_the_eof_marker()
+    test_breaking_out_of_a_scan_closes_the_table()
+    print("All mapped DBF tests passed")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the workbook reader backends behind the FFG grade extractor
+"""
+import os
+
+import pytest
+
+import synthetic_data
+import workbook_readers
+from excel_grades import read_ffg_grades
+
+SAMPLE_RECORD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testfiles', '2506B.xlsm')
+
+
+def trimmed(rows):
+    """Rows without trailing empty cells and trailing empty rows (backends pad differently)"""
+    rows = [tuple(row[:max((i + 1 for i, value in enumerate(row) if value is not None), default=0)])
+            for row in rows]
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def test_every_backend_reads_the_same_grades():
+    """The .xlsx backends and the .ods/.csv exports of one FFG sheet give the same grades"""
+    excel_bytes = synthetic_data.make_ffg_workbook(40, missing_every=5)
+    expected = read_ffg_grades(excel_bytes, backend='openpyxl')
+    assert len(expected) == 32
+
+    assert read_ffg_grades(excel_bytes, backend='ooxml') == expected
+    assert read_ffg_grades(synthetic_data.ffg_as_ods(excel_bytes)) == expected
+    assert read_ffg_grades(synthetic_data.ffg_as_csv(excel_bytes)) == expected
+
+
+def test_file_type_picks_the_fastest_backend():
+    """Files are recognised by content and read with the first installed backend"""
+    excel_bytes = synthetic_data.make_ffg_workbook(3)
+    assert workbook_readers.detect_format(excel_bytes) == 'xlsx'
+    assert workbook_readers.detect_format(synthetic_data.ffg_as_ods(excel_bytes)) == 'ods'
+    assert workbook_readers.detect_format(synthetic_data.ffg_as_csv(excel_bytes)) == 'csv'
+    assert workbook_readers.detect_format(workbook_readers.OLE2_MAGIC + b'\0' * 504) == 'xls'
+    assert workbook_readers.select_backend('xlsx') == 'ooxml'
+
+
+def test_raw_ooxml_matches_openpyxl_on_a_real_record():
+    """Shared strings, formula results and errors (#REF!) read as openpyxl reads them"""
+    with open(SAMPLE_RECORD, 'rb') as f:
+        data = f.read()
+
+    ooxml = trimmed(workbook_readers.iter_sheet_rows(data, 'FFG', 'ooxml'))
+    openpyxl = trimmed(workbook_readers.iter_sheet_rows(data, 'FFG', 'openpyxl'))
+    assert ooxml == openpyxl
+    assert read_ffg_grades(data, backend='ooxml') == read_ffg_grades(data, backend='openpyxl')
+
+
+def test_ods_padding_is_not_expanded():
+    """The million repeated empty rows and columns of an .ods sheet are not materialised"""
+    rows = list(workbook_readers.iter_sheet_rows(synthetic_data.ffg_as_ods(synthetic_data.make_ffg_workbook(5)), 'FFG'))
+    assert len(rows) == 15
+    assert max(len(row) for row in rows) == len(rows[6])
+
+
+def test_missing_sheet_is_reported_by_every_backend():
+    """Each backend names the sheets it found when FFG is missing"""
+    excel_bytes = synthetic_data.make_ffg_workbook(3)
+    for backend, data in [('ooxml', excel_bytes), ('openpyxl', excel_bytes),
+                          ('ods', synthetic_data.ffg_as_ods(excel_bytes))]:
+        with pytest.raises(ValueError, match="Worksheet 'Grades' not found. Available sheets: Informations, FFG"):
+            list(workbook_readers.iter_sheet_rows(data, 'Grades', backend))
+
+
+def test_xls_needs_xlrd():
+    """Without xlrd, a legacy .xls upload is rejected with the package to install"""
+    if workbook_readers.backend_available('xlrd'):
+        pytest.skip("xlrd is installed")
+    with pytest.raises(ValueError, match="xlrd"):
+        read_ffg_grades(workbook_readers.OLE2_MAGIC + b'\0' * 504)
+
+
+if __name__ == "__main__":
+    test_every_backend_reads_the_same_grades()
+    test_file_type_picks_the_fastest_backend()
+    test_raw_ooxml_matches_openpyxl_on_a_real_record()
+    test_ods_padding_is_not_expanded()
+    test_missing_sheet_is_reported_by_every_backend()
+    if not workbook_readers.backend_available('xlrd'):
+        test_xls_needs_xlrd()
+    print("All workbook reader tests passed")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test script for the XML text sanitizer used by the Word reports
+"""
+import pandas as pd
+
+from reports import WordReport, sanitize_xml_column, sanitize_xml_text
+
+
+def legacy_sanitize(text):
+    """The original per-character implementation, for comparison"""
+    if text is None:
+        return "N/A"
+    sanitized = ''.join(char if ord(char) >= 0x20 or ord(char) in (0x09, 0x0A, 0x0D) else '?' for char in str(text))
+    return sanitized.replace('\x00', '')
+
+
+def test_matches_legacy_for_control_characters():
+    """Every ASCII control character is handled exactly as before"""
+    text = ''.join(chr(c) for c in range(0x80)) + 'DELA CRUZ, JUAN'
+    assert sanitize_xml_text(text) == legacy_sanitize(text)
+    assert sanitize_xml_text(None) == 'N/A'
+    assert sanitize_xml_text(1.5) == '1.5'
+
+
+def test_rejects_other_non_xml_characters():
+    """Non-characters and lone surrogates, which lxml refuses, become '?'"""
+    assert sanitize_xml_text('a￾b￿c\ud800') == 'a?b?c?'
+    assert sanitize_xml_text('ÑOÑO – café') == 'ÑOÑO – café'
+
+
+def test_column_variant():
+    """A whole column is cleaned at once, with missing values as empty cells"""
+    values = pd.Series(['OK\x01', None, 3, float('nan'), 'tab\there'], dtype=object)
+    assert sanitize_xml_column(values) == ['OK?', '', '3', '', 'tab\there']
+    assert sanitize_xml_column(pd.Series([], dtype=object)) == []
+
+
+def test_word_report_method_delegates():
+    """WordReport.sanitize_text_for_xml keeps working for existing callers"""
+    assert WordReport.sanitize_text_for_xml(None, 'x\x0by') == 'x?y'
+
+
+if __name__ == "__main__":
+    test_matches_legacy_for_control_characters()
+    test_rejects_other_non_xml_characters()
+    test_column_variant()
+    test_word_report_method_delegates()
+    print("All XML sanitizer tests passed")
@@ -0,0 +1,156 @@
+import mmap
+import os
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import vfp_table
+
+
+# Records decoded per chunk by MappedTable.iter_chunks
+DEFAULT_CHUNK_RECORDS = int(os.environ.get('ECLASS_DBF_CHUNK_RECORDS', '65536'))
+
+
+class MappedTable:
+    """
+    Read-only, memory-mapped view of a dBASE/VFP table on disk.
+
+    For registrar master tables too large to read into memory: the file is
+    mapped, the header parsed from the mapping, and records are decoded only
+    when asked for, either chunk by chunk (iter_chunks) or by record number
+    (record, take). Scanned pages are handed back to the OS as each chunk is
+    done, so a whole-table scan runs in memory bounded by the chunk size.
+
+        with MappedTable('DSO_20243_MASTER.DBF') as table:
+            for chunk in table.iter_chunks(fields=['ID', 'GRADE']):
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._chunk_iters = weakref.WeakSet()  # Unfinished iter_chunks generators, which pin the mapping
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError("Data is not a dBASE/Visual FoxPro table")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.header = vfp_table.read_header(self._map)
+            self._records = vfp_table.record_array(self._map, self.header)
+        except Exception:
+            self._map.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        """Records in the table, deleted ones included (record numbers run 0..len-1)"""
+        return self.header['record_count']
+
+    @property
+    def field_names(self):
+        return [field['name'] for field in vfp_table.user_fields(self.header)]
+
+    def close(self):
+        """
+        Unmap the file. Unfinished iter_chunks generators are closed first,
+        since their record views pin the mapping; if the caller still holds
+        a view of its own, the file is unmapped once that view is gone.
+        """
+        if self._records is None:
+            return
+        for chunks in list(self._chunk_iters):
+            chunks.close()
+        self._records = None  # The array view must go before the mapping can close
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+    def _fields(self, fields):
+        if fields is None:
+            return vfp_table.user_fields(self.header)
+        descriptors = []
+        for name in fields:
+            field = vfp_table.get_field(self.header, name)
+            if field is None:
+                raise KeyError(f"Field '{name}' not found in {os.path.basename(self.path)}")
+            descriptors.append(field)
+        return descriptors
+
+    def _frame(self, records, record_numbers, fields, strip_text):
+        columns = vfp_table.decode_columns(self.header, records, fields, strip_text)
+        return pd.DataFrame(columns, columns=[field['name'] for field in fields],
+                            index=pd.Index(record_numbers, name='record'))
+
+    def is_deleted(self, record_number):
+        self._check(record_number)
+        return self._records[vfp_table.DELETION_FLAG_COLUMN][record_number] == vfp_table.DELETED_FLAG
+
+    def record(self, record_number, fields=None):
+        """One record's values by record number, decoded straight from the mapping"""
+        self._check(record_number)
+        start, end = vfp_table.record_slice(self.header, record_number)
+        return vfp_table.read_record(self.header, self._map[start:end], self._fields(fields))
+
+    def take(self, record_numbers, fields=None, strip_text=True):
+        """DataFrame of the given records (deleted ones included), indexed by record number"""
+        record_numbers = np.asarray(record_numbers, dtype=np.int64)
+        if record_numbers.size and (record_numbers.min() < 0 or record_numbers.max() >= len(self)):
+            raise IndexError(f"Record number out of range (table has {len(self)} records)")
+        return self._frame(self._records[record_numbers], record_numbers, self._fields(fields), strip_text)
+
+    def iter_chunks(self, chunk_records=DEFAULT_CHUNK_RECORDS, fields=None, include_deleted=False, strip_text=True):
+        """
+        Yield the table as DataFrames of up to chunk_records records, indexed
+        by record number, stopping at the EOF marker. Deleted records are
+        left out unless include_deleted is True.
+
+        Args:
+            fields: Field names to decode (default: every user field)
+        """
+        chunks = self._chunks(chunk_records, self._fields(fields), include_deleted, strip_text)
+        self._chunk_iters.add(chunks)
+        return chunks
+
+    def _chunks(self, chunk_records, fields, include_deleted, strip_text):
+        self._advise(mmap.MADV_SEQUENTIAL if hasattr(mmap, 'MADV_SEQUENTIAL') else None)
+        for start in range(0, len(self), chunk_records):
+            stop = min(start + chunk_records, len(self))
+            records = self._records[start:stop]
+            flags = records[vfp_table.DELETION_FLAG_COLUMN]
+            keep = np.ones(len(records), dtype=bool) if include_deleted else flags != vfp_table.DELETED_FLAG
+            eof = np.flatnonzero(flags == vfp_table.EOF_MARKER)
+            if eof.size:
+                keep[eof[0]:] = False
+
+            yield self._frame(records[keep], np.arange(start, stop)[keep], fields, strip_text)
+            self._release_pages(start, stop)
+            if eof.size:
+                return
+
+    def _check(self, record_number):
+        if not 0 <= record_number < len(self):
+            raise IndexError(f"Record {record_number} out of range (table has {len(self)} records)")
+
+    def _advise(self, option, start=0, length=None):
+        if option is None or not hasattr(self._map, 'madvise'):
+            return
+        if length is None:
+            length = len(self._map) - start
+        self._map.madvise(option, start, length)
+
+    def _release_pages(self, start_record, stop_record):
+        """Let the OS drop the mapped pages of records already decoded"""
+        if not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        begin, _ = vfp_table.record_slice(self.header, start_record)
+        end, _ = vfp_table.record_slice(self.header, stop_record)
+        begin -= begin % mmap.PAGESIZE
+        end -= end % mmap.PAGESIZE
+        if end > begin:
+            self._advise(mmap.MADV_DONTNEED, begin, end - begin)
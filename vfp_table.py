@@ -0,0 +1,429 @@
+import struct
+
+import numpy as np
+
+
+# Table signature bytes (first byte of the header) that we know how to read.
+# 0x30/0x31/0x32 are Visual FoxPro tables (the DSO_*.DBF grade sheets and the
+# DSO_*.JLE course lists), the rest are plain dBASE/FoxBASE variants.
+KNOWN_SIGNATURES = {0x02, 0x03, 0x04, 0x05, 0x30, 0x31, 0x32, 0x43, 0x63, 0x83, 0x8B, 0xCB, 0xF5, 0xFB}
+
+# Language driver byte (offset 29) to Python codec
+CODEPAGES = {
+    0x01: 'cp437',
+    0x02: 'cp850',
+    0x03: 'cp1252',
+    0x64: 'cp852',
+    0x65: 'cp866',
+    0x66: 'cp865',
+    0x67: 'cp861',
+    0x6A: 'cp737',
+    0x6B: 'cp857',
+    0x78: 'cp950',
+    0x79: 'cp949',
+    0x7A: 'cp936',
+    0x7B: 'cp932',
+    0xC8: 'cp1250',
+    0xC9: 'cp1251',
+    0xCB: 'cp1253',
+    0xCC: 'cp1254',
+}
+
+FIELD_FLAG_SYSTEM = 0x01
+FIELD_FLAG_NULLABLE = 0x02
+FIELD_FLAG_BINARY = 0x04
+
+DELETED_FLAG = 0x2A  # '*'
+EOF_MARKER = 0x1A
+
+
+def is_vfp_table(data):
+    """
+    Quick check whether the bytes look like a dBASE/VFP table
+    (known signature and a header that fits inside the data)
+    """
+    if data is None or len(data) < 32:
+        return False
+    if data[0] not in KNOWN_SIGNATURES:
+        return False
+    header_length, record_length = struct.unpack_from('<HH', data, 8)
+    return 32 < header_length <= len(data) and record_length > 0
+
+
+def read_header(data):
+    """
+    Parse the table header and field descriptors.
+
+    Returns a dict with the record count, header/record lengths, the text
+    encoding and a list of field descriptors. Each field descriptor is a dict
+    with name, type, offset (within the record, including the deletion flag
+    byte), length, decimals, flags and, for nullable fields, the bit number
+    inside _NullFlags.
+    """
+    if not is_vfp_table(data):
+        raise ValueError("Data is not a dBASE/Visual FoxPro table")
+
+    signature = data[0]
+    record_count, header_length, record_length = struct.unpack_from('<IHH', data, 4)
+    codepage = data[29]
+
+    fields = []
+    pos = 32
+    next_offset = 1  # byte 0 of every record is the deletion flag
+    while pos + 32 <= header_length and data[pos] != 0x0D:
+        descriptor = bytes(data[pos:pos + 32])
+        name = descriptor[:11].split(b'\x00', 1)[0].decode('ascii', errors='ignore').strip()
+        field_type = chr(descriptor[11])
+        offset = struct.unpack_from('<I', descriptor, 12)[0]
+        length = descriptor[16]
+        decimals = descriptor[17]
+        flags = descriptor[18]
+
+        # Older dBASE files leave the displacement empty, so compute it
+        if signature not in (0x30, 0x31, 0x32) or offset == 0:
+            offset = next_offset
+        next_offset = offset + length
+
+        fields.append({
+            'name': name,
+            'type': field_type,
+            'offset': offset,
+            'length': length,
+            'decimals': decimals,
+            'flags': flags,
+            'null_bit': None,
+        })
+        pos += 32
+
+    # VFP assigns one _NullFlags bit per nullable field (and one per
+    # variable-length field) in field order
+    null_bit = 0
+    for field in fields:
+        if field['name'] == '_NullFlags':
+            continue
+        if field['type'] in ('V', 'Q'):
+            null_bit += 1
+        if field['flags'] & FIELD_FLAG_NULLABLE:
+            field['null_bit'] = null_bit
+            null_bit += 1
+
+    # Never trust the stored record count beyond what the data actually holds
+    available = max(0, (len(data) - header_length) // record_length)
+
+    return {
+        'signature': signature,
+        'record_count': min(record_count, available),
+        'header_length': header_length,
+        'record_length': record_length,
+        'codepage': codepage,
+        'encoding': CODEPAGES.get(codepage, 'latin1'),
+        'fields': fields,
+        'null_flags': next((f for f in fields if f['name'] == '_NullFlags'), None),
+    }
+
+
+def get_field(header, name):
+    """Return the field descriptor with the given name (case-insensitive), or None"""
+    name = name.upper()
+    for field in header['fields']:
+        if field['name'].upper() == name:
+            return field
+    return None
+
+
+def user_fields(header):
+    """Field descriptors excluding the hidden VFP system fields such as _NullFlags"""
+    return [f for f in header['fields'] if not (f['flags'] & FIELD_FLAG_SYSTEM) and f['name'] != '_NullFlags']
+
+
+def record_slice(header, record_number):
+    """Byte range (start, end) of a record inside the table data"""
+    start = header['header_length'] + record_number * header['record_length']
+    return start, start + header['record_length']
+
+
+def is_null(header, record, field):
+    """Check the _NullFlags bit of a nullable field for the given raw record"""
+    if field['null_bit'] is None:
+        return False
+    null_field = header['null_flags']
+    if null_field is None:
+        return False
+    byte_index, bit = divmod(field['null_bit'], 8)
+    if byte_index >= null_field['length']:
+        return False
+    return bool(record[null_field['offset'] + byte_index] & (1 << bit))
+
+
+def decode_value(field, raw, encoding='latin1'):
+    """
+    Decode the raw bytes of a single field into a Python value.
+    Character fields are returned stripped, numeric fields as int/float
+    (None when blank), logical fields as bool (None when unknown).
+    """
+    field_type = field['type']
+    if field_type in ('C', 'V'):
+        return bytes(raw).decode(encoding, errors='replace').rstrip(' \x00')
+    if field_type in ('N', 'F'):
+        text = bytes(raw).strip(b' \x00')
+        if not text:
+            return None
+        try:
+            if field['decimals'] == 0 and b'.' not in text:
+                return int(text)
+            return float(text)
+        except ValueError:
+            return None
+    if field_type == 'I':
+        return struct.unpack('<i', bytes(raw))[0]
+    if field_type == 'B':
+        return struct.unpack('<d', bytes(raw))[0]
+    if field_type == 'Y':
+        return struct.unpack('<q', bytes(raw))[0] / 10000
+    if field_type == 'L':
+        value = bytes(raw)[:1].upper()
+        if value in (b'T', b'Y'):
+            return True
+        if value in (b'F', b'N'):
+            return False
+        return None
+    if field_type == 'D':
+        text = bytes(raw).strip()
+        return text.decode('ascii', errors='ignore') if text else None
+    # Date-times, memo pointers and binary fields are passed through untouched
+    return bytes(raw)
+
+
+def iter_records(data, header, include_deleted=False):
+    """
+    Yield (record_number, raw_record) for each record in the table.
+    Deleted records are skipped unless include_deleted is True.
+    """
+    view = memoryview(data)
+    record_length = header['record_length']
+    pos = header['header_length']
+    for record_number in range(header['record_count']):
+        record = view[pos:pos + record_length]
+        pos += record_length
+        if record[0] == EOF_MARKER:
+            break
+        if record[0] == DELETED_FLAG and not include_deleted:
+            continue
+        yield record_number, record
+
+
+def read_record(header, record, fields=None):
+    """Decode a raw record into a dict of field name -> value (None for VFP nulls)"""
+    encoding = header['encoding']
+    values = {}
+    for field in fields if fields is not None else user_fields(header):
+        if is_null(header, record, field):
+            values[field['name']] = None
+            continue
+        raw = record[field['offset']:field['offset'] + field['length']]
+        values[field['name']] = decode_value(field, raw, encoding)
+    return values
+
+
+# Codepages where one character can take more than one byte
+MULTIBYTE_ENCODINGS = {'cp932', 'cp936', 'cp949', 'cp950'}
+
+DELETION_FLAG_COLUMN = '_deletion_flag'  # never clashes with a field name (max 10 chars)
+
+
+def record_dtype(header):
+    """
+    numpy structured dtype of one record: the deletion flag byte, then every
+    field (including _NullFlags) as fixed-width raw bytes at its offset
+    """
+    names = [DELETION_FLAG_COLUMN]
+    formats = ['u1']
+    offsets = [0]
+    for field in header['fields']:
+        names.append(field['name'])
+        formats.append(f"S{field['length']}")
+        offsets.append(field['offset'])
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                     'itemsize': header['record_length']})
+
+
+def record_array(data, header):
+    """Structured array over the records, sharing memory with data (no copy)"""
+    return np.frombuffer(data, dtype=record_dtype(header), count=header['record_count'],
+                         offset=header['header_length'])
+
+
+def _byte_matrix(column, length):
+    """(records x length) uint8 view of a fixed-width bytes column"""
+    return np.frombuffer(column.tobytes(), dtype=np.uint8).reshape(len(column), length)
+
+
+def _null_mask(header, records, field):
+    """Boolean mask of the records whose _NullFlags bit is set for field (None if not nullable)"""
+    null_field = header['null_flags']
+    if field['null_bit'] is None or null_field is None:
+        return None
+    byte_index, bit = divmod(field['null_bit'], 8)
+    if byte_index >= null_field['length']:
+        return None
+    flags = _byte_matrix(records[null_field['name']], null_field['length'])[:, byte_index]
+    return (flags & (1 << bit)).astype(bool)
+
+
+def _decode_text_column(column, length, encoding, strip):
+    raw = column.tobytes()
+    if encoding in MULTIBYTE_ENCODINGS:
+        values = [raw[i:i + length].decode(encoding, errors='replace') for i in range(0, len(raw), length)]
+    else:
+        # Single-byte codepage: decode the whole column at once, then cut it
+        text = raw.decode(encoding, errors='replace')
+        values = [text[i:i + length] for i in range(0, len(text), length)]
+    if strip:
+        values = [value.rstrip(' \x00') for value in values]
+    return values
+
+
+def _decode_numeric_column(field, column, matrix, missing):
+    """float64 array (NaN where missing), or int64 when every value is a whole number"""
+    blank = ((matrix == 0x20) | (matrix == 0x00)).all(axis=1)
+    missing = blank if missing is None else (missing | blank)
+    filled = np.where(missing, b'0', column)
+    if field['decimals'] == 0 and not missing.any() and not (matrix == ord('.')).any():
+        return filled.astype(np.int64)
+    values = filled.astype(np.float64)
+    values[missing] = np.nan
+    return values
+
+
+def read_columns(data, header=None, include_deleted=False, strip_text=True):
+    """
+    Decode every user field of the table column-wise.
+
+    The records are viewed as a numpy structured array straight over the
+    bytes, deleted records are masked out and each column is decoded in bulk.
+
+    Args:
+        strip_text: Strip the padding from character values (False keeps the
+                    fixed-width text, as the dbf library returns it)
+
+    Returns:
+        dict: field name -> list (text and other types, None for nulls) or
+              numpy array (numeric fields, NaN for nulls/blanks)
+    """
+    if header is None:
+        header = read_header(data)
+    records = live_records(header, record_array(data, header), include_deleted)
+    return decode_columns(header, records, strip_text=strip_text)
+
+
+def live_records(header, records, include_deleted=False):
+    """
+    The records before the EOF marker, without the deleted ones unless
+    include_deleted is True (a view when nothing is deleted)
+    """
+    flags = records[DELETION_FLAG_COLUMN]
+    eof = np.flatnonzero(flags == EOF_MARKER)
+    if eof.size:
+        records = records[:eof[0]]
+        flags = flags[:eof[0]]
+    if not include_deleted:
+        records = records[flags != DELETED_FLAG]
+    return records
+
+
+def decode_columns(header, records, fields=None, strip_text=True):
+    """
+    Decode fields of a structured record array (see record_array) column-wise.
+
+    Args:
+        fields: Field descriptors to decode (default: every user field)
+
+    Returns:
+        dict: field name -> list or numpy array, as read_columns returns
+    """
+    encoding = header['encoding']
+    columns = {}
+    for field in fields if fields is not None else user_fields(header):
+        column = records[field['name']]
+        nulls = _null_mask(header, records, field)
+
+        if field['type'] in ('C', 'V'):
+            values = _decode_text_column(column, field['length'], encoding, strip_text)
+        elif field['type'] in ('N', 'F'):
+            try:
+                columns[field['name']] = _decode_numeric_column(field, column, _byte_matrix(column, field['length']), nulls)
+                continue
+            except ValueError:
+                # Garbage in a numeric field: decode value by value (unparseable -> None)
+                values = [decode_value(field, raw.ljust(field['length'], b'\x00'), encoding) for raw in column.tolist()]
+        else:
+            matrix = _byte_matrix(column, field['length'])
+            values = [decode_value(field, row.tobytes(), encoding) for row in matrix]
+
+        if nulls is not None and nulls.any():
+            for i in np.flatnonzero(nulls):
+                values[i] = None
+        columns[field['name']] = values
+    return columns
+
+
+def encode_value(field, value, encoding='latin1'):
+    """
+    Encode a Python value into the fixed-width bytes of a field.
+    Raises ValueError when the value does not fit, mirroring the dbf
+    library's DataOverflowError so callers never write truncated data.
+    """
+    field_type = field['type']
+    length = field['length']
+    if field_type in ('C', 'V'):
+        raw = str(value).encode(encoding, errors='replace')
+        if len(raw) > length:
+            raise ValueError(f"field '{field['name']}': tried to store {len(raw)} bytes in {length} byte field")
+        return raw.ljust(length, b' ')
+    if field_type in ('N', 'F'):
+        if value is None or value == '':
+            return b' ' * length
+        if field['decimals']:
+            text = f"{float(value):.{field['decimals']}f}"
+        else:
+            text = str(int(value))
+        raw = text.encode('ascii')
+        if len(raw) > length:
+            raise ValueError(f"field '{field['name']}': tried to store {len(raw)} bytes in {length} byte field")
+        return raw.rjust(length, b' ')
+    if field_type == 'L':
+        if value is None:
+            return b'?'
+        return b'T' if value else b'F'
+    raise ValueError(f"field '{field['name']}': writing type {field_type} is not supported")
+
+
+def set_null(header, buffer, record_start, field, null):
+    """Set or clear the _NullFlags bit of a nullable field in a writable buffer"""
+    if field['null_bit'] is None or header['null_flags'] is None:
+        return
+    byte_index, bit = divmod(field['null_bit'], 8)
+    pos = record_start + header['null_flags']['offset'] + byte_index
+    if null:
+        buffer[pos] |= (1 << bit)
+    else:
+        buffer[pos] &= ~(1 << bit) & 0xFF
+
+
+def write_values(header, buffer, record_number, values):
+    """
+    Write several field values into one record of a writable buffer
+    (bytearray or writable memoryview) in place.
+
+    All values are encoded before anything is written, so a value that
+    doesn't fit leaves the record untouched.
+
+    Args:
+        values: list of (field descriptor, value) pairs
+    """
+    start, _ = record_slice(header, record_number)
+    encoded = [(field, encode_value(field, value, header['encoding'])) for field, value in values]
+    for field, raw in encoded:
+        pos = start + field['offset']
+        buffer[pos:pos + field['length']] = raw
+        set_null(header, buffer, start, field, False)
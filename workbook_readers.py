@@ -0,0 +1,368 @@
+"""
+Workbook reader backends for the FFG grade extractor.
+
+Every backend streams one worksheet as tuples of cell values, the way
+openpyxl's read-only iter_rows(values_only=True) does: row 1 first, empty
+rows as empty tuples, None for empty cells, numbers as int or float.
+iter_sheet_rows() sniffs the file type and uses the fastest backend that is
+installed for it (see benchmark.py --backends for the comparison).
+"""
+import csv
+import importlib.util
+import io
+import posixpath
+import re
+import zipfile
+from datetime import datetime
+from functools import lru_cache
+from xml.etree.ElementTree import iterparse
+
+
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # Legacy BIFF .xls (and other OLE2 files)
+ODS_MIMETYPE = b'application/vnd.oasis.opendocument.spreadsheet'
+
+# File type -> backends, fastest first
+FASTEST_FIRST = {
+    'xlsx': ('ooxml', 'openpyxl'),  # .xlsx and .xlsm
+    'xls': ('xlrd',),
+    'ods': ('ods',),
+    'csv': ('csv',),
+}
+
+
+def detect_format(data):
+    """'xlsx', 'xls', 'ods' or 'csv', from the file's contents rather than its name"""
+    if data[:8] == OLE2_MAGIC:
+        return 'xls'
+    if data[:4] == b'PK\x03\x04':
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            names = set(archive.namelist())
+            if 'xl/workbook.xml' in names:
+                return 'xlsx'
+            if 'mimetype' in names and archive.read('mimetype').strip() == ODS_MIMETYPE:
+                return 'ods'
+        raise ValueError("Unsupported workbook: the archive is neither an Excel nor an OpenDocument spreadsheet")
+    return 'csv'
+
+
+def _missing_sheet(sheet_name, sheet_names):
+    available_sheets = ", ".join(sheet_names)
+    return ValueError(f"Worksheet '{sheet_name}' not found. Available sheets: {available_sheets}")
+
+
+def _cast_number(value):
+    """Number from its text, int unless it has a fraction or exponent (as openpyxl does)"""
+    if '.' in value or 'E' in value or 'e' in value:
+        return float(value)
+    return int(value)
+
+
+# openpyxl: read-only workbook
+
+def openpyxl_rows(data, sheet_name):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise _missing_sheet(sheet_name, wb.sheetnames)
+        yield from wb[sheet_name].iter_rows(values_only=True)
+    finally:
+        wb.close()  # Read-only workbooks keep the archive open until closed
+
+
+# Raw OOXML: the sheet's XML part parsed straight from the archive
+
+SPREADSHEETML = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+OFFICE_RELATIONSHIPS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_RELATIONSHIPS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+ROW_TAG = SPREADSHEETML + 'row'
+CELL_TAG = SPREADSHEETML + 'c'
+VALUE_TAG = SPREADSHEETML + 'v'
+TEXT_TAG = SPREADSHEETML + 't'
+RUN_TAG = SPREADSHEETML + 'r'
+INLINE_STRING_TAG = SPREADSHEETML + 'is'
+
+CELL_REF = re.compile(r'([A-Z]+)')
+
+
+@lru_cache(maxsize=1024)
+def column_index(ref):
+    """1-based column of a cell reference such as 'C11'"""
+    index = 0
+    for letter in CELL_REF.match(ref).group(1):
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def _string_item_text(item):
+    """Text of a shared or inline string item (plain <t>, or the <t> of each rich-text run)"""
+    text = item.find(TEXT_TAG)
+    if text is not None:
+        return text.text or ''
+    return ''.join(run.findtext(TEXT_TAG, '') for run in item.iter(RUN_TAG))
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as f:
+        for _, elem in iterparse(f):
+            if elem.tag == SPREADSHEETML + 'si':
+                strings.append(_string_item_text(elem))
+                elem.clear()
+    return strings
+
+
+def _sheet_part(archive, sheet_name):
+    """Archive path of a worksheet's XML part, by sheet name"""
+    with archive.open('xl/workbook.xml') as f:
+        sheets = [(sheet.get('name'), sheet.get(OFFICE_RELATIONSHIPS + 'id'))
+                  for _, sheet in iterparse(f) if sheet.tag == SPREADSHEETML + 'sheet']
+    rel_id = dict(sheets).get(sheet_name)
+    if rel_id is None:
+        raise _missing_sheet(sheet_name, [name for name, _ in sheets])
+
+    with archive.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {rel.get('Id'): rel.get('Target')
+                   for _, rel in iterparse(f) if rel.tag == PACKAGE_RELATIONSHIPS + 'Relationship'}
+    target = targets[rel_id]
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join('xl', target))
+
+
+def _ooxml_value(cell, shared_strings):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        item = cell.find(INLINE_STRING_TAG)
+        return _string_item_text(item) if item is not None else None
+    value = cell.findtext(VALUE_TAG)
+    if not value:
+        return None  # No value, or an empty formula result
+    if cell_type == 'n':
+        return _cast_number(value)
+    if cell_type == 's':
+        return shared_strings[int(value)]
+    if cell_type == 'b':
+        return value == '1'
+    if cell_type == 'd':
+        return datetime.fromisoformat(value)
+    return value  # 'str' (formula result) and 'e' (error such as #REF!)
+
+
+def ooxml_rows(data, sheet_name):
+    """
+    Rows of an .xlsx/.xlsm sheet read directly from its XML part. Only the
+    workbook index, the shared strings and the one sheet are parsed; styles
+    are not, so date-formatted numbers come back as their serial numbers.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        part = _sheet_part(archive, sheet_name)
+        shared_strings = _shared_strings(archive)
+
+        with archive.open(part) as f:
+            next_row = 1
+            for _, elem in iterparse(f):
+                if elem.tag != ROW_TAG:
+                    continue
+                row_idx = int(elem.get('r', next_row))
+                for _ in range(next_row, row_idx):
+                    yield ()  # Rows the sheet doesn't store are empty
+                values = []
+                for cell in elem.iter(CELL_TAG):
+                    ref = cell.get('r')
+                    col_idx = column_index(ref) if ref else len(values) + 1
+                    if col_idx > len(values) + 1:
+                        values.extend([None] * (col_idx - len(values) - 1))
+                    values.append(_ooxml_value(cell, shared_strings))
+                elem.clear()
+                next_row = row_idx + 1
+                yield tuple(values)
+
+
+# Legacy BIFF .xls (optional: needs xlrd)
+
+def xlrd_rows(data, sheet_name):
+    import xlrd
+
+    book = xlrd.open_workbook(file_contents=data, on_demand=True)
+    try:
+        if sheet_name not in book.sheet_names():
+            raise _missing_sheet(sheet_name, book.sheet_names())
+        sheet = book.sheet_by_name(sheet_name)
+        for row_idx in range(sheet.nrows):
+            yield tuple(_xlrd_value(cell, book.datemode) for cell in sheet.row(row_idx))
+    finally:
+        book.release_resources()
+
+
+def _xlrd_value(cell, datemode):
+    import xlrd
+
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+        return None
+    if cell.ctype == xlrd.XL_CELL_NUMBER:
+        # BIFF stores every number as a double; whole numbers read as int like .xlsx ones do
+        return int(cell.value) if cell.value.is_integer() else cell.value
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return xlrd.xldate_as_datetime(cell.value, datemode)
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    if cell.ctype == xlrd.XL_CELL_ERROR:
+        return xlrd.error_text_from_code.get(cell.value)
+    return cell.value
+
+
+# OpenDocument .ods
+
+ODS_TABLE = '{urn:oasis:names:tc:opendocument:xmlns:table:1.0}'
+ODS_OFFICE = '{urn:oasis:names:tc:opendocument:xmlns:office:1.0}'
+ODS_TEXT = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+ODS_CELL_TAGS = (ODS_TABLE + 'table-cell', ODS_TABLE + 'covered-table-cell')
+
+
+def _ods_value(cell):
+    value_type = cell.get(ODS_OFFICE + 'value-type')
+    if value_type is None:
+        return None
+    if value_type in ('float', 'percentage', 'currency'):
+        return _cast_number(cell.get(ODS_OFFICE + 'value'))
+    if value_type == 'boolean':
+        return cell.get(ODS_OFFICE + 'boolean-value') == 'true'
+    if value_type == 'date':
+        return datetime.fromisoformat(cell.get(ODS_OFFICE + 'date-value'))
+    if value_type == 'time':
+        return cell.get(ODS_OFFICE + 'time-value')
+    return '\n'.join(''.join(p.itertext()) for p in cell.iter(ODS_TEXT + 'p'))
+
+
+def ods_rows(data, sheet_name):
+    """
+    Rows of an OpenDocument sheet from content.xml. Repeated empty cells and
+    rows (ODS pads sheets with a million of them) are only expanded when
+    something follows them.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        sheet_names = []
+        in_sheet = False
+        pending_rows = 0
+        with archive.open('content.xml') as f:
+            for event, elem in iterparse(f, events=('start', 'end')):
+                if elem.tag == ODS_TABLE + 'table':
+                    if event == 'start':
+                        sheet_names.append(elem.get(ODS_TABLE + 'name'))
+                        in_sheet = sheet_names[-1] == sheet_name
+                    elif in_sheet:
+                        return
+                    continue
+                if event != 'end' or elem.tag != ODS_TABLE + 'table-row':
+                    continue
+                if not in_sheet:
+                    elem.clear()
+                    continue
+
+                values = []
+                pending_cells = 0
+                for cell in elem:
+                    if cell.tag not in ODS_CELL_TAGS:
+                        continue
+                    repeat = int(cell.get(ODS_TABLE + 'number-columns-repeated', '1'))
+                    value = _ods_value(cell)
+                    if value is None:
+                        pending_cells += repeat
+                        continue
+                    values.extend([None] * pending_cells)
+                    values.extend([value] * repeat)
+                    pending_cells = 0
+                repeat = int(elem.get(ODS_TABLE + 'number-rows-repeated', '1'))
+                elem.clear()
+
+                if not values:
+                    pending_rows += repeat
+                    continue
+                for _ in range(pending_rows):
+                    yield ()
+                pending_rows = 0
+                for _ in range(repeat):
+                    yield tuple(values)
+    raise _missing_sheet(sheet_name, sheet_names)
+
+
+# CSV export of the sheet
+
+NUMBER = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+
+
+def _csv_value(value):
+    value = value.strip()
+    if not value:
+        return None
+    if NUMBER.match(value):
+        return _cast_number(value)
+    return value
+
+
+def csv_rows(data, sheet_name):
+    """
+    Rows of a CSV export of the sheet. A CSV file holds one sheet, so the
+    sheet name isn't checked; numbers are converted as a workbook would hold them.
+    """
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp1252', errors='replace')
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    for row in csv.reader(io.StringIO(text), dialect):
+        yield tuple(_csv_value(value) for value in row)
+
+
+# Backend name -> (file types, module it needs, row reader)
+BACKENDS = {
+    'ooxml': (('xlsx',), None, ooxml_rows),
+    'openpyxl': (('xlsx',), 'openpyxl', openpyxl_rows),
+    'xlrd': (('xls',), 'xlrd', xlrd_rows),
+    'ods': (('ods',), None, ods_rows),
+    'csv': (('csv',), None, csv_rows),
+}
+
+
+def backend_available(name):
+    requires = BACKENDS[name][1]
+    return requires is None or importlib.util.find_spec(requires) is not None
+
+
+def available_backends(file_format):
+    """Installed backends that read a file type, fastest first"""
+    return [name for name in FASTEST_FIRST[file_format] if backend_available(name)]
+
+
+def select_backend(file_format):
+    backends = available_backends(file_format)
+    if not backends:
+        needed = ", ".join(BACKENDS[name][1] for name in FASTEST_FIRST[file_format])
+        raise ValueError(f"Reading .{file_format} workbooks needs the {needed} package (pip install {needed})")
+    return backends[0]
+
+
+def iter_sheet_rows(data, sheet_name, backend=None):
+    """
+    Stream a worksheet's rows as tuples of cell values.
+
+    Args:
+        data: Raw bytes of the workbook (.xlsx/.xlsm, .xls, .ods or .csv)
+        sheet_name: Worksheet to read
+        backend: Backend name to force (default: the fastest one available)
+
+    Returns:
+        generator: row tuples; close it when stopping early so the file is released
+    """
+    if backend is None:
+        backend = select_backend(detect_format(data))
+    return BACKENDS[backend][2](data, sheet_name)